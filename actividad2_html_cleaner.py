@@ -1,128 +1,617 @@
 import os
+import io
 import time
-import glob
 import re
-from typing import List, Tuple, Optional
-from config import MATRICULA, FILES_DIRECTORY, ENCODING, PRECISION_DECIMALS, FALLBACK_ENCODINGS
+import shutil
+import argparse
+from functools import partial
+from typing import Callable, Dict, List, Tuple, Optional
+from config import MATRICULA, FILES_DIRECTORY, PRECISION_DECIMALS, DEFAULT_WORKERS
+from config import STREAM_CHUNK_SIZE, STREAM_THRESHOLD_BYTES, DEFAULT_CLEANER, PREFETCH_DEPTH
+from config import FSYNC_POLICIES, DEFAULT_FSYNC
+from procesamiento_paralelo import process_paths, resolve_workers
+from cache_incremental import BuildCache, split_cached
+from lector_archivos import candidate_encodings, encoding_histogram, load_text
+from metricas import FileMetrics, METRICS_FORMATS, duplicate_record, metrics_path, write_metrics
+from tokenizador_html import HtmlTokenizer, html_to_text
+from almacen_segmentos import SegmentWriter, document_key, store_paths
+from duplicados import duplicate_report_lines, find_exact_duplicates, input_size, minhash_signature, near_duplicate_clusters
+from perfilado import Profiler, profile_path
+from particionado import iter_shard, parse_shard, shard_cache_name, shard_report_path, write_shard_summary
+from lectura_anticipada import Prefetcher
+from descubrimiento_archivos import peek
+from escritor_asincrono import AsyncWriter, WriteTracker, submit_output
+from estadisticas import ReportStatistics, ResultCollector, latency_report_lines
+from entradas_comprimidas import decompression_report_lines, DuplicateDocumentError, document_stem, input_name, open_input, scan_input_files
 
-def remove_html_tags(filename: str) -> float:
+# Patrón que encuentra etiquetas HTML (incluye etiquetas con atributos)
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+BLANK_LINES_PATTERN = re.compile(r'\n\s*\n')
+SPACES_PATTERN = re.compile(r'[ \t]+')
+
+def clean_html(content: str) -> str:
+    """
+    Función para eliminar las etiquetas HTML de un texto ya decodificado.
+    Recibe como parámetro el contenido HTML.
+    Retorna el texto limpio, sin tocar disco.
+    """
+    # Eliminar todas las etiquetas HTML
+    clean_content = HTML_TAG_PATTERN.sub('', content)
+    
+    # Limpiar espacios en blanco excesivos y líneas vacías
+    clean_content = BLANK_LINES_PATTERN.sub('\n\n', clean_content)  # Múltiples líneas vacías -> doble salto
+    clean_content = SPACES_PATTERN.sub(' ', clean_content)  # Múltiples espacios -> un espacio
+    return clean_content.strip()  # Quitar espacios al inicio y final
+
+def normalize_whitespace_run(run: str) -> str:
+    """
+    Función para aplicar a un bloque de espacios en blanco las mismas reglas que clean_html():
+    del primer al último salto de línea -> doble salto, y espacios/tabuladores -> un espacio.
+    Aplicarla de nuevo sobre su resultado más espacios adicionales da lo mismo que aplicarla
+    una sola vez sobre todo el bloque, por eso el bloque pendiente nunca crece sin límite.
+    """
+    first_newline = run.find('\n')
+    last_newline = run.rfind('\n')
+    if first_newline != last_newline:
+        run = run[:first_newline] + '\n\n' + run[last_newline + 1:]
+    return SPACES_PATTERN.sub(' ', run)
+
+class StreamingTagStripper:
+    """
+    Versión por bloques de clean_html(): recibe el texto en fragmentos con feed()
+    y devuelve el texto limpio a medida que está listo, con el mismo resultado exacto.
+    Entre fragmentos solo se conserva una etiqueta abierta ('<' sin su '>') y el bloque
+    de espacios en blanco pendiente, así que la memoria no depende del tamaño del archivo.
+    """
+
+    def __init__(self):
+        self._pending_tag: Optional[List[str]] = None  # Etiqueta abierta que continúa en el siguiente bloque
+        self._pending_tag_length = 0
+        self._pending_space = ''  # Bloque de espacios que aún no sabemos si es final
+        self._started = False  # Ya se emitió texto visible (para el strip() inicial)
+
+    def feed(self, chunk: str) -> str:
+        """Procesa un fragmento de HTML y retorna el texto limpio que ya es definitivo."""
+        return self._filter_whitespace(self._strip_tags(chunk))
+
+    def close(self) -> str:
+        """Termina el procesamiento y retorna el texto limpio restante."""
+        remaining = ''
+        if self._pending_tag is not None:
+            # '<' sin '>' posterior: el patrón <[^>]+> no coincide y el texto queda literal
+            remaining = ''.join(self._pending_tag)
+            self._pending_tag = None
+        text = self._filter_whitespace(remaining)
+        self._pending_space = ''  # Espacios al final: equivalente a strip()
+        return text
+
+    def _strip_tags(self, chunk: str) -> str:
+        # Equivalente por bloques de HTML_TAG_PATTERN.sub('', ...)
+        output: List[str] = []
+        position = 0
+        if self._pending_tag is not None:
+            close = chunk.find('>')
+            if close == -1:
+                self._pending_tag.append(chunk)
+                self._pending_tag_length += len(chunk)
+                return ''
+            if close == 0 and self._pending_tag_length == 1:
+                # "<>" no es etiqueta: '<' se conserva y '>' se procesa como texto
+                output.append('<')
+            else:
+                position = close + 1
+            self._pending_tag = None
+        
+        # Todo '<' anterior al último '>' cierra dentro de este fragmento; el primer '<'
+        # posterior (si existe) abre una etiqueta que continúa en el siguiente
+        open_tag = chunk.find('<', max(position, chunk.rfind('>') + 1))
+        if open_tag == -1:
+            open_tag = len(chunk)
+        else:
+            self._pending_tag = [chunk[open_tag:]]
+            self._pending_tag_length = len(chunk) - open_tag
+        output.append(HTML_TAG_PATTERN.sub('', chunk[position:open_tag]))
+        return ''.join(output)
+
+    def _filter_whitespace(self, text: str) -> str:
+        # Equivalente por bloques de las dos sustituciones de espacios y de strip().
+        # Los bloques de espacios interiores están completos y se limpian con las mismas
+        # expresiones regulares; solo los de los extremos pueden continuar en otro fragmento.
+        body = text.lstrip()
+        self._pending_space = normalize_whitespace_run(self._pending_space + text[:len(text) - len(body)])
+        if not body:
+            return ''
+        stripped = body.rstrip()
+        trailing = body[len(stripped):]
+        
+        output: List[str] = []
+        self._emit_pending_space(output)
+        output.append(SPACES_PATTERN.sub(' ', BLANK_LINES_PATTERN.sub('\n\n', stripped)))
+        self._pending_space = normalize_whitespace_run(trailing)
+        return ''.join(output)
+
+    def _emit_pending_space(self, output: List[str]) -> None:
+        if self._started:
+            output.append(self._pending_space)
+        self._pending_space = ''
+        self._started = True
+
+# Resultado por archivo: el de procesamiento_paralelo.FileResult más el texto limpio
+# (solo con --empaquetado; si no, el texto ya quedó en Clean_Files/ y es None)
+# y la firma MinHash del texto limpio (solo con --duplicados)
+CleanResult = Tuple[str, float, str, int, Optional[str], Dict[str, object], Optional[str], Optional[List[int]]]
+
+# Métodos de limpieza disponibles: función para el documento completo y clase por bloques
+CLEANERS: Dict[str, Tuple[Callable[[str], str], type]] = {
+    "tokenizador": (html_to_text, HtmlTokenizer),
+    "regex": (clean_html, StreamingTagStripper),
+}
+
+def clean_output_path(filename: str) -> str:
+    """
+    Retorna la ruta del archivo limpio que genera un archivo HTML (000.html o 000.html.gz ->
+    000_clean.txt); scan_input_files() rechaza dos entradas con el mismo nombre base.
+    """
+    return os.path.join("Clean_Files", f"{document_stem(filename)}_clean.txt")
+
+def remove_html_tags(filename: str, metrics: Optional[FileMetrics] = None,
+                     cleaner: str = DEFAULT_CLEANER, output: Optional[List[str]] = None) -> float:
     """
     Función para eliminar las etiquetas HTML de un archivo.
-    Recibe como parámetro el nombre del archivo.
+    Recibe como parámetro el nombre del archivo, opcionalmente las métricas donde se
+    registran subetapas, bytes leídos y escritos, codificación y errores, el método
+    de limpieza (ver CLEANERS) y una lista donde dejar el texto limpio en lugar de
+    escribirlo en Clean_Files/ (para el almacén empaquetado, ver almacen_segmentos.py,
+    o para el escritor asíncrono, ver escritor_asincrono.py).
     Retorna el tiempo que tardó en procesar el archivo.
     """
     start_time = time.perf_counter()
+    if metrics is None:
+        metrics = FileMetrics(input_name(filename))
     
-    content: Optional[str] = None
-    encoding_used = ENCODING
-    
-    # Intentar abrir con UTF-8 primero
+    # Una sola lectura y una sola decodificación (ver lector_archivos.py)
     try:
-        with open(filename, 'r', encoding=ENCODING) as file:
-            content = file.read()
-    except UnicodeDecodeError:
-        # Si falla UTF-8, intentar con codificaciones alternativas
-        for encoding in FALLBACK_ENCODINGS:
-            try:
-                with open(filename, 'r', encoding=encoding) as file:
-                    content = file.read()
-                    encoding_used = encoding
-                    break
-            except (UnicodeDecodeError, UnicodeError):
-                continue
+        content, _, _ = load_text(filename, metrics=metrics)
     except Exception as e:
         print(f"Error al abrir {filename}: {e}")
+        metrics.fail(f"Error al abrir: {e}")
         return 0
     
     if content is None:
         print(f"No se pudo decodificar {filename} con ninguna codificación")
+        metrics.fail("No se pudo decodificar con ninguna codificación")
         return 0
     
-    # Eliminar etiquetas HTML usando expresiones regulares
-    # Patrón que encuentra etiquetas HTML (incluye etiquetas con atributos)
-    html_tag_pattern = re.compile(r'<[^>]+>')
-    
-    # Eliminar todas las etiquetas HTML
-    clean_content = html_tag_pattern.sub('', content)
+    # Eliminar etiquetas HTML y limpiar espacios en blanco
+    with metrics.stage("limpieza"):
+        clean_content = CLEANERS[cleaner][0](content)
     
-    # Limpiar espacios en blanco excesivos y líneas vacías
-    clean_content = re.sub(r'\n\s*\n', '\n\n', clean_content)  # Múltiples líneas vacías -> doble salto
-    clean_content = re.sub(r'[ \t]+', ' ', clean_content)  # Múltiples espacios -> un espacio
-    clean_content = clean_content.strip()  # Quitar espacios al inicio y final
+    if output is not None:
+        output.append(clean_content)
+        return time.perf_counter() - start_time
     
     # Crear nombre del archivo de salida
-    base_name: str = os.path.splitext(os.path.basename(filename))[0]
-    output_dir = "Clean_Files"
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    output_filename = os.path.join(output_dir, f"{base_name}_clean.txt")
+    output_filename = clean_output_path(filename)
     
     # Guardar el archivo sin etiquetas HTML
     try:
-        with open(output_filename, 'w', encoding='utf-8') as file:
-            file.write(clean_content)
+        with metrics.stage("escritura"):
+            os.makedirs(os.path.dirname(output_filename), exist_ok=True)  # exist_ok evita carreras entre procesos
+            with open(output_filename, 'w', encoding='utf-8') as file:
+                file.write(clean_content)
+                metrics.bytes_out = file.tell()
     except Exception as e:
         print(f"Error al escribir {output_filename}: {e}")
+        metrics.fail(f"Error al escribir: {e}")
         return 0
     
     end_time = time.perf_counter()
     return end_time - start_time
 
-def main():
+def remove_html_tags_streaming(filename: str, chunk_size: int = STREAM_CHUNK_SIZE,
+                               metrics: Optional[FileMetrics] = None, cleaner: str = DEFAULT_CLEANER) -> float:
+    """
+    Función para eliminar las etiquetas HTML de un archivo leyéndolo por bloques.
+    Genera exactamente el mismo archivo limpio que remove_html_tags(), pero la memoria
+    usada depende del tamaño de bloque y no del tamaño del archivo.
+    Los archivos comprimidos y los miembros de tar se descomprimen mientras se leen.
+    Retorna el tiempo que tardó en procesar el archivo.
+    """
+    start_time = time.perf_counter()
+    if metrics is None:
+        metrics = FileMetrics(input_name(filename))
+    
+    output_filename = clean_output_path(filename)
+    os.makedirs(os.path.dirname(output_filename), exist_ok=True)
+    
+    # La BOM se detecta con los primeros bytes; si una codificación falla a mitad
+    # del archivo se reinicia con la siguiente, igual que remove_html_tags()
+    try:
+        with open_input(filename) as source:
+            head = source.read(4)
+    except Exception as e:
+        print(f"Error al abrir {filename}: {e}")
+        metrics.fail(f"Error al abrir: {e}")
+        return 0
+    
+    for encoding in candidate_encodings(head):
+        stripper = CLEANERS[cleaner][1]()
+        metrics.stages.clear()  # Un reintento con otra codificación empieza de cero
+        try:
+            with io.TextIOWrapper(open_input(filename), encoding=encoding) as source, \
+                 open(output_filename, 'w', encoding='utf-8') as output:
+                while True:
+                    # En modo texto la lectura, la descompresión y la decodificación ocurren juntas
+                    with metrics.stage("lectura"):
+                        chunk = source.read(chunk_size)
+                    if not chunk:
+                        break
+                    with metrics.stage("limpieza"):
+                        clean_chunk = stripper.feed(chunk)
+                    with metrics.stage("escritura"):
+                        output.write(clean_chunk)
+                output.write(stripper.close())
+                metrics.bytes_out = output.tell()
+                metrics.bytes_in = source.buffer.tell()  # Bytes ya descomprimidos
+            metrics.encoding = encoding
+            break
+        except (UnicodeDecodeError, UnicodeError):
+            continue
+        except Exception as e:
+            print(f"Error al procesar {filename}: {e}")
+            metrics.fail(f"Error al procesar: {e}")
+            return 0
+    else:
+        print(f"No se pudo decodificar {filename} con ninguna codificación")
+        metrics.fail("No se pudo decodificar con ninguna codificación")
+        return 0
+    
+    end_time = time.perf_counter()
+    return end_time - start_time
+
+def process_file(html_file: str, stream: bool = False, cleaner: str = DEFAULT_CLEANER,
+                 packed: bool = False, signature: bool = False, deferred: bool = False) -> CleanResult:
+    """
+    Función para procesar un archivo HTML y empaquetar su resultado.
+    Se usa tanto en modo secuencial como dentro del pool de procesos.
+    Los archivos mayores a STREAM_THRESHOLD_BYTES (o todos, con stream=True) se procesan por bloques.
+    Con packed=True el texto limpio se retorna para que el proceso principal lo agregue
+    al almacén empaquetado; en ese modo el archivo se procesa completo en memoria.
+    Con deferred=True también se retorna sin escribirlo, para el escritor asíncrono del
+    proceso principal (los archivos que se procesan por bloques se escriben igual que siempre).
+    Con signature=True también se calcula la firma MinHash del texto limpio.
+    """
+    filename = input_name(html_file)
+    metrics = FileMetrics(filename)
+    clean_content: Optional[str] = None
+    streamed = False
+    if not packed:
+        try:
+            large_file = os.path.getsize(html_file) > STREAM_THRESHOLD_BYTES
+        except OSError:
+            large_file = False
+        streamed = stream or large_file
+    if streamed:
+        file_time = remove_html_tags_streaming(html_file, metrics=metrics, cleaner=cleaner)
+    elif packed or deferred:
+        output: List[str] = []
+        file_time = remove_html_tags(html_file, metrics, cleaner, output)
+        clean_content = output[0] if output else None
+    else:
+        file_time = remove_html_tags(html_file, metrics, cleaner)
+    
+    # La firma se calcula sobre el texto limpio (sin etiquetas ni scripts), que es lo que se compara
+    file_signature: Optional[List[int]] = None
+    if signature and file_time > 0:
+        with metrics.stage("firma"):
+            if clean_content is None:
+                with open(clean_output_path(html_file), 'r', encoding='utf-8') as file:
+                    file_signature = minhash_signature(file.read())
+            else:
+                file_signature = minhash_signature(clean_content)
+        file_time += metrics.stages["firma"]
+    
+    status = "Exitoso" if file_time > 0 else "Error"
+    return (filename, file_time, status, 0, metrics.encoding, metrics.to_dict(file_time), clean_content, file_signature)
+
+def append_packed(writer: SegmentWriter, html_file: str, clean_content: str, file_time: float,
+                  record: Dict[str, object]) -> float:
+    """
+    Función para agregar el texto limpio de un archivo al almacén empaquetado.
+    La escritura ocurre en el proceso principal, así que su tiempo y sus bytes se
+    suman aquí al resultado y a las métricas del archivo.
+    Retorna el tiempo total del archivo.
+    """
+    start_time = time.perf_counter()
+    record["bytes_salida"] = writer.append(document_key(html_file), clean_content)
+    elapsed = time.perf_counter() - start_time
+    record["etapas"]["escritura"] = record["etapas"].get("escritura", 0.0) + elapsed
+    record["tiempo_total"] = file_time + elapsed
+    return file_time + elapsed
+
+def add_result(stats: ReportStatistics, result: Tuple[str, float, str, Optional[str]]) -> None:
+    """
+    Agrega un resultado (archivo, tiempo, estado, codificación) a las estadísticas.
+    Los tiempos solo cuentan para los archivos procesados en esta ejecución, no para los
+    aciertos de caché ni los duplicados.
+    """
+    _, file_time, status, encoding = result
+    stats.add(file_time, status != "Error", encoding, timed=status == "Exitoso")
+
+def failed_write_result(result: Tuple[str, float, str, Optional[str]]) -> Tuple[str, float, str, Optional[str]]:
+    """Resultado de un archivo cuya salida no se pudo escribir con --escritura-asincrona."""
+    filename, _, _, encoding = result
+    return (filename, 0, "Error", encoding)
+
+def write_timing_sections(log_file, results: ResultCollector, total_files: int,
+                          total_individual_time: float, total_program_time: float) -> None:
+    """
+    Función para escribir las secciones de tiempos individuales, totales, estadísticas y
+    codificaciones del reporte a2_ (también la usa la fusión de shards de particionado.py).
+    """
+    stats = results.stats
+    successful_files = stats.successful
+    speedup = total_individual_time / total_program_time if total_program_time > 0 else 0
+    
+    log_file.write("TIEMPOS DE PROCESAMIENTO INDIVIDUAL:\n")
+    log_file.write("-"*50 + "\n")
+    log_file.write(f"{'Archivo':<25} {'Tiempo (seg)':<15} {'Estado':<10}\n")
+    log_file.write("-"*50 + "\n")
+    
+    if results.keep_rows:
+        for filename, file_time, status, _ in results.rows:
+            log_file.write(f"{filename:<25} {file_time:<15.{PRECISION_DECIMALS}f} {status:<10}\n")
+    else:
+        log_file.write(f"(detalle de {stats.files} archivos omitido con --sin-detalle)\n")
+    
+    log_file.write("-"*50 + "\n")
+    log_file.write(f"{'TOTALES:':<25}\n")
+    log_file.write(f"{'Suma individual:':<25} {total_individual_time:<15.{PRECISION_DECIMALS}f}\n")
+    log_file.write(f"{'Tiempo programa:':<25} {total_program_time:<15.{PRECISION_DECIMALS}f}\n")
+    log_file.write(f"{'Aceleración:':<25} {speedup:<15.2f}\n")
+    log_file.write("-"*50 + "\n")
+    
+    # Estadísticas adicionales (solo archivos exitosos, acumuladas en memoria constante)
+    if successful_files > 0:
+        if stats.times.count:
+            log_file.write(f"\nESTADÍSTICAS (archivos exitosos):\n")
+            log_file.write(f"Tiempo promedio: {stats.times.mean:.{PRECISION_DECIMALS}f} segundos\n")
+            log_file.write(f"Tiempo máximo: {stats.times.maximum:.{PRECISION_DECIMALS}f} segundos\n")
+            log_file.write(f"Tiempo mínimo: {stats.times.minimum:.{PRECISION_DECIMALS}f} segundos\n")
+            log_file.write(f"Archivos procesados: {successful_files} de {total_files}\n")
+            log_file.write(f"Tasa de éxito: {(successful_files/total_files*100):.1f}%\n")
+            log_file.writelines(latency_report_lines(stats.times))
+        
+        log_file.write(f"\nCODIFICACIONES DETECTADAS:\n")
+        for encoding, count in encoding_histogram(stats.encodings.elements()):
+            log_file.write(f"{encoding:<15} {count} archivos\n")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Actividad 2 - Eliminación de etiquetas HTML")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Número de procesos a usar (0 = todos los núcleos)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reprocesar solo los archivos que cambiaron desde la última ejecución")
+    parser.add_argument("--stream", action="store_true",
+                        help="Procesar todos los archivos por bloques con memoria constante")
+    parser.add_argument("--limpieza", choices=list(CLEANERS), default=DEFAULT_CLEANER,
+                        help="Método de limpieza: tokenizador de una pasada o expresiones regulares originales")
+    parser.add_argument("--metricas", choices=METRICS_FORMATS,
+                        help="Exportar métricas por archivo (JSON lines o CSV) junto al reporte")
+    parser.add_argument("--empaquetado", action="store_true",
+                        help="Guardar los textos limpios en un solo segmento (Packed_Files/clean.seg) en lugar de Clean_Files/")
+    parser.add_argument("--duplicados", action="store_true",
+                        help="Reutilizar la salida de los duplicados exactos y reportar grupos de casi duplicados")
+    parser.add_argument("--perfil", action="store_true",
+                        help="Perfilar el procesamiento (cProfile y tracemalloc) y guardar los datos crudos en un .prof")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N",
+                        help="Procesar solo el shard i de N (partición estable por nombre); ver fusion_shards.py")
+    parser.add_argument("--sin-detalle", action="store_true",
+                        help="Omitir la tabla de tiempos por archivo del reporte (memoria constante con millones de archivos)")
+    parser.add_argument("--precarga", type=int, nargs="?", const=PREFETCH_DEPTH, default=0, metavar="N",
+                        help=f"Leer por adelantado los próximos N archivos en un hilo (sin N: {PREFETCH_DEPTH})")
+    parser.add_argument("--escritura-asincrona", action="store_true",
+                        help="Escribir los archivos limpios en un hilo dedicado con una cola acotada")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES,
+                        help=f"Política de fsync del escritor asíncrono (por defecto: {DEFAULT_FSYNC})")
+    args = parser.parse_args(argv)
+    if args.empaquetado and (args.incremental or args.stream or args.shard or args.escritura_asincrona):
+        parser.error("--empaquetado no se puede combinar con --incremental, --stream, --shard ni --escritura-asincrona")
+    if args.escritura_asincrona and args.stream:
+        parser.error("--escritura-asincrona no se puede combinar con --stream (cada bloque se escribe al limpiarlo)")
+    if args.fsync and not args.escritura_asincrona:
+        parser.error("--fsync requiere --escritura-asincrona")
+    return args
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
     
     # Configuración
     files_directory = FILES_DIRECTORY
     matricula = MATRICULA
-    output_file = f"a2_{matricula}.txt"
+    output_file = shard_report_path(f"a2_{matricula}.txt", args.shard)
+    workers = resolve_workers(args.workers)
+    # Con --perfil todo corre en este proceso para que el perfil incluya el trabajo de cada archivo
+    profiler = Profiler() if args.perfil else None
+    if profiler is not None:
+        workers = 1
+    output_location = f"{store_paths('clean')[0]} (empaquetado)" if args.empaquetado else "Clean_Files/"
+    # Cambiar el método de limpieza invalida los archivos limpios guardados en la caché
+    cache = BuildCache(shard_cache_name("a2", args.shard), settings={"limpieza": args.limpieza}) if args.incremental else None
     
     # Verificar que existe el directorio Files
     if not os.path.exists(files_directory):
         print(f"Error: No se encontró el directorio {files_directory}")
         return
     
-    # Obtener todos los archivos HTML del directorio Files
-    html_files = glob.glob(os.path.join(files_directory, "*.html"))
-    html_files.sort()  # Ordenar alfabéticamente
+    # Obtener los archivos HTML del directorio Files (también comprimidos o dentro de un tar).
+    # --incremental y --duplicados necesitan la lista completa; si no, los archivos se procesan
+    # conforme se descubren (sin esperar a listar el directorio) y el reporte se ordena al final
+    discover_lazily = not (args.incremental or args.duplicados)
+    html_files = peek(scan_input_files(files_directory, ordered=not discover_lazily))
     
-    if not html_files:
+    if html_files is None:
         print(f"No se encontraron archivos HTML en {files_directory}")
         return
     
-    print(f"Encontrados {len(html_files)} archivos HTML")
+    # Con --shard solo se procesan los archivos de este shard (un shard puede quedar vacío)
+    html_files = peek(iter_shard(html_files, args.shard))
+    if html_files is None:
+        print(f"El shard {args.shard[0]}/{args.shard[1]} no tiene archivos")
+        write_shard_summary(output_file, "a2", args.shard, [], 0, 0, 0, workers)
+        return
+    
+    if discover_lazily:
+        print(f"Procesando los archivos HTML de {files_directory} conforme se encuentran")
+    else:
+        html_files = list(html_files)
+        print(f"Encontrados {len(html_files)} archivos HTML")
     print("Iniciando eliminación de etiquetas HTML...")
-    print(f"Los archivos limpios se guardarán en el directorio 'Clean_Files'")
+    print(f"Los archivos limpios se guardarán en: {output_location}")
+    print(f"Método de limpieza: {args.limpieza}")
+    print(f"Procesos en uso: {workers}")
     print("-" * 60)
     
-    # Variables para almacenar resultados
-    results = []
+    # Variables para almacenar resultados (las filas por archivo solo si se reportan o las necesita el shard)
+    results = ResultCollector(add_result, keep_rows=not args.sin_detalle or args.shard is not None,
+                              keep_records=args.metricas is not None)
     total_individual_time = 0
     successful_files = 0
     
     # Medir tiempo total del programa
     program_start_time = time.perf_counter()
+    if profiler is not None:
+        profiler.start()
     
-    # Procesar cada archivo HTML
-    for html_file in html_files:
-        filename = os.path.basename(html_file)
-        file_time = remove_html_tags(html_file)
-        
-        if file_time > 0:
+    # Con --incremental solo se reprocesan los archivos que cambiaron
+    pending_files = html_files
+    if cache is not None:
+        cache.collect_garbage(html_files)
+        cached_results, pending_files = split_cached(cache, html_files)
+        for filename, file_time, status, _, encoding, record in cached_results:
             successful_files += 1
+            results.append((filename, file_time, status, encoding), record)
+            print(f"= En caché:  {filename:<20} - Sin cambios")
+    
+    # Con --duplicados los duplicados exactos no se procesan: reutilizan la salida del original
+    exact_duplicates: Dict[str, str] = {}
+    if args.duplicados:
+        exact_duplicates = find_exact_duplicates(pending_files)
+        pending_files = [path for path in pending_files if path not in exact_duplicates]
+    originals = set(exact_duplicates.values())
+    original_results: Dict[str, Tuple[Optional[str], Optional[str]]] = {}  # original -> (codificación, texto)
+    signatures: Dict[str, List[int]] = {}
+    
+    # Con --empaquetado los procesos retornan el texto y solo el proceso principal escribe
+    writer = SegmentWriter("clean") if args.empaquetado else None
+    # Con --escritura-asincrona los procesos retornan el texto y un hilo de este proceso lo escribe
+    output_writer = AsyncWriter(fsync=args.fsync or DEFAULT_FSYNC) if args.escritura_asincrona else None
+    # Los resultados de las salidas entregadas al escritor se registran cuando se terminan de escribir
+    write_tracker = WriteTracker(output_writer, results, failed_write_result) if output_writer is not None else None
+    # Con --precarga un hilo lee los próximos archivos mientras se limpia el actual
+    prefetcher = Prefetcher(args.precarga) if args.precarga > 0 else None
+    
+    # El hilo escritor es daemon: si el procesamiento falla, se cierra igual para no perder las salidas entregadas
+    try:
+        # Procesar cada archivo HTML (en orden alfabético, aun en paralelo, salvo si se descubren conforme se procesan)
+        worker_func = partial(process_file, stream=args.stream, cleaner=args.limpieza, packed=args.empaquetado,
+                              signature=args.duplicados, deferred=args.escritura_asincrona)
+        for html_file, (filename, file_time, status, _, encoding, record, clean_content, signature) in process_paths(worker_func, pending_files, workers, prefetcher):
+            if writer is not None and clean_content is not None:
+                file_time = append_packed(writer, html_file, clean_content, file_time, record)
+            if output_writer is not None and clean_content is not None:
+                file_time = submit_output(output_writer, clean_output_path(html_file), clean_content, file_time, record)
+            if signature is not None:
+                signatures[html_file] = signature
+            if html_file in originals and file_time > 0:
+                original_results[html_file] = (encoding, clean_content)
+        
+            if file_time > 0:
+                successful_files += 1
             
-        total_individual_time += file_time
-        results.append((filename, file_time))
+            total_individual_time += file_time
+            if output_writer is not None and clean_content is not None:
+                write_tracker.add(clean_output_path(html_file), (filename, file_time, status, encoding), record)
+            else:
+                results.append((filename, file_time, status, encoding), record)
         
-        # Mostrar progreso
-        status = "✓" if file_time > 0 else "✗"
-        print(f"{status} Procesado: {filename:<20} - Tiempo: {file_time:.{PRECISION_DECIMALS}f} segundos")
+            if cache is not None:
+                if file_time > 0:
+                    cache.store(html_file, [clean_output_path(html_file)], file_time, encoding=encoding)
+                else:
+                    cache.discard(html_file)
+        
+            # Mostrar progreso
+            mark = "✓" if file_time > 0 else "✗"
+            print(f"{mark} Procesado: {filename:<20} - Tiempo: {file_time:.{PRECISION_DECIMALS}f} segundos")
+    
+        # Duplicados exactos: copiar (o volver a agregar al almacén) la salida del original
+        for duplicate, original in sorted(exact_duplicates.items()):
+            filename = input_name(duplicate)
+            if original not in original_results:
+                # El original falló; el duplicado tiene los mismos bytes y fallaría igual
+                results.append((filename, 0, "Error", None),
+                               dict(duplicate_record(filename, input_name(original)), estado="error",
+                                    error="Falló el archivo original"))
+                if cache is not None:
+                    cache.discard(duplicate)
+                print(f"✗ Duplicado: {filename:<20} - Falló el original {input_name(original)}")
+                continue
+            encoding, clean_content = original_results[original]
+            start_time = time.perf_counter()
+            if writer is not None:
+                writer.append(document_key(duplicate), clean_content)
+            elif output_writer is not None and clean_content is not None:
+                output_writer.submit(clean_output_path(duplicate), clean_content)
+            else:
+                shutil.copyfile(clean_output_path(original), clean_output_path(duplicate))
+            file_time = time.perf_counter() - start_time
+            successful_files += 1
+            total_individual_time += file_time
+            result = (filename, file_time, "Duplicado", encoding)
+            record = duplicate_record(filename, input_name(original), encoding, file_time)
+            if writer is None and output_writer is not None and clean_content is not None:
+                write_tracker.add(clean_output_path(duplicate), result, record)
+            else:
+                results.append(result, record)
+            if cache is not None:
+                cache.store(duplicate, [clean_output_path(duplicate)], file_time, encoding=encoding)
+            print(f"= Duplicado: {filename:<20} - Igual a {input_name(original)}")
+        near_duplicates = near_duplicate_clusters(signatures) if args.duplicados else []
+    finally:
+        if output_writer is not None:
+            output_writer.close()
+    
+    if writer is not None:
+        writer.close()
+    if output_writer is not None:
+        # Los resultados pendientes pasan como errores si su salida no se pudo escribir;
+        # esos archivos se reprocesan en la próxima ejecución
+        write_tracker.collect()
+        successful_files = results.stats.successful
+        failed_outputs = {path for path, _ in output_writer.errors}
+        for path, message in output_writer.errors:
+            print(f"Error al escribir {path}: {message}")
+        if cache is not None:
+            for html_file in pending_files + list(exact_duplicates):
+                if clean_output_path(html_file) in failed_outputs:
+                    cache.discard(html_file)
+    if cache is not None:
+        cache.save()
+    if cache is not None or exact_duplicates or discover_lazily:
+        results.sort()
+    # Cada archivo (procesado, en caché o duplicado) deja un resultado
+    total_files = results.stats.files
     
     # Tiempo total del programa
+    if profiler is not None:
+        profiler.stop()
     program_end_time = time.perf_counter()
     total_program_time = program_end_time - program_start_time
+    speedup = total_individual_time / total_program_time if total_program_time > 0 else 0
     
     print("-" * 60)
-    print(f"Procesamiento completado: {successful_files}/{len(html_files)} archivos exitosos")
+    print(f"Procesamiento completado: {successful_files}/{total_files} archivos exitosos")
     
     # Generar reporte
     with open(output_file, 'w', encoding='utf-8') as log_file:
@@ -131,65 +620,96 @@ def main():
         log_file.write("="*70 + "\n")
         log_file.write(f"Matrícula: {matricula}\n")
         log_file.write(f"Fecha: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-        log_file.write(f"Total de archivos procesados: {len(html_files)}\n")
+        log_file.write(f"Total de archivos procesados: {total_files}\n")
         log_file.write(f"Archivos procesados exitosamente: {successful_files}\n")
-        log_file.write(f"Directorio de salida: Clean_Files/\n")
+        log_file.write(f"Directorio de salida: {output_location}\n")
+        log_file.write(f"Método de limpieza: {args.limpieza}\n")
+        log_file.write(f"Procesos en uso: {workers}\n")
+        if prefetcher is not None:
+            log_file.write(f"Precarga: {prefetcher.depth} archivos por adelantado ({prefetcher.files} archivos, "
+                           f"{prefetcher.bytes / (1024 * 1024):.2f} MB leídos en segundo plano)\n")
+        if cache is not None:
+            log_file.write(f"Caché incremental: {cache.hits} aciertos, {cache.misses} fallos, "
+                           f"{cache.removed_outputs} salidas obsoletas eliminadas\n")
         log_file.write("="*70 + "\n\n")
         
-        log_file.write("TIEMPOS DE PROCESAMIENTO INDIVIDUAL:\n")
-        log_file.write("-"*50 + "\n")
-        log_file.write(f"{'Archivo':<25} {'Tiempo (seg)':<15} {'Estado':<10}\n")
-        log_file.write("-"*50 + "\n")
+        write_timing_sections(log_file, results, total_files, total_individual_time, total_program_time)
+        log_file.writelines(decompression_report_lines(results.stats))
+        if output_writer is not None:
+            log_file.writelines(output_writer.report_lines())
         
-        for filename, file_time in results:
-            status = "Exitoso" if file_time > 0 else "Error"
-            log_file.write(f"{filename:<25} {file_time:<15.{PRECISION_DECIMALS}f} {status:<10}\n")
+        if args.duplicados:
+            duplicate_bytes = sum(input_size(path) for path in exact_duplicates)
+            log_file.writelines(duplicate_report_lines(exact_duplicates, near_duplicates, total_files, duplicate_bytes))
+            if cache is not None and cache.hits:
+                log_file.write(f"Nota: los {cache.hits} archivos en caché no se comparan como casi duplicados\n")
         
-        log_file.write("-"*50 + "\n")
-        log_file.write(f"{'TOTALES:':<25}\n")
-        log_file.write(f"{'Suma individual:':<25} {total_individual_time:<15.{PRECISION_DECIMALS}f}\n")
-        log_file.write(f"{'Tiempo programa:':<25} {total_program_time:<15.{PRECISION_DECIMALS}f}\n")
-        log_file.write("-"*50 + "\n")
-        
-        # Estadísticas adicionales (solo archivos exitosos)
-        if results and successful_files > 0:
-            successful_times = [result[1] for result in results if result[1] > 0]
-            if successful_times:
-                avg_time = sum(successful_times) / len(successful_times)
-                max_time = max(successful_times)
-                min_time = min(successful_times)
-                
-                log_file.write(f"\nESTADÍSTICAS (archivos exitosos):\n")
-                log_file.write(f"Tiempo promedio: {avg_time:.{PRECISION_DECIMALS}f} segundos\n")
-                log_file.write(f"Tiempo máximo: {max_time:.{PRECISION_DECIMALS}f} segundos\n")
-                log_file.write(f"Tiempo mínimo: {min_time:.{PRECISION_DECIMALS}f} segundos\n")
-                log_file.write(f"Archivos procesados: {successful_files} de {len(html_files)}\n")
-                log_file.write(f"Tasa de éxito: {(successful_files/len(html_files)*100):.1f}%\n")
+        if profiler is not None:
+            log_file.writelines(profiler.report_lines())
+            log_file.write("Nota: con --perfil se usa un solo proceso y tracemalloc hace más lenta la ejecución\n")
         
         log_file.write("\n" + "="*70 + "\n")
         log_file.write("DESCRIPCIÓN DEL PROCESO:\n")
         log_file.write("="*70 + "\n")
-        log_file.write("1. Lectura de archivos HTML con manejo de múltiples codificaciones\n")
-        log_file.write("2. Eliminación de etiquetas HTML usando expresiones regulares\n")
+        log_file.write("1. Lectura única de archivos HTML con detección de codificación (BOM, UTF-8 y alternativas)\n")
+        if args.limpieza == "tokenizador":
+            log_file.write("2. Tokenización en una pasada: etiquetas, comentarios, scripts y estilos eliminados; entidades decodificadas\n")
+        else:
+            log_file.write("2. Eliminación de etiquetas HTML usando expresiones regulares\n")
         log_file.write("3. Limpieza de espacios en blanco y líneas vacías excesivas\n")
-        log_file.write("4. Guardado de archivos limpios en directorio 'Clean_Files/'\n")
+        if args.empaquetado:
+            log_file.write(f"4. Guardado de los textos limpios en un solo segmento '{store_paths('clean')[0]}' con índice de desplazamientos\n")
+        else:
+            log_file.write("4. Guardado de archivos limpios en directorio 'Clean_Files/'\n")
         log_file.write("5. Medición precisa de tiempos de procesamiento\n")
         log_file.write("\n" + "="*70 + "\n")
         log_file.write("FIN DEL REPORTE\n")
         log_file.write("="*70 + "\n")
     
+    # Con --shard, guardar el resumen que usa fusion_shards.py
+    if args.shard is not None:
+        shard_summary = write_shard_summary(output_file, "a2", args.shard, results.rows, total_files,
+                                            total_individual_time, total_program_time, workers, stats=results.stats)
+    
+    # Exportar métricas por archivo
+    if args.metricas:
+        metrics_file = metrics_path(output_file, args.metricas)
+        write_metrics(results.records, metrics_file, args.metricas, "a2")
+    
+    # Guardar el perfil crudo para visores externos
+    if profiler is not None:
+        profile_file = profile_path(output_file)
+        profiler.dump(profile_file)
+    
     # Mostrar resumen en consola
     print("\n" + "="*60)
     print("RESUMEN DE RESULTADOS:")
     print("="*60)
-    print(f"Archivos HTML encontrados: {len(html_files)}")
+    print(f"Archivos HTML encontrados: {total_files}")
     print(f"Archivos procesados exitosamente: {successful_files}")
-    print(f"Tasa de éxito: {(successful_files/len(html_files)*100):.1f}%")
+    print(f"Tasa de éxito: {(successful_files/total_files*100):.1f}%")
     print(f"Tiempo total (suma individual): {total_individual_time:.{PRECISION_DECIMALS}f} segundos")
     print(f"Tiempo total del programa: {total_program_time:.{PRECISION_DECIMALS}f} segundos")
-    print(f"Directorio de salida: Clean_Files/")
+    print(f"Aceleración (suma individual / tiempo programa): {speedup:.2f}x con {workers} proceso(s)")
+    if cache is not None:
+        print(f"Caché incremental: {cache.hits} aciertos, {cache.misses} fallos, "
+              f"{cache.removed_outputs} salidas obsoletas eliminadas")
+    if args.duplicados:
+        print(f"Duplicados exactos reutilizados: {len(exact_duplicates)} - "
+              f"Grupos de casi duplicados: {len(near_duplicates)}")
+    print(f"Directorio de salida: {output_location}")
     print(f"Reporte guardado en: {output_file}")
+    if args.shard is not None:
+        print(f"Resumen del shard guardado en: {shard_summary}")
+    if args.metricas:
+        print(f"Métricas guardadas en: {metrics_file}")
+    if profiler is not None:
+        print(f"Perfil guardado en: {profile_file} (ver con: python -m pstats {profile_file})")
     print("="*60)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except DuplicateDocumentError as e:
+        # Se detecta al descubrir la entrada repetida, antes de escribir su salida
+        raise SystemExit(f"Error: {e}")
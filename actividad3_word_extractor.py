@@ -1,144 +1,670 @@
 import os
 import time
-import glob
 import re
-from typing import List, Set
-from config import MATRICULA, PRECISION_DECIMALS, FALLBACK_ENCODINGS
+import mmap
+import heapq
+import shutil
+import hashlib
+import argparse
+from functools import lru_cache, partial
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from config import MATRICULA, PRECISION_DECIMALS, DEFAULT_WORKERS, TOP_WORDS, MMAP_WINDOW_BYTES, PREFETCH_DEPTH, \
+    FSYNC_POLICIES, DEFAULT_FSYNC
+from procesamiento_paralelo import process_paths, resolve_workers
+from cache_incremental import BuildCache, split_cached
+from lector_archivos import encoding_histogram, load_text
+from metricas import FileMetrics, METRICS_FORMATS, duplicate_record, metrics_path, write_metrics
+from almacen_segmentos import SegmentReader, SegmentWriter, store_paths
+from duplicados import duplicate_report_lines, find_exact_duplicates, input_size, minhash_signature, near_duplicate_clusters
+from perfilado import Profiler, profile_path
+from particionado import iter_shard, parse_shard, shard_cache_name, shard_report_path, write_shard_summary
+from descubrimiento_archivos import peek, scan_suffix
+from lectura_anticipada import Prefetcher
+from estadisticas import ReportStatistics, ResultCollector, latency_report_lines
+from escritor_asincrono import AsyncWriter, WriteTracker, submit_output
 
-def extract_and_sort_words(filename: str) -> float:
+# Codificación con la que la Actividad 2 escribe los archivos limpios
+CLEAN_FILES_ENCODING = "utf-8"
+
+# Patrón que encuentra palabras (incluye palabras con guiones y apostrofes)
+# Por ejemplo: "word", "don't", "state-of-the-art", "Automata-based"
+WORD_PATTERN = re.compile(r'\b[a-zA-Z]+(?:[-\'][a-zA-Z]+)*\b')
+
+# Versión en bytes de WORD_PATTERN para la ruta rápida de archivos ASCII. Sobre texto
+# ASCII da exactamente las mismas palabras; con acentos no (en "café" la versión en str
+# no encuentra "caf"), por eso cualquier byte no ASCII manda el archivo a la ruta con str
+BYTES_WORD_PATTERN = re.compile(rb"\b[a-zA-Z]+(?:[-'][a-zA-Z]+)*\b")
+NON_ASCII_PATTERN = re.compile(rb'[\x80-\xff]')
+WHITESPACE_PATTERN = re.compile(rb'\s')
+
+# Resultado por archivo: el de procesamiento_paralelo.FileResult más las frecuencias de sus palabras,
+# la lista de palabras ya formateada (solo con --empaquetado o --escritura-asincrona; si no, ya quedó
+# en Words_Files/)
+# y la firma MinHash del texto limpio (solo con --duplicados)
+WordsResult = Tuple[str, float, str, int, Optional[str], Dict[str, object], Counter, Optional[str],
+                    Optional[List[int]]]
+
+def count_words(content: str, metrics: Optional[FileMetrics] = None) -> Counter:
     """
-    Función para extraer palabras de un archivo limpio y ordenarlas alfabéticamente.
-    Recibe como parámetro el nombre del archivo.
-    Retorna el tiempo que tardó en procesar el archivo.
+    Función para contar las palabras de un texto limpio ya decodificado.
+    Recibe como parámetro el contenido del texto y, opcionalmente, las métricas
+    donde se registra la subetapa de tokenización.
+    Retorna cuántas veces aparece cada palabra, en minúsculas.
     """
-    start_time = time.perf_counter()
-    
-    content = None
-    
-    # Intentar abrir el archivo con diferentes codificaciones
-    encodings_to_try = ['utf-8'] + FALLBACK_ENCODINGS
-    
-    for encoding in encodings_to_try:
-        try:
-            with open(filename, 'r', encoding=encoding) as file:
-                content = file.read()
-                break
-        except (UnicodeDecodeError, UnicodeError):
-            continue
-        except Exception as e:
-            print(f"Error al abrir {filename}: {e}")
-            return 0
-    
-    if content is None:
-        print(f"No se pudo decodificar {filename} con ninguna codificación")
-        return 0
+    if metrics is None:
+        metrics = FileMetrics("")
     
-    # Extraer palabras usando expresiones regulares
-    # Patrón que encuentra palabras (incluye palabras con guiones y apostrofes)
-    # Por ejemplo: "word", "don't", "state-of-the-art", "Automata-based"
-    word_pattern = re.compile(r'\b[a-zA-Z]+(?:[-\'][a-zA-Z]+)*\b')
+    # Encontrar todas las palabras y contarlas en minúsculas para que "Word" y "word" sean la misma
+    with metrics.stage("tokenizacion"):
+        return Counter(map(str.lower, WORD_PATTERN.findall(content)))
+
+def count_words_mapped(filename: str, metrics: Optional[FileMetrics] = None) -> Optional[Counter]:
+    """
+    Ruta rápida para contar las palabras de un archivo limpio ASCII sin decodificarlo.
+    Mapea el archivo en memoria (mmap) y aplica BYTES_WORD_PATTERN directamente sobre el
+    mapeo, por ventanas de MMAP_WINDOW_BYTES que terminan en un espacio en blanco (ninguna
+    palabra queda partida). Así la memoria depende del vocabulario y de una ventana, no del
+    número de palabras del archivo; las minúsculas se aplican una vez por palabra distinta.
+    Retorna None si el archivo está vacío o tiene bytes no ASCII: esos van por la ruta con str.
+    """
+    if metrics is None:
+        metrics = FileMetrics("")
     
-    # Encontrar todas las palabras
-    words_found = word_pattern.findall(content)
+    with metrics.stage("lectura"):
+        with open(filename, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                return None  # mmap no acepta archivos vacíos
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
     
-    # Convertir a minúsculas para ordenamiento consistente y eliminar duplicados
-    unique_words = set(word.lower() for word in words_found)
+    with mapped:
+        with metrics.stage("decodificacion"):
+            if NON_ASCII_PATTERN.search(mapped) is not None:
+                return None
+        metrics.bytes_in = size
+        metrics.encoding = CLEAN_FILES_ENCODING  # ASCII es un subconjunto de UTF-8
+        
+        with metrics.stage("tokenizacion"):
+            raw_counts: Counter = Counter()
+            position = 0
+            while position < size:
+                end = position + MMAP_WINDOW_BYTES
+                if end < size:
+                    space = WHITESPACE_PATTERN.search(mapped, end)
+                    end = space.start() if space is not None else size
+                else:
+                    end = size
+                raw_counts.update(BYTES_WORD_PATTERN.findall(mapped, position, end))
+                position = end
+            
+            counts: Counter = Counter()
+            for word, count in raw_counts.items():
+                counts[word.lower().decode('ascii')] += count
+    return counts
+
+def extract_words(content: str, metrics: Optional[FileMetrics] = None) -> List[str]:
+    """
+    Función para extraer las palabras de un texto limpio ya decodificado.
+    Recibe como parámetro el contenido del texto y, opcionalmente, las métricas
+    donde se registran las subetapas de tokenización y ordenamiento.
+    Retorna la lista de palabras únicas, en minúsculas y ordenadas alfabéticamente.
+    """
+    if metrics is None:
+        metrics = FileMetrics("")
+    counts = count_words(content, metrics)
     
     # Ordenar palabras alfabéticamente (usando la función sort integrada de Python)
-    sorted_words = sorted(unique_words)
-    
-    # Crear nombre del archivo de salida
+    with metrics.stage("ordenamiento"):
+        return sorted(counts)
+
+def format_words(sorted_words: List[str], counts: Counter, with_counts: bool = False) -> str:
+    """Retorna el contenido del archivo de palabras: una por línea, o "palabra<TAB>conteo" con with_counts."""
+    if with_counts:
+        return ''.join([f"{word}\t{counts[word]}\n" for word in sorted_words])
+    return ''.join([word + '\n' for word in sorted_words])
+
+def top_words(counts: Counter, k: int) -> List[Tuple[str, int]]:
+    """
+    Función para obtener las k palabras más frecuentes.
+    Usa un heap acotado a k elementos en lugar de ordenar todo el vocabulario.
+    Los empates se ordenan alfabéticamente para que el resultado sea estable.
+    """
+    return heapq.nsmallest(k, counts.items(), key=lambda item: (-item[1], item[0]))
+
+def read_word_counts(filename: str) -> Optional[Counter]:
+    """
+    Función para leer un archivo de palabras escrito con frecuencias ("palabra\tconteo").
+    Retorna None si el archivo no existe o no tiene frecuencias.
+    """
+    counts: Counter = Counter()
+    try:
+        with open(filename, 'r', encoding='utf-8') as file:
+            for line in file:
+                word, separator, count = line.rstrip('\n').partition('\t')
+                if not separator:
+                    return None
+                counts[word] = int(count)
+    except (OSError, ValueError):
+        return None
+    return counts
+
+def words_output_path(filename: str) -> str:
+    """Retorna la ruta del archivo de palabras que genera un archivo limpio."""
     base_name = os.path.splitext(os.path.basename(filename))[0]
     # Remover "_clean" del nombre si existe
     if base_name.endswith('_clean'):
         base_name = base_name[:-6]
+    return os.path.join("Words_Files", f"{base_name}_words.txt")
+
+def extract_and_sort_words(filename: str, metrics: Optional[FileMetrics] = None,
+                           frequencies: Optional[Counter] = None, with_counts: bool = False,
+                           output: Optional[List[str]] = None) -> float:
+    """
+    Función para extraer palabras de un archivo limpio y ordenarlas alfabéticamente.
+    Recibe como parámetro el nombre del archivo y, opcionalmente, las métricas
+    donde se registran subetapas, bytes leídos y escritos, codificación y errores,
+    un Counter que se llena con las frecuencias de las palabras, si se escribe
+    "palabra<TAB>conteo" en lugar de solo la palabra y una lista donde dejar la lista
+    de palabras ya formateada en lugar de escribirla (para el escritor asíncrono).
+    Retorna el tiempo que tardó en procesar el archivo.
+    """
+    start_time = time.perf_counter()
+    if metrics is None:
+        metrics = FileMetrics(os.path.basename(filename))
     
-    output_dir = "Words_Files"
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    # Los archivos ASCII se cuentan directamente sobre el archivo mapeado. Los demás se
+    # leen una sola vez; la codificación de los archivos limpios ya se conoce, así que
+    # solo se detecta si el archivo no es UTF-8 (ver lector_archivos.py)
+    try:
+        counts = count_words_mapped(filename, metrics)
+        content = None
+        if counts is None:
+            content, _, _ = load_text(filename, CLEAN_FILES_ENCODING, metrics)
+    except Exception as e:
+        print(f"Error al abrir {filename}: {e}")
+        metrics.fail(f"Error al abrir: {e}")
+        return 0
     
-    output_filename = os.path.join(output_dir, f"{base_name}_words.txt")
+    if counts is None:
+        if content is None:
+            print(f"No se pudo decodificar {filename} con ninguna codificación")
+            metrics.fail("No se pudo decodificar con ninguna codificación")
+            return 0
+        counts = count_words(content, metrics)
+    
+    # Ordenar las palabras únicas alfabéticamente
+    with metrics.stage("ordenamiento"):
+        sorted_words = sorted(counts)
     
-    # Guardar las palabras ordenadas (una por línea)
+    if output is not None:
+        # La lista se une una sola vez; el escritor asíncrono la escribe después
+        with metrics.stage("escritura"):
+            output.append(format_words(sorted_words, counts, with_counts))
+        if frequencies is not None:
+            frequencies.update(counts)
+        return time.perf_counter() - start_time
+    
+    # Crear nombre del archivo de salida
+    output_filename = words_output_path(filename)
+    
+    # Guardar las palabras ordenadas (una por línea, con su frecuencia si se pidió)
     try:
-        with open(output_filename, 'w', encoding='utf-8') as file:
-            for word in sorted_words:
-                file.write(word + '\n')
+        with metrics.stage("escritura"):
+            os.makedirs(os.path.dirname(output_filename), exist_ok=True)  # exist_ok evita carreras entre procesos
+            with open(output_filename, 'w', encoding='utf-8') as file:
+                file.write(format_words(sorted_words, counts, with_counts))
+                metrics.bytes_out = file.tell()
     except Exception as e:
         print(f"Error al escribir {output_filename}: {e}")
+        metrics.fail(f"Error al escribir: {e}")
         return 0
     
+    if frequencies is not None:
+        frequencies.update(counts)
     end_time = time.perf_counter()
     return end_time - start_time
 
-def main():
+def process_file(clean_file: str, with_counts: bool = False, signature: bool = False,
+                 deferred: bool = False) -> WordsResult:
+    """
+    Función para procesar un archivo limpio y empaquetar su resultado.
+    El número de palabras únicas sale de las frecuencias ya calculadas,
+    sin volver a leer el archivo de palabras generado.
+    Con signature=True también se calcula la firma MinHash del texto limpio.
+    Con deferred=True la lista de palabras formateada se retorna sin escribirla, para el
+    escritor asíncrono del proceso principal.
+    """
+    filename = os.path.basename(clean_file)
+    metrics = FileMetrics(filename)
+    counts: Counter = Counter()
+    output: Optional[List[str]] = [] if deferred else None
+    file_time = extract_and_sort_words(clean_file, metrics, counts, with_counts, output)
+    words_text = output[0] if output else None
+    
+    # La ruta rápida no decodifica el texto; la firma necesita la secuencia de palabras
+    file_signature: Optional[List[int]] = None
+    if signature and file_time > 0:
+        with metrics.stage("firma"):
+            content, _, _ = load_text(clean_file, CLEAN_FILES_ENCODING)
+            file_signature = minhash_signature(content) if content is not None else None
+        file_time += metrics.stages["firma"]
+    
+    status = "Exitoso" if file_time > 0 else "Error"
+    return (filename, file_time, status, len(counts), metrics.encoding, metrics.to_dict(file_time), counts, words_text,
+            file_signature)
+
+@lru_cache(maxsize=None)
+def packed_clean_store() -> SegmentReader:
+    """Almacén empaquetado de textos limpios, abierto una sola vez por proceso."""
+    return SegmentReader("clean")
+
+def process_packed_document(name: str, with_counts: bool = False, signature: bool = False) -> WordsResult:
+    """
+    Versión de process_file() para --empaquetado: lee el texto limpio del almacén
+    'clean' y retorna la lista de palabras formateada para que el proceso principal
+    la agregue al almacén 'words'.
+    """
+    metrics = FileMetrics(name)
+    start_time = time.perf_counter()
+    store = packed_clean_store()
+    with metrics.stage("lectura"):
+        content = store.get(name)
+    if content is None:
+        metrics.fail("No está en el almacén empaquetado")
+        return (name, 0, "Error", 0, None, metrics.to_dict(0), Counter(), None, None)
+    metrics.bytes_in = store.entries[name][1]
+    metrics.encoding = CLEAN_FILES_ENCODING
+    
+    counts = count_words(content, metrics)
+    with metrics.stage("ordenamiento"):
+        sorted_words = sorted(counts)
+    with metrics.stage("escritura"):
+        output = format_words(sorted_words, counts, with_counts)
+    file_signature: Optional[List[int]] = None
+    if signature:
+        with metrics.stage("firma"):
+            file_signature = minhash_signature(content)
+    file_time = time.perf_counter() - start_time
+    return (name, file_time, "Exitoso", len(counts), metrics.encoding, metrics.to_dict(file_time), counts, output,
+            file_signature)
+
+def add_result(stats: ReportStatistics, result: Tuple[str, float, int, str, Optional[str]]) -> None:
+    """
+    Agrega un resultado (archivo, tiempo, palabras, estado, codificación) a las estadísticas.
+    Los tiempos solo cuentan para los archivos procesados en esta ejecución, no para los
+    aciertos de caché ni los duplicados; las palabras cuentan para todos los exitosos.
+    """
+    _, file_time, word_count, status, encoding = result
+    stats.add(file_time, status != "Error", encoding, timed=status == "Exitoso", words=word_count)
+
+def failed_write_result(result: Tuple[str, float, int, str, Optional[str]]) -> Tuple[str, float, int, str, Optional[str]]:
+    """Resultado de un archivo cuyas palabras no se pudieron escribir con --escritura-asincrona."""
+    filename, _, word_count, _, encoding = result
+    return (filename, 0, word_count, "Error", encoding)
+
+def write_timing_sections(log_file, results: ResultCollector, total_files: int,
+                          total_individual_time: float, total_program_time: float) -> None:
+    """
+    Función para escribir las secciones de tiempos individuales, totales, estadísticas y
+    codificaciones del reporte a3_ (también la usa la fusión de shards de particionado.py).
+    """
+    stats = results.stats
+    successful_files = stats.successful
+    total_words_processed = int(stats.words.total)
+    speedup = total_individual_time / total_program_time if total_program_time > 0 else 0
+    
+    log_file.write("TIEMPOS DE PROCESAMIENTO INDIVIDUAL:\n")
+    log_file.write("-"*65 + "\n")
+    log_file.write(f"{'Archivo':<30} {'Tiempo (seg)':<15} {'Palabras':<10} {'Estado':<10}\n")
+    log_file.write("-"*65 + "\n")
+    
+    if results.keep_rows:
+        for filename, file_time, word_count, status, _ in results.rows:
+            log_file.write(f"{filename:<30} {file_time:<15.{PRECISION_DECIMALS}f} {word_count:<10} {status:<10}\n")
+    else:
+        log_file.write(f"(detalle de {stats.files} archivos omitido con --sin-detalle)\n")
+    
+    log_file.write("-"*65 + "\n")
+    log_file.write(f"{'TOTALES:':<30}\n")
+    log_file.write(f"{'Suma individual:':<30} {total_individual_time:<15.{PRECISION_DECIMALS}f}\n")
+    log_file.write(f"{'Tiempo programa:':<30} {total_program_time:<15.{PRECISION_DECIMALS}f}\n")
+    log_file.write(f"{'Aceleración:':<30} {speedup:<15.2f}\n")
+    log_file.write(f"{'Total palabras:':<30} {total_words_processed:<15}\n")
+    log_file.write("-"*65 + "\n")
+    
+    # Estadísticas adicionales (solo archivos exitosos, acumuladas en memoria constante)
+    if successful_files > 0:
+        if stats.words.count:
+            log_file.write(f"\nESTADÍSTICAS (archivos exitosos):\n")
+            log_file.write(f"Tiempo promedio: {stats.times.mean:.{PRECISION_DECIMALS}f} segundos\n")
+            log_file.write(f"Tiempo máximo: {stats.times.maximum:.{PRECISION_DECIMALS}f} segundos\n")
+            log_file.write(f"Tiempo mínimo: {stats.times.minimum:.{PRECISION_DECIMALS}f} segundos\n")
+            log_file.write(f"Promedio de palabras por archivo: {stats.words.mean:.1f}\n")
+            log_file.write(f"Máximo de palabras en un archivo: {int(stats.words.maximum)}\n")
+            log_file.write(f"Mínimo de palabras en un archivo: {int(stats.words.minimum)}\n")
+            log_file.write(f"Archivos procesados: {successful_files} de {total_files}\n")
+            log_file.write(f"Tasa de éxito: {(successful_files/total_files*100):.1f}%\n")
+            log_file.writelines(latency_report_lines(stats.times))
+        
+        log_file.write(f"\nCODIFICACIONES DETECTADAS:\n")
+        for encoding, count in encoding_histogram(stats.encodings.elements()):
+            log_file.write(f"{encoding:<15} {count} archivos\n")
+
+def write_top_words_sections(log_file, corpus_counts: Counter,
+                             file_top_words: Optional[List[Tuple[str, List[Tuple[str, int]]]]],
+                             top: int, files_without_counts: int = 0) -> None:
+    """
+    Función para escribir las palabras más frecuentes del corpus y de cada archivo en el
+    reporte a3_ (también la usa la fusión de shards de particionado.py).
+    Con file_top_words=None (--sin-detalle) solo se escribe la lista del corpus.
+    """
+    # Palabras más frecuentes (heap acotado a --top elementos por archivo y para el corpus)
+    corpus_top_words = top_words(corpus_counts, top)
+    if corpus_top_words:
+        log_file.write(f"\nPALABRAS MÁS FRECUENTES DEL CORPUS (top {top}):\n")
+        log_file.write("-"*65 + "\n")
+        log_file.write(f"{'#':<5} {'Palabra':<30} {'Apariciones':<12}\n")
+        log_file.write("-"*65 + "\n")
+        for rank, (word, count) in enumerate(corpus_top_words, 1):
+            log_file.write(f"{rank:<5} {word:<30} {count:<12}\n")
+        log_file.write("-"*65 + "\n")
+        log_file.write(f"Total de apariciones: {sum(corpus_counts.values())}\n")
+        if files_without_counts:
+            log_file.write(f"Nota: {files_without_counts} archivos en caché no se incluyen porque sus "
+                           f"archivos de palabras no tienen frecuencias (usa --frecuencias)\n")
+        
+        if file_top_words is None:
+            return
+        log_file.write(f"\nPALABRAS MÁS FRECUENTES POR ARCHIVO (top {top}):\n")
+        log_file.write("-"*65 + "\n")
+        for filename, words in file_top_words:
+            log_file.write(f"{filename}: {', '.join(f'{word} ({count})' for word, count in words)}\n")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Actividad 3 - Extracción y ordenamiento de palabras")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Número de procesos a usar (0 = todos los núcleos)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reprocesar solo los archivos que cambiaron desde la última ejecución")
+    parser.add_argument("--metricas", choices=METRICS_FORMATS,
+                        help="Exportar métricas por archivo (JSON lines o CSV) junto al reporte")
+    parser.add_argument("--frecuencias", action="store_true",
+                        help="Escribir 'palabra<TAB>conteo' en lugar de solo la palabra")
+    parser.add_argument("--top", type=int, default=TOP_WORDS,
+                        help="Palabras más frecuentes a reportar por archivo y en todo el corpus")
+    parser.add_argument("--empaquetado", action="store_true",
+                        help="Leer los textos limpios de Packed_Files/clean.seg y guardar las palabras en Packed_Files/words.seg")
+    parser.add_argument("--duplicados", action="store_true",
+                        help="Reutilizar la salida de los duplicados exactos y reportar grupos de casi duplicados")
+    parser.add_argument("--perfil", action="store_true",
+                        help="Perfilar el procesamiento (cProfile y tracemalloc) y guardar los datos crudos en un .prof")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N",
+                        help="Procesar solo el shard i de N (partición estable por nombre); ver fusion_shards.py")
+    parser.add_argument("--sin-detalle", action="store_true",
+                        help="Omitir la tabla de tiempos por archivo del reporte (memoria constante con millones de archivos)")
+    parser.add_argument("--precarga", type=int, nargs="?", const=PREFETCH_DEPTH, default=0, metavar="N",
+                        help=f"Leer por adelantado los próximos N archivos en un hilo (sin N: {PREFETCH_DEPTH})")
+    parser.add_argument("--escritura-asincrona", action="store_true",
+                        help="Escribir las listas de palabras en un hilo dedicado con una cola acotada")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES,
+                        help=f"Política de fsync del escritor asíncrono (por defecto: {DEFAULT_FSYNC})")
+    args = parser.parse_args(argv)
+    if args.empaquetado and (args.incremental or args.shard or args.precarga or args.escritura_asincrona):
+        parser.error("--empaquetado no se puede combinar con --incremental, --shard, --precarga ni --escritura-asincrona")
+    if args.fsync and not args.escritura_asincrona:
+        parser.error("--fsync requiere --escritura-asincrona")
+    return args
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    
     # Configuración
     clean_files_directory = "Clean_Files"
     matricula = MATRICULA
-    output_file = f"a3_{matricula}.txt"
+    output_file = shard_report_path(f"a3_{matricula}.txt", args.shard)
+    workers = resolve_workers(args.workers)
+    # Con --perfil todo corre en este proceso para que el perfil incluya el trabajo de cada archivo
+    profiler = Profiler() if args.perfil else None
+    if profiler is not None:
+        workers = 1
+    # El formato de los archivos de palabras forma parte de la configuración de la caché
+    cache = BuildCache(shard_cache_name("a3", args.shard), settings={"frecuencias": args.frecuencias}) if args.incremental else None
+    exact_duplicates: Dict[str, str] = {}  # Con --duplicados: duplicado exacto -> original
+    duplicate_bytes = 0
     
-    # Verificar que existe el directorio Clean_Files
-    if not os.path.exists(clean_files_directory):
-        print(f"Error: No se encontró el directorio {clean_files_directory}")
-        print("Primero ejecuta la Actividad 2 para generar los archivos limpios")
-        return
-    
-    # Obtener todos los archivos limpios (.txt) del directorio Clean_Files
-    clean_files = glob.glob(os.path.join(clean_files_directory, "*_clean.txt"))
-    clean_files.sort()  # Ordenar alfabéticamente
+    if args.empaquetado:
+        # Con --empaquetado la entrada y la salida son almacenes (ver almacen_segmentos.py)
+        clean_files_directory = store_paths("clean")[0]
+        input_location = f"{clean_files_directory} (empaquetado)"
+        output_location = f"{store_paths('words')[0]} (empaquetado)"
+        if not os.path.exists(clean_files_directory):
+            print(f"Error: No se encontró el almacén {clean_files_directory}")
+            print("Primero ejecuta la Actividad 2 con --empaquetado")
+            return
+        with SegmentReader("clean") as reader:
+            clean_files = reader.names()
+            if args.duplicados:
+                exact_duplicates = find_exact_duplicates(
+                    clean_files, size_of=lambda name: reader.entries[name][1],
+                    digest_of=lambda name: hashlib.sha256(reader.get_bytes(name)).hexdigest())
+                duplicate_bytes = sum(reader.entries[name][1] for name in exact_duplicates)
+    # --incremental, --duplicados y --empaquetado necesitan la lista completa; si no, los archivos
+    # se procesan conforme se descubren (sin esperar a listar el directorio) y el reporte se ordena al final
+    discover_lazily = not (args.incremental or args.duplicados or args.empaquetado)
+    if not args.empaquetado:
+        input_location = f"{clean_files_directory}/"
+        output_location = "Words_Files/"
+        # Verificar que existe el directorio Clean_Files
+        if not os.path.exists(clean_files_directory):
+            print(f"Error: No se encontró el directorio {clean_files_directory}")
+            print("Primero ejecuta la Actividad 2 para generar los archivos limpios")
+            return
+        
+        # Obtener los archivos limpios (.txt) del directorio Clean_Files
+        clean_files = scan_suffix(clean_files_directory, "_clean.txt", ordered=not discover_lazily)
     
-    if not clean_files:
+    clean_files = peek(clean_files)
+    if clean_files is None:
         print(f"No se encontraron archivos limpios en {clean_files_directory}")
         print("Primero ejecuta la Actividad 2 para generar los archivos limpios")
         return
     
-    print(f"Encontrados {len(clean_files)} archivos limpios")
+    # Con --shard solo se procesan los archivos de este shard (un shard puede quedar vacío)
+    clean_files = peek(iter_shard(clean_files, args.shard))
+    if clean_files is None:
+        print(f"El shard {args.shard[0]}/{args.shard[1]} no tiene archivos")
+        write_shard_summary(output_file, "a3", args.shard, [], 0, 0, 0, workers)
+        return
+    
+    if discover_lazily:
+        print(f"Procesando los archivos limpios de {clean_files_directory} conforme se encuentran")
+    else:
+        clean_files = list(clean_files)
+        print(f"Encontrados {len(clean_files)} archivos limpios")
     print("Iniciando extracción y ordenamiento de palabras...")
-    print(f"Los archivos de palabras se guardarán en el directorio 'Words_Files'")
+    print(f"Los archivos de palabras se guardarán en: {output_location}")
+    print(f"Procesos en uso: {workers}")
     print("-" * 70)
     
-    # Variables para almacenar resultados
-    results = []
+    # Variables para almacenar resultados (las filas por archivo solo si se reportan o las necesita el shard)
+    results = ResultCollector(add_result, keep_rows=not args.sin_detalle or args.shard is not None,
+                              keep_records=args.metricas is not None)
     total_individual_time = 0
     successful_files = 0
     total_words_processed = 0
+    corpus_counts: Counter = Counter()  # Frecuencias acumuladas de todo el corpus
+    # Las palabras más frecuentes por archivo se guardan igual que las filas: no con --sin-detalle
+    file_top_words: Optional[List[Tuple[str, List[Tuple[str, int]]]]] = [] if results.keep_rows else None
+    files_without_counts = 0  # Aciertos de caché sin frecuencias disponibles
     
     # Medir tiempo total del programa
     program_start_time = time.perf_counter()
+    if profiler is not None:
+        profiler.start()
     
-    # Procesar cada archivo limpio
-    for clean_file in clean_files:
-        filename = os.path.basename(clean_file)
-        file_time = extract_and_sort_words(clean_file)
-        
-        if file_time > 0:
+    # Con --incremental solo se reprocesan los archivos que cambiaron
+    pending_files = clean_files
+    if cache is not None:
+        cache.collect_garbage(clean_files)
+        cached_results, pending_files = split_cached(cache, clean_files)
+        for filename, file_time, status, word_count, encoding, record in cached_results:
             successful_files += 1
-            # Contar palabras en el archivo generado
-            words_file = filename.replace('_clean.txt', '_words.txt')
-            words_path = os.path.join("Words_Files", words_file)
-            try:
-                with open(words_path, 'r', encoding='utf-8') as f:
-                    word_count = sum(1 for line in f)
-                total_words_processed += word_count
-            except:
-                word_count = 0
+            total_words_processed += word_count
+            results.append((filename, file_time, word_count, status, encoding), record)
+            # Las frecuencias solo se pueden recuperar si el archivo de palabras las incluye
+            counts = read_word_counts(words_output_path(filename)) if args.frecuencias else None
+            if counts is not None:
+                corpus_counts.update(counts)
+                if file_top_words is not None:
+                    file_top_words.append((filename, top_words(counts, args.top)))
+            else:
+                files_without_counts += 1
+            print(f"= En caché:  {filename:<25} - Sin cambios - Palabras: {word_count}")
+    
+    # Con --duplicados los duplicados exactos no se procesan: reutilizan la salida del original
+    # (con --empaquetado ya se buscaron al abrir el almacén)
+    if args.duplicados and not args.empaquetado:
+        exact_duplicates = find_exact_duplicates(pending_files)
+        duplicate_bytes = sum(input_size(path) for path in exact_duplicates)
+    pending_files = [path for path in pending_files if path not in exact_duplicates]
+    originals = set(exact_duplicates.values())
+    original_results: Dict[str, Tuple[Optional[str], Counter, Optional[str]]] = {}  # original -> (codificación, frecuencias, palabras)
+    signatures: Dict[str, List[int]] = {}
+    
+    # Procesar cada archivo limpio (en orden alfabético, aun en paralelo, salvo si se descubren conforme se procesan)
+    # Con --empaquetado los procesos retornan las palabras y solo el proceso principal escribe
+    writer = SegmentWriter("words") if args.empaquetado else None
+    # Con --precarga un hilo lee los próximos archivos mientras se tokeniza el actual
+    prefetcher = Prefetcher(args.precarga) if args.precarga > 0 else None
+    # Con --escritura-asincrona los procesos retornan las palabras y un hilo de este proceso las escribe
+    output_writer = AsyncWriter(fsync=args.fsync or DEFAULT_FSYNC) if args.escritura_asincrona else None
+    # Los resultados de las salidas entregadas al escritor se registran cuando se terminan de escribir
+    write_tracker = WriteTracker(output_writer, results, failed_write_result) if output_writer is not None else None
+    # El hilo escritor es daemon: si el procesamiento falla, se cierra igual para no perder las salidas entregadas
+    try:
+        if args.empaquetado:
+            worker_func = partial(process_packed_document, with_counts=args.frecuencias, signature=args.duplicados)
         else:
-            word_count = 0
+            worker_func = partial(process_file, with_counts=args.frecuencias, signature=args.duplicados,
+                                  deferred=args.escritura_asincrona)
+        for clean_file, (filename, file_time, status, word_count, encoding, record, counts, packed_words, signature) in process_paths(worker_func, pending_files, workers, prefetcher):
+            if writer is not None and packed_words is not None:
+                append_start = time.perf_counter()
+                record["bytes_salida"] = writer.append(filename, packed_words)
+                append_time = time.perf_counter() - append_start
+                record["etapas"]["escritura"] += append_time
+                file_time += append_time
+                record["tiempo_total"] = file_time
+            elif output_writer is not None and packed_words is not None:
+                file_time = submit_output(output_writer, words_output_path(clean_file), packed_words, file_time, record)
+            if signature is not None:
+                signatures[clean_file] = signature
+            if clean_file in originals and file_time > 0:
+                original_results[clean_file] = (encoding, counts, packed_words)
+        
+            if file_time > 0:
+                successful_files += 1
+                total_words_processed += word_count
+                corpus_counts.update(counts)
+                if file_top_words is not None:
+                    file_top_words.append((filename, top_words(counts, args.top)))
             
-        total_individual_time += file_time
-        results.append((filename, file_time, word_count))
+            total_individual_time += file_time
+            if output_writer is not None and packed_words is not None:
+                write_tracker.add(words_output_path(clean_file), (filename, file_time, word_count, status, encoding), record)
+            else:
+                results.append((filename, file_time, word_count, status, encoding), record)
+        
+            if cache is not None:
+                if file_time > 0:
+                    cache.store(clean_file, [words_output_path(clean_file)], file_time, word_count, encoding)
+                else:
+                    cache.discard(clean_file)
         
-        # Mostrar progreso
-        status = "✓" if file_time > 0 else "✗"
-        print(f"{status} Procesado: {filename:<25} - Tiempo: {file_time:.{PRECISION_DECIMALS}f}s - Palabras: {word_count}")
+            # Mostrar progreso
+            mark = "✓" if file_time > 0 else "✗"
+            print(f"{mark} Procesado: {filename:<25} - Tiempo: {file_time:.{PRECISION_DECIMALS}f}s - Palabras: {word_count}")
+    
+        # Duplicados exactos: copiar (o volver a agregar al almacén) la salida del original
+        for duplicate, original in sorted(exact_duplicates.items()):
+            filename = os.path.basename(duplicate)
+            if original not in original_results:
+                # El original falló; el duplicado tiene los mismos bytes y fallaría igual
+                results.append((filename, 0, 0, "Error", None),
+                               dict(duplicate_record(filename, os.path.basename(original)), estado="error",
+                                    error="Falló el archivo original"))
+                if cache is not None:
+                    cache.discard(duplicate)
+                print(f"✗ Duplicado: {filename:<25} - Falló el original {os.path.basename(original)}")
+                continue
+            encoding, counts, packed_words = original_results[original]
+            start_time = time.perf_counter()
+            if writer is not None:
+                writer.append(filename, packed_words)
+            elif output_writer is not None:
+                output_writer.submit(words_output_path(duplicate), packed_words)
+            else:
+                shutil.copyfile(words_output_path(original), words_output_path(duplicate))
+            file_time = time.perf_counter() - start_time
+            successful_files += 1
+            total_words_processed += len(counts)
+            total_individual_time += file_time
+            corpus_counts.update(counts)
+            if file_top_words is not None:
+                file_top_words.append((filename, top_words(counts, args.top)))
+            result = (filename, file_time, len(counts), "Duplicado", encoding)
+            record = duplicate_record(filename, os.path.basename(original), encoding, file_time)
+            if writer is None and output_writer is not None:
+                write_tracker.add(words_output_path(duplicate), result, record)
+            else:
+                results.append(result, record)
+            if cache is not None:
+                cache.store(duplicate, [words_output_path(duplicate)], file_time, len(counts), encoding)
+            print(f"= Duplicado: {filename:<25} - Igual a {os.path.basename(original)}")
+        near_duplicates = near_duplicate_clusters(signatures) if args.duplicados else []
+    finally:
+        if output_writer is not None:
+            output_writer.close()
+    
+    if writer is not None:
+        writer.close()
+    if output_writer is not None:
+        # Los resultados pendientes pasan como errores si su salida no se pudo escribir;
+        # esos archivos se reprocesan en la próxima ejecución
+        write_tracker.collect()
+        successful_files = results.stats.successful
+        total_words_processed = int(results.stats.words.total)
+        failed_outputs = {path for path, _ in output_writer.errors}
+        for path, message in output_writer.errors:
+            print(f"Error al escribir {path}: {message}")
+        if cache is not None:
+            for clean_file in pending_files + list(exact_duplicates):
+                if words_output_path(clean_file) in failed_outputs:
+                    cache.discard(clean_file)
+    if cache is not None:
+        cache.save()
+    if cache is not None or exact_duplicates or discover_lazily:
+        results.sort()
+        if file_top_words is not None:
+            file_top_words.sort()
+    # Cada archivo (procesado, en caché o duplicado) deja un resultado
+    total_files = results.stats.files
+    corpus_top_words = top_words(corpus_counts, args.top)
     
     # Tiempo total del programa
+    if profiler is not None:
+        profiler.stop()
     program_end_time = time.perf_counter()
     total_program_time = program_end_time - program_start_time
+    speedup = total_individual_time / total_program_time if total_program_time > 0 else 0
     
     print("-" * 70)
-    print(f"Procesamiento completado: {successful_files}/{len(clean_files)} archivos exitosos")
+    print(f"Procesamiento completado: {successful_files}/{total_files} archivos exitosos")
     print(f"Total de palabras únicas procesadas: {total_words_processed}")
+    if corpus_top_words:
+        print(f"Palabras más frecuentes del corpus: "
+              f"{', '.join(f'{word} ({count})' for word, count in corpus_top_words)}")
     
     # Generar reporte
     with open(output_file, 'w', encoding='utf-8') as log_file:
@@ -147,51 +673,34 @@ def main():
         log_file.write("="*80 + "\n")
         log_file.write(f"Matrícula: {matricula}\n")
         log_file.write(f"Fecha: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-        log_file.write(f"Total de archivos procesados: {len(clean_files)}\n")
+        log_file.write(f"Total de archivos procesados: {total_files}\n")
         log_file.write(f"Archivos procesados exitosamente: {successful_files}\n")
         log_file.write(f"Total de palabras únicas extraídas: {total_words_processed}\n")
-        log_file.write(f"Directorio de entrada: {clean_files_directory}/\n")
-        log_file.write(f"Directorio de salida: Words_Files/\n")
+        log_file.write(f"Directorio de entrada: {input_location}\n")
+        log_file.write(f"Directorio de salida: {output_location}\n")
+        log_file.write(f"Procesos en uso: {workers}\n")
+        if prefetcher is not None:
+            log_file.write(f"Precarga: {prefetcher.depth} archivos por adelantado ({prefetcher.files} archivos, "
+                           f"{prefetcher.bytes / (1024 * 1024):.2f} MB leídos en segundo plano)\n")
+        if cache is not None:
+            log_file.write(f"Caché incremental: {cache.hits} aciertos, {cache.misses} fallos, "
+                           f"{cache.removed_outputs} salidas obsoletas eliminadas\n")
         log_file.write("="*80 + "\n\n")
         
-        log_file.write("TIEMPOS DE PROCESAMIENTO INDIVIDUAL:\n")
-        log_file.write("-"*65 + "\n")
-        log_file.write(f"{'Archivo':<30} {'Tiempo (seg)':<15} {'Palabras':<10} {'Estado':<10}\n")
-        log_file.write("-"*65 + "\n")
+        write_timing_sections(log_file, results, total_files, total_individual_time, total_program_time)
+        if output_writer is not None:
+            log_file.writelines(output_writer.report_lines())
         
-        for filename, file_time, word_count in results:
-            status = "Exitoso" if file_time > 0 else "Error"
-            log_file.write(f"{filename:<30} {file_time:<15.{PRECISION_DECIMALS}f} {word_count:<10} {status:<10}\n")
+        write_top_words_sections(log_file, corpus_counts, file_top_words, args.top, files_without_counts)
         
-        log_file.write("-"*65 + "\n")
-        log_file.write(f"{'TOTALES:':<30}\n")
-        log_file.write(f"{'Suma individual:':<30} {total_individual_time:<15.{PRECISION_DECIMALS}f}\n")
-        log_file.write(f"{'Tiempo programa:':<30} {total_program_time:<15.{PRECISION_DECIMALS}f}\n")
-        log_file.write(f"{'Total palabras:':<30} {total_words_processed:<15}\n")
-        log_file.write("-"*65 + "\n")
+        if args.duplicados:
+            log_file.writelines(duplicate_report_lines(exact_duplicates, near_duplicates, total_files, duplicate_bytes))
+            if cache is not None and cache.hits:
+                log_file.write(f"Nota: los {cache.hits} archivos en caché no se comparan como casi duplicados\n")
         
-        # Estadísticas adicionales (solo archivos exitosos)
-        if results and successful_files > 0:
-            successful_times = [result[1] for result in results if result[1] > 0]
-            successful_words = [result[2] for result in results if result[1] > 0]
-            
-            if successful_times:
-                avg_time = sum(successful_times) / len(successful_times)
-                max_time = max(successful_times)
-                min_time = min(successful_times)
-                avg_words = sum(successful_words) / len(successful_words) if successful_words else 0
-                max_words = max(successful_words) if successful_words else 0
-                min_words = min(successful_words) if successful_words else 0
-                
-                log_file.write(f"\nESTADÍSTICAS (archivos exitosos):\n")
-                log_file.write(f"Tiempo promedio: {avg_time:.{PRECISION_DECIMALS}f} segundos\n")
-                log_file.write(f"Tiempo máximo: {max_time:.{PRECISION_DECIMALS}f} segundos\n")
-                log_file.write(f"Tiempo mínimo: {min_time:.{PRECISION_DECIMALS}f} segundos\n")
-                log_file.write(f"Promedio de palabras por archivo: {avg_words:.1f}\n")
-                log_file.write(f"Máximo de palabras en un archivo: {max_words}\n")
-                log_file.write(f"Mínimo de palabras en un archivo: {min_words}\n")
-                log_file.write(f"Archivos procesados: {successful_files} de {len(clean_files)}\n")
-                log_file.write(f"Tasa de éxito: {(successful_files/len(clean_files)*100):.1f}%\n")
+        if profiler is not None:
+            log_file.writelines(profiler.report_lines())
+            log_file.write("Nota: con --perfil se usa un solo proceso y tracemalloc hace más lenta la ejecución\n")
         
         log_file.write("\n" + "="*80 + "\n")
         log_file.write("DESCRIPCIÓN DEL PROCESO:\n")
@@ -201,7 +710,11 @@ def main():
         log_file.write("3. Manejo de palabras con caracteres especiales (guiones, apostrofes)\n")
         log_file.write("4. Conversión a minúsculas y eliminación de duplicados\n")
         log_file.write("5. Ordenamiento alfabético usando función sort() de Python\n")
-        log_file.write("6. Guardado de palabras en archivos individuales (una palabra por línea)\n")
+        line_format = "palabra<TAB>conteo por línea" if args.frecuencias else "una palabra por línea"
+        if args.empaquetado:
+            log_file.write(f"6. Guardado de palabras en un solo segmento con índice de desplazamientos ({line_format})\n")
+        else:
+            log_file.write(f"6. Guardado de palabras en archivos individuales ({line_format})\n")
         log_file.write("7. Medición precisa de tiempos de procesamiento\n")
         log_file.write("\nEJEMPLOS DE PALABRAS PROCESADAS:\n")
         log_file.write("- Palabras simples: 'word', 'example', 'test'\n")
@@ -212,19 +725,51 @@ def main():
         log_file.write("FIN DEL REPORTE\n")
         log_file.write("="*80 + "\n")
     
+    # Con --shard, guardar el resumen que usa fusion_shards.py (con las frecuencias del shard
+    # para que las palabras más frecuentes del corpus fusionado sean exactas)
+    if args.shard is not None:
+        shard_summary = write_shard_summary(output_file, "a3", args.shard, results.rows, total_files,
+                                            total_individual_time, total_program_time, workers,
+                                            extra={"frecuencias": dict(corpus_counts), "top": args.top,
+                                                   "top_por_archivo": file_top_words,
+                                                   "archivos_sin_frecuencias": files_without_counts})
+    
+    # Exportar métricas por archivo
+    if args.metricas:
+        metrics_file = metrics_path(output_file, args.metricas)
+        write_metrics(results.records, metrics_file, args.metricas, "a3")
+    
+    # Guardar el perfil crudo para visores externos
+    if profiler is not None:
+        profile_file = profile_path(output_file)
+        profiler.dump(profile_file)
+    
     # Mostrar resumen en consola
     print("\n" + "="*70)
     print("RESUMEN DE RESULTADOS:")
     print("="*70)
-    print(f"Archivos limpios encontrados: {len(clean_files)}")
+    print(f"Archivos limpios encontrados: {total_files}")
     print(f"Archivos procesados exitosamente: {successful_files}")
     print(f"Total de palabras únicas extraídas: {total_words_processed}")
-    print(f"Tasa de éxito: {(successful_files/len(clean_files)*100):.1f}%")
+    print(f"Tasa de éxito: {(successful_files/total_files*100):.1f}%")
     print(f"Tiempo total (suma individual): {total_individual_time:.{PRECISION_DECIMALS}f} segundos")
     print(f"Tiempo total del programa: {total_program_time:.{PRECISION_DECIMALS}f} segundos")
-    print(f"Directorio de entrada: {clean_files_directory}/")
-    print(f"Directorio de salida: Words_Files/")
+    print(f"Aceleración (suma individual / tiempo programa): {speedup:.2f}x con {workers} proceso(s)")
+    if cache is not None:
+        print(f"Caché incremental: {cache.hits} aciertos, {cache.misses} fallos, "
+              f"{cache.removed_outputs} salidas obsoletas eliminadas")
+    if args.duplicados:
+        print(f"Duplicados exactos reutilizados: {len(exact_duplicates)} - "
+              f"Grupos de casi duplicados: {len(near_duplicates)}")
+    print(f"Directorio de entrada: {input_location}")
+    print(f"Directorio de salida: {output_location}")
     print(f"Reporte guardado en: {output_file}")
+    if args.shard is not None:
+        print(f"Resumen del shard guardado en: {shard_summary}")
+    if args.metricas:
+        print(f"Métricas guardadas en: {metrics_file}")
+    if profiler is not None:
+        print(f"Perfil guardado en: {profile_file} (ver con: python -m pstats {profile_file})")
     print("="*70)
 
 if __name__ == "__main__":
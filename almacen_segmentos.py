@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import argparse
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import PACKED_DIRECTORY
+from entradas_comprimidas import document_stem
+
+# Formato de un segmento (<almacén>.seg), todos los enteros en little-endian:
+#   CABECERA  magic y versión
+#   REGISTROS por documento, en el orden en que se agregaron: longitud del nombre (u16),
+#             longitud del contenido (u32), nombre y contenido en UTF-8
+# El índice de desplazamientos (<almacén>.idx) es un JSON {nombre: [desplazamiento, longitud]}
+# del contenido de cada documento. El segmento se describe solo, así que el índice
+# se puede reconstruir recorriéndolo (ver rebuild_index()).
+SEGMENT_MAGIC = b"HSEG"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER_FORMAT = "<4sH"
+SEGMENT_HEADER_SIZE = struct.calcsize(SEGMENT_HEADER_FORMAT)
+RECORD_HEADER_FORMAT = "<HI"
+RECORD_HEADER_SIZE = struct.calcsize(RECORD_HEADER_FORMAT)
+
+# Almacenes disponibles y el archivo que cada documento tendría en el formato de directorios
+STORES: Dict[str, Tuple[str, str]] = {
+    "clean": ("Clean_Files", "_clean.txt"),
+    "words": ("Words_Files", "_words.txt"),
+}
+
+def store_paths(store: str, directory: str = PACKED_DIRECTORY) -> Tuple[str, str]:
+    """Retorna las rutas del segmento y de su índice: Packed_Files/clean.seg y clean.idx."""
+    return os.path.join(directory, f"{store}.seg"), os.path.join(directory, f"{store}.idx")
+
+def document_key(filename: str) -> str:
+    """
+    Nombre de un documento dentro de los almacenes: Files/000.html, Files/000.html.gz,
+    Files/crawl.tar::000.html y Clean_Files/000_clean.txt -> 000.
+    """
+    base_name = document_stem(filename)
+    for _, suffix in STORES.values():
+        ending = os.path.splitext(suffix)[0]
+        if base_name.endswith(ending):
+            return base_name[:-len(ending)]
+    return base_name
+
+class SegmentWriter:
+    """
+    Escritor de un almacén empaquetado: agrega cada documento al final de un solo
+    archivo de segmento en lugar de crear un archivo por documento. Escribe en archivos
+    temporales que reemplazan al almacén anterior al cerrar, así que un lector nunca ve
+    un almacén a medias. Si un nombre se agrega dos veces, el índice apunta al último.
+    """
+
+    def __init__(self, store: str, directory: str = PACKED_DIRECTORY):
+        self.segment_path, self.index_path = store_paths(store, directory)
+        os.makedirs(directory, exist_ok=True)
+        self.entries: Dict[str, List[int]] = {}
+        self._file = open(self.segment_path + ".tmp", 'wb')
+        self._file.write(struct.pack(SEGMENT_HEADER_FORMAT, SEGMENT_MAGIC, SEGMENT_VERSION))
+        self._offset = SEGMENT_HEADER_SIZE
+
+    def append(self, name: str, content: str) -> int:
+        """Agrega un documento y retorna los bytes de contenido escritos."""
+        name_bytes = name.encode('utf-8')
+        data = content.encode('utf-8')
+        self._file.write(struct.pack(RECORD_HEADER_FORMAT, len(name_bytes), len(data)))
+        self._file.write(name_bytes)
+        self._file.write(data)
+        data_offset = self._offset + RECORD_HEADER_SIZE + len(name_bytes)
+        self.entries[name] = [data_offset, len(data)]
+        self._offset = data_offset + len(data)
+        return len(data)
+
+    def close(self) -> None:
+        """Cierra el segmento y guarda el índice; ambos reemplazan al almacén anterior."""
+        if self._file.closed:
+            return
+        self._file.close()
+        with open(self.index_path + ".tmp", 'w', encoding='utf-8') as file:
+            json.dump({"version": SEGMENT_VERSION, "entries": self.entries}, file, sort_keys=True)
+        os.replace(self.segment_path + ".tmp", self.segment_path)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+    def __enter__(self) -> "SegmentWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class SegmentReader:
+    """
+    Lector de un almacén empaquetado. El segmento se mapea en memoria (mmap) y el
+    índice se carga completo, así que obtener un documento es una búsqueda en un
+    diccionario más la lectura de sus bytes.
+    """
+
+    def __init__(self, store: str, directory: str = PACKED_DIRECTORY):
+        self.segment_path, self.index_path = store_paths(store, directory)
+        self._file = open(self.segment_path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = struct.unpack_from(SEGMENT_HEADER_FORMAT, self._data, 0)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            self.close()
+            raise ValueError(f"{self.segment_path} no es un segmento válido (versión {SEGMENT_VERSION})")
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                self.entries: Dict[str, List[int]] = json.load(file)["entries"]
+        except (OSError, ValueError, KeyError):
+            self.entries = rebuild_index(self._data)
+
+    def close(self) -> None:
+        self._data.close()
+        self._file.close()
+
+    def __enter__(self) -> "SegmentReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def names(self) -> List[str]:
+        """Retorna los nombres de los documentos en orden alfabético."""
+        return sorted(self.entries)
+
+    def get_bytes(self, name: str) -> Optional[bytes]:
+        """Retorna el contenido de un documento sin decodificar, o None si no está en el almacén."""
+        entry = self.entries.get(name)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._data[offset:offset + length]
+
+    def get(self, name: str) -> Optional[str]:
+        """Retorna el contenido de un documento, o None si no está en el almacén."""
+        data = self.get_bytes(name)
+        return data.decode('utf-8') if data is not None else None
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        """Recorre (nombre, contenido) en orden alfabético."""
+        for name in self.names():
+            yield name, self.get(name)
+
+def rebuild_index(data) -> Dict[str, List[int]]:
+    """Reconstruye el índice recorriendo los registros de un segmento (por ejemplo, si falta el .idx)."""
+    entries: Dict[str, List[int]] = {}
+    position = SEGMENT_HEADER_SIZE
+    while position + RECORD_HEADER_SIZE <= len(data):
+        name_length, data_length = struct.unpack_from(RECORD_HEADER_FORMAT, data, position)
+        position += RECORD_HEADER_SIZE
+        name = data[position:position + name_length].decode('utf-8')
+        position += name_length
+        if position + data_length > len(data):
+            break  # Registro incompleto al final
+        entries[name] = [position, data_length]
+        position += data_length
+    return entries
+
+def export_store(store: str, directory: str = PACKED_DIRECTORY) -> int:
+    """
+    Función para materializar un almacén con el formato de directorios de siempre
+    (Clean_Files/<nombre>_clean.txt o Words_Files/<nombre>_words.txt).
+    Retorna el número de archivos escritos.
+    """
+    output_directory, suffix = STORES[store]
+    os.makedirs(output_directory, exist_ok=True)
+    count = 0
+    with SegmentReader(store, directory) as reader:
+        for name, content in reader.items():
+            with open(os.path.join(output_directory, f"{name}{suffix}"), 'w', encoding='utf-8') as file:
+                file.write(content)
+            count += 1
+    return count
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Almacenes empaquetados de archivos limpios y de palabras")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    export_parser = subparsers.add_parser("exportar", help="Escribir un archivo por documento en Clean_Files/ o Words_Files/")
+    export_parser.add_argument("almacen", choices=list(STORES) + ["todos"])
+    show_parser = subparsers.add_parser("mostrar", help="Mostrar el contenido de un documento")
+    show_parser.add_argument("almacen", choices=list(STORES))
+    show_parser.add_argument("nombre", help="Nombre del documento (por ejemplo, 000 para Files/000.html)")
+    subparsers.add_parser("info", help="Mostrar documentos y tamaño de cada almacén")
+    parser.add_argument("--directorio", default=PACKED_DIRECTORY, help="Directorio de los almacenes")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    if args.comando == "exportar":
+        stores = list(STORES) if args.almacen == "todos" else [args.almacen]
+        for store in stores:
+            if not os.path.exists(store_paths(store, args.directorio)[0]):
+                print(f"Almacén '{store}' omitido: no existe {store_paths(store, args.directorio)[0]}")
+                continue
+            count = export_store(store, args.directorio)
+            print(f"Almacén '{store}': {count} archivos exportados a {STORES[store][0]}/")
+
+    elif args.comando == "mostrar":
+        with SegmentReader(args.almacen, args.directorio) as reader:
+            content = reader.get(document_key(args.nombre))
+        if content is None:
+            print(f"El documento '{args.nombre}' no está en el almacén '{args.almacen}'")
+            sys.exit(1)
+        print(content)
+
+    else:
+        for store in STORES:
+            segment_path = store_paths(store, args.directorio)[0]
+            if not os.path.exists(segment_path):
+                print(f"{store:<8} sin almacén")
+                continue
+            with SegmentReader(store, args.directorio) as reader:
+                print(f"{store:<8} {len(reader)} documentos, {os.path.getsize(segment_path)} bytes en {segment_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import glob
+import random
+import platform
+import argparse
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+from config import PRECISION_DECIMALS
+from estadisticas import percentile
+from metricas import FileMetrics
+from buscador_html import open_file
+from actividad2_html_cleaner import remove_html_tags
+from actividad3_word_extractor import extract_and_sort_words
+
+BENCHMARK_VERSION = 2  # Versión 2: el corpus incluye scripts, estilos, comentarios y entidades
+BENCHMARK_DIRECTORY = "Benchmark_Corpus"  # Directorio de trabajo del benchmark
+DEFAULT_RESULTS_FILE = "benchmark_resultados.json"
+
+# Fragmentos usados por el generador; incluyen acentos para que la mezcla
+# de codificaciones produzca bytes distintos en UTF-8 y Latin-1
+SYLLABLES = ["ca", "sa", "de", "ta", "ma", "lo", "ri", "ne", "po", "tu", "ción", "ñi", "gü", "é", "al", "es", "in"]
+TAGS = ["p", "div", "span", "a", "b", "i", "li", "td", "h2", "em"]
+ATTRIBUTES = ['class="contenido"', 'id="sec-{n}"', 'href="/pagina/{n}.html"', 'style="color: red"']
+# Contenido que no es texto visible: el limpiador con expresiones regulares lo deja en la salida
+NOISE_BLOCKS = [
+    "<script>var total = 0; for (var i = 0; i < datos.length; i++) { total += datos[i].valor; }</script>",
+    "<style>.contenido { margin: 0 auto; font-family: Arial, sans-serif; }</style>",
+    "<!-- bloque generado automáticamente, no editar -->",
+]
+ENTITIES = ["&amp;", "&nbsp;", "&eacute;", "&#241;", "&lt;", "&gt;"]
+NOISE_PROBABILITY = 0.05  # Fracción de etiquetas que se reemplazan por un bloque de NOISE_BLOCKS
+ENTITY_PROBABILITY = 0.03  # Fracción de palabras que se reemplazan por una entidad
+
+def parse_encoding_mix(text: str) -> List[Tuple[str, float]]:
+    """Convierte "utf-8:0.8,latin-1:0.2" en [("utf-8", 0.8), ("latin-1", 0.2)]."""
+    mix: List[Tuple[str, float]] = []
+    for item in text.split(","):
+        encoding, _, weight = item.partition(":")
+        mix.append((encoding.strip(), float(weight) if weight else 1.0))
+    return mix
+
+def generate_document(rng: random.Random, target_size: int, tag_density: float) -> str:
+    """
+    Función para generar un documento HTML sintético.
+    tag_density es la fracción de elementos que son etiquetas en lugar de palabras.
+    """
+    parts = ["<!DOCTYPE html>\n<html><head><title>Documento sintético</title></head>\n<body>\n"]
+    size = len(parts[0])
+    while size < target_size:
+        if rng.random() < tag_density:
+            if rng.random() < NOISE_PROBABILITY:
+                piece = rng.choice(NOISE_BLOCKS)
+            else:
+                tag = rng.choice(TAGS)
+                attribute = rng.choice(ATTRIBUTES).format(n=rng.randint(1, 999))
+                piece = f"<{tag} {attribute}>" if rng.random() < 0.5 else f"</{tag}>"
+        elif rng.random() < ENTITY_PROBABILITY:
+            piece = rng.choice(ENTITIES)
+        else:
+            piece = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+            if rng.random() < 0.1:
+                piece = piece.capitalize()
+        separator = "\n" if rng.random() < 0.05 else " "
+        parts.append(piece + separator)
+        size += len(piece) + 1
+    parts.append("\n</body></html>\n")
+    return "".join(parts)
+
+def generate_corpus(directory: str, num_files: int, average_size: int, tag_density: float,
+                    encoding_mix: List[Tuple[str, float]], seed: int) -> Tuple[int, Dict[str, int]]:
+    """
+    Función para generar un corpus HTML determinista: con la misma semilla y
+    los mismos parámetros se obtienen exactamente los mismos bytes en cualquier máquina.
+    Retorna el total de bytes generados y cuántos archivos hay por codificación.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for old_file in glob.glob(os.path.join(directory, "*.html")):
+        os.remove(old_file)
+
+    encodings = [encoding for encoding, _ in encoding_mix]
+    weights = [weight for _, weight in encoding_mix]
+    total_bytes = 0
+    per_encoding: Dict[str, int] = dict.fromkeys(encodings, 0)
+    for number in range(num_files):
+        target_size = max(256, int(rng.gauss(average_size, average_size * 0.25)))
+        encoding = rng.choices(encodings, weights)[0]
+        data = generate_document(rng, target_size, tag_density).encode(encoding)
+        with open(os.path.join(directory, f"{number:06d}.html"), 'wb') as file:
+            file.write(data)
+        total_bytes += len(data)
+        per_encoding[encoding] += 1
+    return total_bytes, per_encoding
+
+def measure_stage(stage_func: Callable[[str, FileMetrics], float], files: List[str], warmup: int,
+                  iterations: int) -> Dict[str, object]:
+    """
+    Función para medir una etapa sobre todos los archivos.
+    Ejecuta primero las vueltas de calentamiento (no se miden, dejan los archivos en la
+    caché de páginas) y después las vueltas medidas.
+    Retorna archivos/s, MB/s, percentiles de latencia por archivo y bytes de salida.
+    """
+    total_bytes = sum(os.path.getsize(path) for path in files)
+    for _ in range(warmup):
+        for path in files:
+            stage_func(path)
+
+    iteration_times: List[float] = []
+    latencies: List[float] = []
+    errors = 0
+    output_bytes = 0
+    for _ in range(iterations):
+        output_bytes = 0
+        iteration_start = time.perf_counter()
+        for path in files:
+            metrics = FileMetrics(path)
+            file_time = stage_func(path, metrics)
+            output_bytes += metrics.bytes_out
+            if file_time > 0:
+                latencies.append(file_time)
+            else:
+                errors += 1
+        iteration_times.append(time.perf_counter() - iteration_start)
+
+    throughput_files = [len(files) / seconds for seconds in iteration_times if seconds > 0]
+    throughput_mb = [total_bytes / (1024 * 1024) / seconds for seconds in iteration_times if seconds > 0]
+    return {
+        "files": len(files),
+        "bytes": total_bytes,
+        "iterations": iterations,
+        "warmup": warmup,
+        "errors": errors,
+        "output_bytes": output_bytes,
+        "iteration_seconds": iteration_times,
+        "files_per_second": {"median": percentile(throughput_files, 0.50), "min": min(throughput_files, default=0),
+                             "max": max(throughput_files, default=0)},
+        "mb_per_second": {"median": percentile(throughput_mb, 0.50), "min": min(throughput_mb, default=0),
+                          "max": max(throughput_mb, default=0)},
+        "latency_seconds": {"p50": percentile(latencies, 0.50), "p90": percentile(latencies, 0.90),
+                            "p99": percentile(latencies, 0.99), "max": max(latencies, default=0)},
+    }
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, object]:
+    """
+    Función para generar el corpus y medir cada etapa dentro del directorio de trabajo.
+    Las etapas escriben sus salidas (Clean_Files/, Words_Files/) dentro de ese directorio.
+    """
+    encoding_mix = parse_encoding_mix(args.codificaciones)
+    original_directory = os.getcwd()
+    os.makedirs(args.directorio, exist_ok=True)
+    os.chdir(args.directorio)
+    try:
+        total_bytes, per_encoding = generate_corpus("Files", args.archivos, args.tamano * 1024,
+                                                    args.densidad_etiquetas, encoding_mix, args.semilla)
+        html_files = sorted(glob.glob(os.path.join("Files", "*.html")))
+
+        stages: Dict[str, Tuple[Callable[[str], float], Callable[[], List[str]]]] = {
+            "apertura": (open_file, lambda: html_files),
+            "limpieza_regex": (partial(remove_html_tags, cleaner="regex"), lambda: html_files),
+            "limpieza": (partial(remove_html_tags, cleaner="tokenizador"), lambda: html_files),
+            "palabras": (extract_and_sort_words,
+                         lambda: sorted(glob.glob(os.path.join("Clean_Files", "*_clean.txt")))),
+        }
+        results: Dict[str, object] = {}
+        for name in args.etapas:
+            stage_func, list_files = stages[name]
+            files = list_files()
+            if not files:
+                print(f"Etapa '{name}' omitida: no hay archivos de entrada (¿falta la etapa 'limpieza'?)")
+                continue
+            print(f"Midiendo etapa '{name}' ({len(files)} archivos, {args.calentamiento} de calentamiento, "
+                  f"{args.repeticiones} repeticiones)...")
+            results[name] = measure_stage(stage_func, files, args.calentamiento, args.repeticiones)
+    finally:
+        os.chdir(original_directory)
+
+    return {
+        "version": BENCHMARK_VERSION,
+        "date": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "environment": {"python": sys.version.split()[0], "implementation": platform.python_implementation(),
+                        "platform": platform.platform(), "processor": platform.processor(),
+                        "cpus": os.cpu_count()},
+        "corpus": {"files": args.archivos, "average_kb": args.tamano, "tag_density": args.densidad_etiquetas,
+                   "encodings": per_encoding, "seed": args.semilla, "bytes": total_bytes},
+        "stages": results,
+    }
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark reproducible de las tres actividades")
+    parser.add_argument("--archivos", type=int, default=200, help="Número de archivos HTML a generar")
+    parser.add_argument("--tamano", type=int, default=32, help="Tamaño promedio de cada archivo en KB")
+    parser.add_argument("--densidad-etiquetas", type=float, default=0.3,
+                        help="Fracción de elementos que son etiquetas (0 a 1)")
+    parser.add_argument("--codificaciones", default="utf-8:0.8,latin-1:0.2",
+                        help="Mezcla de codificaciones, p. ej. utf-8:0.8,latin-1:0.15,utf-16:0.05")
+    parser.add_argument("--semilla", type=int, default=12345, help="Semilla del generador")
+    parser.add_argument("--calentamiento", type=int, default=1, help="Vueltas de calentamiento (no medidas)")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Vueltas medidas por etapa")
+    parser.add_argument("--etapas", nargs="+", default=["apertura", "limpieza_regex", "limpieza", "palabras"],
+                        choices=["apertura", "limpieza_regex", "limpieza", "palabras"],
+                        help="Etapas a medir, en orden (palabras usa los archivos limpios de la última limpieza)")
+    parser.add_argument("--directorio", default=BENCHMARK_DIRECTORY, help="Directorio de trabajo del benchmark")
+    parser.add_argument("--salida", default=DEFAULT_RESULTS_FILE, help="Archivo JSON de resultados")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    print(f"Generando corpus sintético: {args.archivos} archivos de ~{args.tamano} KB (semilla {args.semilla})")
+
+    results = run_benchmark(args)
+    with open(args.salida, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2, ensure_ascii=False)
+
+    # Mostrar resumen en consola
+    print("\n" + "="*92)
+    print("RESULTADOS DEL BENCHMARK (mediana de las repeticiones):")
+    print("="*92)
+    print(f"{'Etapa':<15} {'Archivos/s':>12} {'MB/s':>10} {'p50 (seg)':>12} {'p90 (seg)':>12} {'p99 (seg)':>12} "
+          f"{'Salida MB':>11}")
+    print("-"*92)
+    for name, stage in results["stages"].items():
+        latency = stage["latency_seconds"]
+        print(f"{name:<15} {stage['files_per_second']['median']:>12.1f} {stage['mb_per_second']['median']:>10.2f} "
+              f"{latency['p50']:>12.{PRECISION_DECIMALS}f} {latency['p90']:>12.{PRECISION_DECIMALS}f} "
+              f"{latency['p99']:>12.{PRECISION_DECIMALS}f} {stage['output_bytes'] / (1024 * 1024):>11.2f}")
+    print("-"*92)
+    print(f"Resultados guardados en: {args.salida}")
+    print("="*92)
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,391 @@
 import os
 import time
-import glob
-from typing import List, Tuple
-from config import MATRICULA, FILES_DIRECTORY, ENCODING, PRECISION_DECIMALS, FALLBACK_ENCODINGS
+import argparse
+from typing import Iterable, List, Optional, Tuple
+from config import MATRICULA, FILES_DIRECTORY, PRECISION_DECIMALS, INDEX_DIRECTORY, INDEX_FILENAME
+from config import IO_BENCHMARK_REPETITIONS, MAX_PREFIX_EXPANSIONS
+from cache_incremental import BuildCache, split_cached
+from lector_archivos import encoding_histogram, load_text
+from indice_invertido import IndexReader
+from motor_busqueda import QuerySyntaxError, SearchEngine
+from estadisticas import ReportStatistics, ResultCollector, latency_report_lines, percentile
+from metricas import FileMetrics, METRICS_FORMATS, metrics_path, write_metrics
+from perfilado import Profiler, profile_path
+from estrategias_lectura import COLD_CACHE_SUPPORTED, compare_strategies
+from particionado import iter_shard, parse_shard, shard_cache_name, shard_report_path, write_shard_summary
+from entradas_comprimidas import DuplicateDocumentError, decompression_report_lines, input_name, scan_input_files, source_path
+from descubrimiento_archivos import peek
 
-def open_file(filename: str) -> float:
+def open_file(filename: str, metrics: Optional[FileMetrics] = None) -> float:
     """
     Función para abrir un archivo HTML de manera eficiente.
-    Recibe como parámetro el nombre del archivo.
+    Recibe como parámetro el nombre del archivo y, opcionalmente, las métricas
+    donde se registran subetapas, bytes leídos, codificación y errores.
     Retorna el tiempo que tardó en abrir el archivo.
     """
     start_time = time.perf_counter()
     
-    content = None
-    
-    # Intentar abrir con UTF-8 primero
+    # Una sola lectura y una sola decodificación (ver lector_archivos.py)
     try:
-        with open(filename, 'r', encoding=ENCODING) as file:
-            content = file.read()
-    except UnicodeDecodeError:
-        # Si falla UTF-8, intentar con codificaciones alternativas
-        for encoding in FALLBACK_ENCODINGS:
-            try:
-                with open(filename, 'r', encoding=encoding) as file:
-                    content = file.read()
-                    break
-            except (UnicodeDecodeError, UnicodeError):
-                continue
+        content, _, _ = load_text(filename, metrics=metrics)
     except Exception as e:
         print(f"Error al abrir {filename}: {e}")
+        if metrics is not None:
+            metrics.fail(f"Error al abrir: {e}")
         return 0
     
     if content is None:
         print(f"No se pudo decodificar {filename} con ninguna codificación")
+        if metrics is not None:
+            metrics.fail("No se pudo decodificar con ninguna codificación")
         return 0
     
     end_time = time.perf_counter()
     return end_time - start_time
 
-def main() -> None:
+def run_query(engine: SearchEngine, query: str, top: int) -> None:
+    """
+    Función para ejecutar una consulta y mostrar los documentos encontrados.
+    """
+    start_time = time.perf_counter()
+    try:
+        results = engine.search(query)
+    except QuerySyntaxError as e:
+        print(f"Error en la consulta '{query}': {e}")
+        return
+    query_time = time.perf_counter() - start_time
+    
+    print(f"Consulta: {query}")
+    print(f"Documentos encontrados: {len(results)} en {query_time:.{PRECISION_DECIMALS}f} segundos")
+    print("-" * 40)
+    for position, (document, score) in enumerate(results[:top], start=1):
+        print(f"{position:>4}. {document + '.html':<20} puntaje: {score:.4f}")
+    if len(results) > top:
+        print(f"... ({len(results) - top} documentos más)")
+    for prefix in engine.truncated_prefixes:
+        print(f"Aviso: {prefix} se expandió solo a sus primeros {MAX_PREFIX_EXPANSIONS} términos; "
+              f"los resultados pueden estar incompletos")
+
+def run_query_batch(engine: SearchEngine, queries_file: str, matricula: str) -> None:
+    """
+    Función para ejecutar un lote de consultas (una por línea) y medir el rendimiento.
+    Reporta consultas por segundo y las latencias p50 y p99.
+    """
+    with open(queries_file, 'r', encoding='utf-8') as file:
+        queries = [line.strip() for line in file if line.strip()]
+    if not queries:
+        print(f"No se encontraron consultas en {queries_file}")
+        return
+    
+    output_file = f"busqueda_{matricula}.txt"
+    latencies: List[float] = []
+    results: List[Tuple[str, int, float]] = []
+    truncated_queries: List[Tuple[str, List[str]]] = []  # Consultas con prefijos truncados
+    errors = 0
+    
+    batch_start_time = time.perf_counter()
+    for query in queries:
+        start_time = time.perf_counter()
+        try:
+            found = len(engine.search(query))
+        except QuerySyntaxError as e:
+            print(f"Error en la consulta '{query}': {e}")
+            errors += 1
+            continue
+        query_time = time.perf_counter() - start_time
+        latencies.append(query_time)
+        results.append((query, found, query_time))
+        if engine.truncated_prefixes:
+            truncated_queries.append((query, engine.truncated_prefixes))
+    batch_time = time.perf_counter() - batch_start_time
+    
+    queries_per_second = len(latencies) / batch_time if batch_time > 0 else 0
+    p50 = percentile(latencies, 0.50)
+    p99 = percentile(latencies, 0.99)
+    
+    # Generar reporte
+    with open(output_file, 'w', encoding='utf-8') as log_file:
+        log_file.write("="*70 + "\n")
+        log_file.write("REPORTE DE RENDIMIENTO DE CONSULTAS\n")
+        log_file.write("="*70 + "\n")
+        log_file.write(f"Matrícula: {matricula}\n")
+        log_file.write(f"Fecha: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        log_file.write(f"Documentos en el índice: {engine.reader.num_docs}\n")
+        log_file.write(f"Términos en el índice: {engine.reader.num_terms}\n")
+        log_file.write(f"Consultas ejecutadas: {len(latencies)} ({errors} con errores)\n")
+        log_file.write("="*70 + "\n\n")
+        
+        log_file.write(f"{'Consulta':<40} {'Docs':<8} {'Tiempo (seg)':<15}\n")
+        log_file.write("-"*65 + "\n")
+        for query, found, query_time in results:
+            log_file.write(f"{query:<40} {found:<8} {query_time:<15.{PRECISION_DECIMALS}f}\n")
+        log_file.write("-"*65 + "\n")
+        if truncated_queries:
+            log_file.write(f"\nPREFIJOS TRUNCADOS (más de {MAX_PREFIX_EXPANSIONS} términos; resultados incompletos):\n")
+            for query, prefixes in truncated_queries:
+                log_file.write(f"{query:<40} {', '.join(prefixes)}\n")
+        
+        log_file.write(f"\nESTADÍSTICAS:\n")
+        log_file.write(f"Tiempo total: {batch_time:.{PRECISION_DECIMALS}f} segundos\n")
+        log_file.write(f"Consultas por segundo: {queries_per_second:.1f}\n")
+        log_file.write(f"Latencia p50: {p50:.{PRECISION_DECIMALS}f} segundos\n")
+        log_file.write(f"Latencia p99: {p99:.{PRECISION_DECIMALS}f} segundos\n")
+        log_file.write("\n" + "="*70 + "\n")
+        log_file.write("FIN DEL REPORTE\n")
+        log_file.write("="*70 + "\n")
+    
+    print("\n" + "="*50)
+    print("RENDIMIENTO DE CONSULTAS:")
+    print("="*50)
+    print(f"Consultas ejecutadas: {len(latencies)} ({errors} con errores)")
+    if truncated_queries:
+        print(f"Consultas con prefijos truncados: {len(truncated_queries)} (ver el reporte)")
+    print(f"Consultas por segundo: {queries_per_second:.1f}")
+    print(f"Latencia p50: {p50:.{PRECISION_DECIMALS}f} segundos")
+    print(f"Latencia p99: {p99:.{PRECISION_DECIMALS}f} segundos")
+    print(f"Reporte guardado en: {output_file}")
+    print("="*50)
+
+def search_mode(args: argparse.Namespace) -> None:
+    """
+    Modo de búsqueda: abre el índice invertido (mapeado en memoria) y ejecuta
+    la consulta indicada o el lote de consultas.
+    """
+    if not os.path.exists(args.indice):
+        print(f"Error: No se encontró el índice {args.indice}")
+        print("Primero genera Words_Files/ (Actividad 3 o pipeline_fusionado.py) y ejecuta indice_invertido.py")
+        return
+    
+    with IndexReader(args.indice) as reader:
+        engine = SearchEngine(reader)
+        if args.consultas:
+            run_query_batch(engine, args.consultas, MATRICULA)
+        else:
+            run_query(engine, args.buscar, args.top)
+
+def strategy_mode(args: argparse.Namespace) -> None:
+    """
+    Modo de comparación de estrategias de lectura: mide el mismo conjunto de archivos
+    con cada estrategia de estrategias_lectura.py, en caché caliente y fría, y reporta
+    MB/s y percentiles de latencia por archivo.
+    Las entradas son las mismas de los otros modos (scan_input_files); como las estrategias
+    miden la lectura del disco, cada archivo comprimido o tar se lee una vez, tal como está guardado.
+    """
+    inputs: List[str] = list(scan_input_files(FILES_DIRECTORY))
+    html_files: List[str] = list(dict.fromkeys(source_path(path) for path in inputs))
+    if not html_files:
+        print(f"No se encontraron archivos HTML en {FILES_DIRECTORY}")
+        return
+    
+    total_bytes = sum(os.path.getsize(path) for path in html_files)
+    print(f"Comparando estrategias de lectura con {len(inputs)} entradas en {len(html_files)} archivos "
+          f"({total_bytes / (1024 * 1024):.2f} MB)")
+    if not COLD_CACHE_SUPPORTED:
+        print("Este sistema no tiene posix_fadvise: solo se mide en caché caliente")
+    results = compare_strategies(html_files, args.repeticiones)
+    
+    # Generar reporte
+    output_file = f"lectura_{MATRICULA}.txt"
+    with open(output_file, 'w', encoding='utf-8') as log_file:
+        log_file.write("="*92 + "\n")
+        log_file.write("REPORTE DE ESTRATEGIAS DE LECTURA\n")
+        log_file.write("="*92 + "\n")
+        log_file.write(f"Matrícula: {MATRICULA}\n")
+        log_file.write(f"Fecha: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        log_file.write(f"Entradas: {len(inputs)} en {len(html_files)} archivos ({total_bytes} bytes en disco)\n")
+        log_file.write(f"Repeticiones por estrategia: {args.repeticiones}\n")
+        log_file.write("="*92 + "\n\n")
+        
+        log_file.write(f"{'Estrategia':<20} {'Caché':<10} {'MB/s':>10} {'p50 (seg)':>12} {'p90 (seg)':>12} "
+                       f"{'p99 (seg)':>12} {'Errores':>8}\n")
+        log_file.write("-"*92 + "\n")
+        for name, condition, stats in results:
+            log_file.write(f"{name:<20} {condition:<10} {stats['mb_per_second']:>10.1f} "
+                           f"{stats['p50']:>12.{PRECISION_DECIMALS}f} {stats['p90']:>12.{PRECISION_DECIMALS}f} "
+                           f"{stats['p99']:>12.{PRECISION_DECIMALS}f} {stats['errors']:>8}\n")
+        log_file.write("-"*92 + "\n")
+        
+        log_file.write(f"\nMÁS RÁPIDA POR CONDICIÓN (MB/s):\n")
+        for condition in dict.fromkeys(condition for _, condition, _ in results):
+            name, _, stats = max((result for result in results if result[1] == condition),
+                                 key=lambda result: result[2]["mb_per_second"])
+            log_file.write(f"Caché {condition:<10} {name} ({stats['mb_per_second']:.1f} MB/s)\n")
+        
+        log_file.write("\nNOTAS:\n")
+        log_file.write("- 'texto' incluye la decodificación con reintento por codificación; las demás solo leen bytes\n")
+        log_file.write("- 'mmap' recorre el mapa completo para forzar la lectura de todas las páginas\n")
+        log_file.write("- Los archivos comprimidos y los tar se leen como están en disco, sin descomprimir\n")
+        log_file.write("  (la descompresión aparece en la sección ENTRADAS COMPRIMIDAS de los reportes a1_/a2_)\n")
+        log_file.write("- En caché fría cada archivo se descarta con posix_fadvise(DONTNEED) antes de leerlo;\n")
+        log_file.write("  el sistema puede ignorarlo (por ejemplo, en algunos sistemas de archivos de red)\n")
+        log_file.write("\n" + "="*92 + "\n")
+        log_file.write("FIN DEL REPORTE\n")
+        log_file.write("="*92 + "\n")
+    
+    print(f"Reporte guardado en: {output_file}")
+
+def add_result(stats: ReportStatistics, result: Tuple[str, float, Optional[str], str]) -> None:
+    """
+    Agrega un resultado (archivo, tiempo, codificación, estado) a las estadísticas; los
+    fallidos cuentan con tiempo 0. Como en la suma individual, los aciertos de caché no
+    cuentan para el promedio, el máximo ni el mínimo: su tiempo es de una ejecución anterior.
+    """
+    _, file_time, encoding, status = result
+    stats.add(file_time, file_time > 0, encoding, timed=status != "Caché")
+
+def write_timing_sections(log_file, results: ResultCollector,
+                          total_individual_time: float, total_program_time: float) -> None:
+    """
+    Función para escribir las secciones de tiempos individuales, totales, estadísticas y
+    codificaciones del reporte a1_ (también la usa la fusión de shards de particionado.py).
+    """
+    stats = results.stats
+    log_file.write("TIEMPOS INDIVIDUALES:\n")
+    log_file.write("-"*40 + "\n")
+    log_file.write(f"{'Archivo':<15} {'Tiempo (seg)':<15}\n")
+    log_file.write("-"*40 + "\n")
+    
+    if results.keep_rows:
+        for filename, file_time, _, _ in results.rows:
+            log_file.write(f"{filename:<15} {file_time:<15.{PRECISION_DECIMALS}f}\n")
+    else:
+        log_file.write(f"(detalle de {stats.files} archivos omitido con --sin-detalle)\n")
+    
+    log_file.write("-"*40 + "\n")
+    log_file.write(f"{'TOTALES:':<15}\n")
+    log_file.write(f"{'Suma individual:':<15} {total_individual_time:<15.{PRECISION_DECIMALS}f}\n")
+    log_file.write(f"{'Tiempo programa:':<15} {total_program_time:<15.{PRECISION_DECIMALS}f}\n")
+    log_file.write("-"*40 + "\n")
+    
+    # Estadísticas adicionales (acumuladas archivo por archivo, en memoria constante)
+    if stats.files:
+        if stats.times.count:
+            log_file.write(f"\nESTADÍSTICAS:\n")
+            log_file.write(f"Tiempo promedio: {stats.times.mean:.{PRECISION_DECIMALS}f} segundos\n")
+            log_file.write(f"Tiempo máximo: {stats.times.maximum:.{PRECISION_DECIMALS}f} segundos\n")
+            log_file.write(f"Tiempo mínimo: {stats.times.minimum:.{PRECISION_DECIMALS}f} segundos\n")
+            log_file.writelines(latency_report_lines(stats.times))
+        
+        log_file.write(f"\nCODIFICACIONES DETECTADAS:\n")
+        for encoding, count in encoding_histogram(stats.encodings.elements()):
+            log_file.write(f"{encoding:<15} {count} archivos\n")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Actividad 1 - Medición de tiempos de apertura y búsqueda")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Medir solo los archivos que cambiaron desde la última ejecución")
+    parser.add_argument("--buscar", metavar="CONSULTA",
+                        help="Buscar en el índice, p. ej. \"automata AND (state OR stat*) NOT regex\"")
+    parser.add_argument("--consultas", metavar="ARCHIVO",
+                        help="Ejecutar un lote de consultas (una por línea) y medir consultas/segundo y latencias")
+    parser.add_argument("--indice", default=os.path.join(INDEX_DIRECTORY, INDEX_FILENAME),
+                        help="Ruta del índice invertido")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Número de documentos a mostrar por consulta")
+    parser.add_argument("--metricas", choices=METRICS_FORMATS,
+                        help="Exportar métricas por archivo (JSON lines o CSV) junto al reporte")
+    parser.add_argument("--estrategias", action="store_true",
+                        help="Comparar estrategias de lectura (texto, binario, os.read, readinto, mmap) en caché caliente y fría")
+    parser.add_argument("--repeticiones", type=int, default=IO_BENCHMARK_REPETITIONS,
+                        help="Vueltas medidas por estrategia con --estrategias")
+    parser.add_argument("--perfil", action="store_true",
+                        help="Perfilar la medición (cProfile y tracemalloc) y guardar los datos crudos en a1_<matrícula>.prof")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N",
+                        help="Procesar solo el shard i de N (partición estable por nombre); ver fusion_shards.py")
+    parser.add_argument("--sin-detalle", action="store_true",
+                        help="Omitir la tabla de tiempos por archivo del reporte (memoria constante con millones de archivos)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    
+    if args.buscar or args.consultas:
+        search_mode(args)
+        return
+    if args.estrategias:
+        strategy_mode(args)
+        return
+    
     # Configuración
     files_directory: str = FILES_DIRECTORY
     matricula: str = MATRICULA
-    output_file: str = f"a1_{matricula}.txt"
+    output_file: str = shard_report_path(f"a1_{matricula}.txt", args.shard)
+    cache: Optional[BuildCache] = BuildCache(shard_cache_name("a1", args.shard)) if args.incremental else None
+    profiler: Optional[Profiler] = Profiler() if args.perfil else None
     
     # Verificar que existe el directorio Files
     if not os.path.exists(files_directory):
         print(f"Error: No se encontró el directorio {files_directory}")
         return
     
-    # Obtener todos los archivos HTML del directorio Files
-    html_files: List[str] = glob.glob(os.path.join(files_directory, "*.html"))
-    html_files.sort()  # Ordenar alfabéticamente
+    # Obtener los archivos HTML del directorio Files (también comprimidos o dentro de un tar).
+    # --incremental necesita la lista completa; si no, los archivos se miden conforme se
+    # descubren (sin esperar a listar el directorio) y el reporte se ordena al final
+    discover_lazily: bool = not args.incremental
+    html_files: Optional[Iterable[str]] = peek(scan_input_files(files_directory, ordered=not discover_lazily))
     
-    if not html_files:
+    if html_files is None:
         print(f"No se encontraron archivos HTML en {files_directory}")
         return
     
-    print(f"Encontrados {len(html_files)} archivos HTML")
+    # Con --shard solo se procesan los archivos de este shard (un shard puede quedar vacío)
+    html_files = peek(iter_shard(html_files, args.shard))
+    if html_files is None:
+        print(f"El shard {args.shard[0]}/{args.shard[1]} no tiene archivos")
+        write_shard_summary(output_file, "a1", args.shard, [], 0, 0, 0, 1)
+        return
+    
+    if discover_lazily:
+        print(f"Midiendo los archivos HTML de {files_directory} conforme se encuentran")
+    else:
+        html_files = list(html_files)
+        print(f"Encontrados {len(html_files)} archivos HTML")
     print("Iniciando medición de tiempos...")
     
-    # Variables para almacenar resultados
-    results: List[Tuple[str, float]] = []
+    # Variables para almacenar resultados (las filas por archivo solo si se reportan o las necesita el shard)
+    results = ResultCollector(add_result, keep_rows=not args.sin_detalle or args.shard is not None,
+                              keep_records=args.metricas is not None)
     total_individual_time: float = 0
     
     # Medir tiempo total del programa
     program_start_time: float = time.perf_counter()
+    if profiler is not None:
+        profiler.start()
+    
+    # Con --incremental solo se miden los archivos que cambiaron
+    pending_files: Iterable[str] = html_files
+    if cache is not None:
+        cache.collect_garbage(html_files)
+        cached_results, pending_files = split_cached(cache, html_files)
+        for filename, file_time, status, _, encoding, record in cached_results:
+            results.append((filename, file_time, encoding, status), record)
+            print(f"En caché: {filename} - Tiempo previo: {file_time:.{PRECISION_DECIMALS}f} segundos")
     
     # Procesar cada archivo HTML
-    for html_file in html_files:
-        filename: str = os.path.basename(html_file)
-        file_time: float = open_file(html_file)
+    for html_file in pending_files:
+        filename: str = input_name(html_file)
+        metrics = FileMetrics(filename)
+        file_time: float = open_file(html_file, metrics)
         total_individual_time += file_time
-        results.append((filename, file_time))
+        results.append((filename, file_time, metrics.encoding, "Exitoso" if file_time > 0 else "Error"),
+                       metrics.to_dict(file_time))
+        if cache is not None:
+            if file_time > 0:
+                cache.store(html_file, [], file_time, encoding=metrics.encoding)
+            else:
+                cache.discard(html_file)
         print(f"Procesado: {filename} - Tiempo: {file_time:.{PRECISION_DECIMALS}f} segundos")
     
+    if cache is not None:
+        cache.save()
+    if cache is not None or discover_lazily:
+        results.sort()
+    # Cada archivo (medido o en caché) deja un resultado
+    total_files: int = results.stats.files
+    
     # Tiempo total del programa
+    if profiler is not None:
+        profiler.stop()
     program_end_time: float = time.perf_counter()
     total_program_time: float = program_end_time - program_start_time
     
@@ -86,48 +396,59 @@ def main() -> None:
         log_file.write("="*60 + "\n")
         log_file.write(f"Matrícula: {matricula}\n")
         log_file.write(f"Fecha: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-        log_file.write(f"Total de archivos procesados: {len(html_files)}\n")
+        log_file.write(f"Total de archivos procesados: {total_files}\n")
+        if cache is not None:
+            log_file.write(f"Caché incremental: {cache.hits} aciertos, {cache.misses} fallos\n")
+            log_file.write("(los aciertos muestran el tiempo de su última medición)\n")
         log_file.write("="*60 + "\n\n")
         
-        log_file.write("TIEMPOS INDIVIDUALES:\n")
-        log_file.write("-"*40 + "\n")
-        log_file.write(f"{'Archivo':<15} {'Tiempo (seg)':<15}\n")
-        log_file.write("-"*40 + "\n")
-        
-        for filename, file_time in results:
-            log_file.write(f"{filename:<15} {file_time:<15.{PRECISION_DECIMALS}f}\n")
+        write_timing_sections(log_file, results, total_individual_time, total_program_time)
+        log_file.writelines(decompression_report_lines(results.stats))
         
-        log_file.write("-"*40 + "\n")
-        log_file.write(f"{'TOTALES:':<15}\n")
-        log_file.write(f"{'Suma individual:':<15} {total_individual_time:<15.{PRECISION_DECIMALS}f}\n")
-        log_file.write(f"{'Tiempo programa:':<15} {total_program_time:<15.{PRECISION_DECIMALS}f}\n")
-        log_file.write("-"*40 + "\n")
-        
-        # Estadísticas adicionales
-        if results:
-            times: List[float] = [result[1] for result in results]
-            avg_time: float = sum(times) / len(times)
-            max_time: float = max(times)
-            min_time: float = min(times)
-            
-            log_file.write(f"\nESTADÍSTICAS:\n")
-            log_file.write(f"Tiempo promedio: {avg_time:.{PRECISION_DECIMALS}f} segundos\n")
-            log_file.write(f"Tiempo máximo: {max_time:.{PRECISION_DECIMALS}f} segundos\n")
-            log_file.write(f"Tiempo mínimo: {min_time:.{PRECISION_DECIMALS}f} segundos\n")
+        if profiler is not None:
+            log_file.writelines(profiler.report_lines())
+            log_file.write("Nota: tracemalloc hace más lenta la ejecución con --perfil\n")
         
         log_file.write("\n" + "="*60 + "\n")
         log_file.write("FIN DEL REPORTE\n")
         log_file.write("="*60 + "\n")
     
+    # Con --shard, guardar el resumen que usa fusion_shards.py
+    if args.shard is not None:
+        shard_summary = write_shard_summary(output_file, "a1", args.shard, results.rows, total_files,
+                                            total_individual_time, total_program_time, 1, stats=results.stats)
+    
+    # Exportar métricas por archivo
+    if args.metricas:
+        metrics_file = metrics_path(output_file, args.metricas)
+        write_metrics(results.records, metrics_file, args.metricas, "a1")
+    
+    # Guardar el perfil crudo para visores externos
+    if profiler is not None:
+        profile_file = profile_path(output_file)
+        profiler.dump(profile_file)
+    
     # Mostrar resumen en consola
     print("\n" + "="*50)
     print("RESUMEN DE RESULTADOS:")
     print("="*50)
-    print(f"Archivos procesados: {len(html_files)}")
+    print(f"Archivos procesados: {total_files}")
     print(f"Tiempo total (suma individual): {total_individual_time:.{PRECISION_DECIMALS}f} segundos")
     print(f"Tiempo total del programa: {total_program_time:.{PRECISION_DECIMALS}f} segundos")
+    if cache is not None:
+        print(f"Caché incremental: {cache.hits} aciertos, {cache.misses} fallos")
     print(f"Reporte guardado en: {output_file}")
+    if args.shard is not None:
+        print(f"Resumen del shard guardado en: {shard_summary}")
+    if args.metricas:
+        print(f"Métricas guardadas en: {metrics_file}")
+    if profiler is not None:
+        print(f"Perfil guardado en: {profile_file} (ver con: python -m pstats {profile_file})")
     print("="*50)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except DuplicateDocumentError as e:
+        # Se detecta al descubrir la entrada repetida, antes de escribir su salida
+        raise SystemExit(f"Error: {e}")
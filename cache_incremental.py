@@ -0,0 +1,155 @@
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional, Tuple
+from config import CACHE_DIRECTORY
+from procesamiento_paralelo import FileResult
+from metricas import cached_record
+from entradas_comprimidas import input_name, source_path
+
+MANIFEST_VERSION = 1
+HASH_BLOCK_SIZE = 1024 * 1024  # Bloques de 1 MB para calcular el hash
+
+def hash_file(filename: str) -> str:
+    """
+    Función para calcular el hash SHA-256 del contenido de un archivo.
+    Lee por bloques para no cargar el archivo completo en memoria.
+    """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class BuildCache:
+    """
+    Manifiesto persistente para reconstrucciones incrementales.
+    Guarda por cada archivo de entrada su tamaño, mtime, hash de contenido,
+    las salidas derivadas y el último resultado, en CACHE_DIRECTORY/<nombre>_manifest.json.
+    settings son las opciones que cambian las salidas; si difieren de las guardadas,
+    todas las entradas se consideran fallos. Los miembros de un tar se comparan con el
+    tamaño, mtime y hash del tar completo: si el tar cambia, se reprocesan todos.
+    """
+
+    def __init__(self, name: str, directory: str = CACHE_DIRECTORY, settings: Optional[dict] = None):
+        self.path = os.path.join(directory, f"{name}_manifest.json")
+        self.settings = settings or {}
+        self.entries: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.removed_outputs = 0
+        self._pending: Dict[str, Tuple[int, int, str]] = {}
+        self._digests: Dict[str, str] = {}  # Hash por archivo en disco: un tar se lee una sola vez
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == MANIFEST_VERSION and data.get("settings", {}) == self.settings:
+            self.entries = data.get("entries", {})
+
+    def save(self) -> None:
+        """Guarda el manifiesto de forma atómica (archivo temporal + reemplazo)."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({"version": MANIFEST_VERSION, "settings": self.settings, "entries": self.entries}, file,
+                      indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def lookup(self, input_path: str) -> Optional[dict]:
+        """
+        Función para consultar si un archivo de entrada no ha cambiado.
+        Primero compara tamaño y mtime; solo si difieren calcula el hash.
+        Retorna la entrada del manifiesto si es un acierto, o None si hay que reprocesar.
+        """
+        try:
+            stat = os.stat(source_path(input_path))
+        except OSError:
+            self.misses += 1
+            return None
+
+        entry = self.entries.get(input_path)
+        outputs_present = entry is not None and all(os.path.exists(output) for output in entry["outputs"])
+
+        if outputs_present and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            self.hits += 1
+            return entry
+
+        digest = self._digest(input_path)
+        if outputs_present and entry["sha256"] == digest:
+            # Mismo contenido con otro mtime (p. ej. el archivo se copió): actualizar y reutilizar
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self.hits += 1
+            return entry
+
+        self._pending[input_path] = (stat.st_size, stat.st_mtime_ns, digest)
+        self.misses += 1
+        return None
+
+    def _digest(self, input_path: str) -> str:
+        source = source_path(input_path)
+        if source not in self._digests:
+            self._digests[source] = hash_file(source)
+        return self._digests[source]
+
+    def store(self, input_path: str, outputs: List[str], file_time: float, word_count: int = 0,
+              encoding: Optional[str] = None) -> None:
+        """Registra el resultado de un archivo recién procesado con éxito."""
+        fingerprint = self._pending.pop(input_path, None)
+        if fingerprint is None:
+            stat = os.stat(source_path(input_path))
+            fingerprint = (stat.st_size, stat.st_mtime_ns, self._digest(input_path))
+        size, mtime_ns, digest = fingerprint
+        self.entries[input_path] = {
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "sha256": digest,
+            "outputs": outputs,
+            "time": file_time,
+            "words": word_count,
+            "encoding": encoding,
+        }
+
+    def discard(self, input_path: str) -> None:
+        """Olvida un archivo cuyo procesamiento falló, para reintentarlo la próxima vez."""
+        self._pending.pop(input_path, None)
+        self.entries.pop(input_path, None)
+
+    def collect_garbage(self, input_paths: List[str]) -> int:
+        """
+        Función para eliminar las salidas de entradas que ya no existen.
+        Retorna el número de archivos de salida eliminados.
+        """
+        current = set(input_paths)
+        removed = 0
+        for input_path in [path for path in self.entries if path not in current]:
+            for output in self.entries.pop(input_path)["outputs"]:
+                try:
+                    os.remove(output)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        self.removed_outputs += removed
+        return removed
+
+def split_cached(cache: BuildCache, paths: List[str]) -> Tuple[List[FileResult], List[str]]:
+    """
+    Función para separar las entradas sin cambios de las que hay que reprocesar.
+    Retorna los resultados guardados de los aciertos y la lista de rutas pendientes.
+    """
+    cached_results: List[FileResult] = []
+    pending: List[str] = []
+    for path in paths:
+        entry = cache.lookup(path)
+        if entry is None:
+            pending.append(path)
+        else:
+            filename = input_name(path)
+            cached_results.append((filename, entry["time"], "Caché", entry["words"], entry.get("encoding"),
+                                   cached_record(filename, entry.get("encoding"))))
+    return cached_results, pending
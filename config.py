@@ -13,3 +13,70 @@ PRECISION_DECIMALS = 6  # Número de decimales para mostrar tiempos
 
 # Codificaciones alternativas a intentar si UTF-8 falla
 FALLBACK_ENCODINGS = ["latin-1", "cp1252", "iso-8859-1"]
+
+# Configuración de procesamiento paralelo
+DEFAULT_WORKERS = 1  # Número de procesos por defecto (0 = todos los núcleos)
+PARALLEL_CHUNKS_PER_WORKER = 4  # Bloques de archivos que recibe cada proceso
+LAZY_CHUNK_FILES = 16  # Archivos por bloque cuando se procesan conforme se descubren
+
+# Método de limpieza de HTML: "regex" (eliminación original de etiquetas) o "tokenizador"
+# (una pasada; descarta scripts, estilos y comentarios y decodifica entidades). En benchmark.py
+# el tokenizador no gana con archivos de 8 KB y solo gana por poco desde 64 KB, así que se
+# elige explícitamente cuando se quiere su salida más limpia
+DEFAULT_CLEANER = "regex"
+
+# Configuración de reconstrucción incremental
+CACHE_DIRECTORY = ".cache"  # Directorio donde se guardan los manifiestos de caché
+
+# Configuración de procesamiento por bloques (archivos muy grandes)
+STREAM_CHUNK_SIZE = 1024 * 1024  # Caracteres leídos por bloque
+STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024  # Archivos más grandes se procesan por bloques
+
+# Configuración del índice invertido
+INDEX_DIRECTORY = "Index_Files"  # Directorio donde se guarda el índice
+INDEX_FILENAME = "indice.bin"  # Nombre del archivo binario del índice
+INDEX_MERGE_FAN_IN = 256  # Archivos abiertos a la vez al mezclar (más archivos se mezclan por pasadas)
+MAX_PREFIX_EXPANSIONS = 1000  # Máximo de términos a los que se expande una consulta con prefijo (palabra*)
+
+# Configuración de frecuencias de palabras (Actividad 3)
+TOP_WORDS = 10  # Palabras más frecuentes a reportar por archivo y en todo el corpus
+MMAP_WINDOW_BYTES = 256 * 1024  # Bytes del archivo mapeado que se tokenizan de una vez (ruta rápida ASCII)
+
+# Configuración del modo vigilancia (modo_vigilancia.py)
+WATCH_POLL_INTERVAL = 0.25  # Segundos entre sondeos del directorio
+WATCH_LATENCY_WINDOW = 1000  # Latencias recientes usadas para los percentiles del reporte
+
+# Configuración del almacenamiento empaquetado (--empaquetado, almacen_segmentos.py)
+PACKED_DIRECTORY = "Packed_Files"  # Directorio de los segmentos y sus índices
+
+# Configuración de detección de duplicados (--duplicados, duplicados.py)
+SHINGLE_SIZE = 3  # Palabras por shingle
+MINHASH_SIZE = 64  # Posiciones de la firma MinHash
+LSH_BANDS = 16  # Bandas LSH (MINHASH_SIZE / LSH_BANDS posiciones por banda)
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Similitud de Jaccard estimada mínima para considerar casi duplicados
+REPORTED_DUPLICATE_GROUPS = 20  # Grupos de duplicados que se listan en los reportes
+
+# Configuración del perfil de ejecución (--perfil, perfilado.py)
+PROFILE_TOP_FUNCTIONS = 25  # Funciones con más tiempo propio que se listan en el reporte
+PROFILE_TOP_ALLOCATIONS = 10  # Líneas con más memoria asignada que se listan en el reporte
+PROFILE_SNAPSHOT_STAGES = 20  # Ejecuciones de cada subetapa que se comparan con instantáneas de tracemalloc
+
+# Configuración de la comparación de estrategias de lectura (buscador_html.py --estrategias)
+IO_BUFFER_SIZES = [64 * 1024, 1024 * 1024]  # Tamaños de bloque para os.read() en bloques
+IO_BENCHMARK_REPETITIONS = 3  # Vueltas medidas por estrategia y condición de caché
+
+# Configuración de las estadísticas de los reportes (estadisticas.py)
+HISTOGRAM_BUCKETS_PER_DECADE = 100  # Cubetas logarítmicas por potencia de 10 (error relativo de los percentiles < 2.4%)
+HISTOGRAM_BAR_WIDTH = 40  # Caracteres de la barra más larga del histograma
+
+# Configuración de la lectura anticipada (--precarga, lectura_anticipada.py)
+PREFETCH_DEPTH = 8  # Archivos leídos por adelantado con --precarga sin número
+PREFETCH_MAX_BYTES = 16 * 1024 * 1024  # Archivos más grandes solo reciben la sugerencia WILLNEED
+PREFETCH_BLOCK_SIZE = 1024 * 1024  # Bytes por lectura del hilo de precarga (búfer reutilizado)
+
+# Configuración del escritor asíncrono (--escritura-asincrona, escritor_asincrono.py)
+WRITER_QUEUE_SIZE = 64  # Salidas pendientes antes de que el procesamiento espere al escritor
+WRITER_BATCH_FILES = 32  # Salidas que el escritor toma de la cola en cada lote
+WRITER_BUFFER_SIZE = 1024 * 1024  # Búfer de cada archivo de salida (bytes)
+FSYNC_POLICIES = ["nunca", "archivo", "lote"]  # nunca, fsync de cada archivo, o de todos al terminar cada lote
+DEFAULT_FSYNC = "nunca"
@@ -0,0 +1,37 @@
+import os
+import itertools
+from typing import Callable, Iterable, Iterator, Optional
+
+def _scan(directory: str, accept: Callable[[str], bool]) -> Iterator[str]:
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # Los archivos ocultos se omiten, igual que con glob("*")
+            # is_file() usa el tipo que ya trae la entrada del directorio: no hace un stat por archivo
+            if not entry.name.startswith(".") and accept(entry.name) and entry.is_file():
+                yield entry.path
+
+def scan_files(directory: str, accept: Callable[[str], bool], ordered: bool = True) -> Iterator[str]:
+    """
+    Función para recorrer los archivos de un directorio con os.scandir (sin glob) y
+    entregar las rutas cuyo nombre acepta accept.
+    Con ordered=False las rutas se entregan conforme se lee el directorio, sin esperar a
+    listarlo completo (en el orden del sistema de archivos); con ordered=True se ordenan
+    por nombre, así que el orden es el mismo en cualquier máquina.
+    """
+    paths = _scan(directory, accept)
+    return iter(sorted(paths)) if ordered else paths
+
+def scan_suffix(directory: str, suffix: str, ordered: bool = True) -> Iterator[str]:
+    """Igual que scan_files() para los archivos terminados en suffix (p. ej. "_clean.txt")."""
+    return scan_files(directory, lambda name: name.endswith(suffix), ordered)
+
+def peek(paths: Iterable[str]) -> Optional[Iterator[str]]:
+    """
+    Retorna un iterador con las mismas rutas, o None si no hay ninguna. Solo lee la
+    primera, así que sirve para avisar de un directorio vacío sin recorrerlo completo.
+    """
+    iterator = iter(paths)
+    first = next(iterator, None)
+    if first is None:
+        return None
+    return itertools.chain([first], iterator)
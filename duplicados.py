@@ -0,0 +1,212 @@
+import os
+import re
+import zlib
+import hashlib
+import tarfile
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+from config import SHINGLE_SIZE, MINHASH_SIZE, LSH_BANDS, NEAR_DUPLICATE_THRESHOLD, REPORTED_DUPLICATE_GROUPS
+from cache_incremental import HASH_BLOCK_SIZE, hash_file
+from entradas_comprimidas import input_name, split_member
+
+# Palabras para los shingles; no necesita coincidir con WORD_PATTERN de la Actividad 3
+SHINGLE_WORD_PATTERN = re.compile(r'\w+')
+EMPTY_BUCKET = -1
+DENSIFY_OFFSET = 1 << 32  # Separa los valores prestados de los propios (los hash son de 32 bits)
+
+# Grupo de casi duplicados: [(nombre, similitud estimada con el primero)], el primero con 1.0
+NearDuplicateCluster = List[Tuple[str, float]]
+
+# Tamaño y hash SHA-256 de los miembros de cada tar: se calculan recorriendo el tar una sola
+# vez, porque pedir los miembros fuera de orden reiniciaría la descompresión de un tar comprimido
+_member_sizes: Dict[str, Dict[str, int]] = {}
+_member_digests: Dict[str, Dict[str, str]] = {}
+
+def _scan_tar_members(archive: str, digests: bool) -> None:
+    sizes: Dict[str, int] = {}
+    hashes: Dict[str, str] = {}
+    try:
+        with tarfile.open(archive, 'r|*') as tar:
+            for info in tar:
+                if not info.isfile():
+                    continue
+                sizes[info.name] = info.size
+                if digests:
+                    digest = hashlib.sha256()
+                    member = tar.extractfile(info)
+                    for block in iter(lambda: member.read(HASH_BLOCK_SIZE), b''):
+                        digest.update(block)
+                    hashes[info.name] = digest.hexdigest()
+    except tarfile.TarError as e:
+        raise OSError(f"No se pudo leer el archivo tar {archive}: {e}") from e
+    _member_sizes[archive] = sizes
+    if digests:
+        _member_digests[archive] = hashes
+
+def input_size(path: str) -> int:
+    """Tamaño de una entrada: el del archivo en disco, o el de un miembro de tar sin comprimir."""
+    archive, member = split_member(path)
+    if member is None:
+        return os.path.getsize(path)
+    if archive not in _member_sizes:
+        _scan_tar_members(archive, digests=False)
+    if member not in _member_sizes[archive]:
+        raise FileNotFoundError(f"{member} no está en {archive}")
+    return _member_sizes[archive][member]
+
+def input_digest(path: str) -> str:
+    """Hash SHA-256 del contenido de una entrada (de los bytes del miembro si está en un tar)."""
+    archive, member = split_member(path)
+    if member is None:
+        return hash_file(path)
+    if archive not in _member_digests:
+        _scan_tar_members(archive, digests=True)
+    if member not in _member_digests[archive]:
+        raise FileNotFoundError(f"{member} no está en {archive}")
+    return _member_digests[archive][member]
+
+def find_exact_duplicates(names: List[str], size_of: Callable[[str], int] = input_size,
+                          digest_of: Callable[[str], str] = input_digest) -> Dict[str, str]:
+    """
+    Función para encontrar documentos con exactamente el mismo contenido.
+    Solo se calcula el hash de los documentos cuyo tamaño coincide con el de otro,
+    así que en un corpus sin duplicados casi no se lee nada. Por omisión acepta las
+    entradas de scan_input_files(), también los miembros de tar; un archivo comprimido
+    se compara por sus bytes comprimidos.
+    Retorna {duplicado: original}, donde el original es el primero en el orden de names.
+    """
+    by_size: Dict[int, List[str]] = defaultdict(list)
+    for name in names:
+        try:
+            by_size[size_of(name)].append(name)
+        except OSError:
+            continue  # El error se reporta al procesar el archivo
+
+    duplicates: Dict[str, str] = {}
+    for group in by_size.values():
+        if len(group) < 2:
+            continue
+        originals: Dict[str, str] = {}
+        for name in group:
+            try:
+                digest = digest_of(name)
+            except OSError:
+                continue
+            original = originals.setdefault(digest, name)
+            if original != name:
+                duplicates[name] = original
+    return duplicates
+
+def minhash_signature(text: str) -> Optional[List[int]]:
+    """
+    Función para calcular la firma MinHash de un texto sobre shingles de SHINGLE_SIZE palabras.
+    Usa hashing de una permutación: cada shingle se hashea una sola vez (crc32) y cae en
+    una de MINHASH_SIZE cubetas, que guardan su mínimo; las cubetas vacías toman el valor
+    de la siguiente no vacía. Dos firmas coinciden en cada posición con probabilidad
+    aproximada igual a la similitud de Jaccard de sus conjuntos de shingles.
+    Retorna None si el texto no tiene palabras.
+    """
+    words = SHINGLE_WORD_PATTERN.findall(text.lower())
+    if not words:
+        return None
+    if len(words) < SHINGLE_SIZE:
+        shingles = {' '.join(words)}
+    else:
+        shingles = set(map(' '.join, zip(*(words[i:] for i in range(SHINGLE_SIZE)))))
+
+    buckets = [EMPTY_BUCKET] * MINHASH_SIZE
+    for shingle in shingles:
+        hashed = zlib.crc32(shingle.encode('utf-8'))
+        bucket = hashed % MINHASH_SIZE
+        value = hashed // MINHASH_SIZE
+        if buckets[bucket] == EMPTY_BUCKET or value < buckets[bucket]:
+            buckets[bucket] = value
+
+    # Densificación por rotación: cada cubeta vacía toma la siguiente no vacía (circular)
+    signature = list(buckets)
+    for position in range(MINHASH_SIZE):
+        if buckets[position] == EMPTY_BUCKET:
+            distance = 1
+            while buckets[(position + distance) % MINHASH_SIZE] == EMPTY_BUCKET:
+                distance += 1
+            signature[position] = buckets[(position + distance) % MINHASH_SIZE] + distance * DENSIFY_OFFSET
+    return signature
+
+def estimated_similarity(first: List[int], second: List[int]) -> float:
+    """Retorna la fracción de posiciones iguales de dos firmas (estimación de Jaccard)."""
+    return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+def near_duplicate_clusters(signatures: Dict[str, List[int]]) -> List[NearDuplicateCluster]:
+    """
+    Función para agrupar documentos casi duplicados con LSH por bandas.
+    La firma se divide en LSH_BANDS bandas; dos documentos son candidatos si coinciden
+    en una banda completa, y se unen si su similitud estimada es al menos
+    NEAR_DUPLICATE_THRESHOLD. Así no se compara cada par de documentos.
+    Retorna los grupos de dos o más documentos, ordenados por tamaño y nombre.
+    """
+    rows = MINHASH_SIZE // LSH_BANDS
+    bands: Dict[Tuple[int, Tuple[int, ...]], List[str]] = defaultdict(list)
+    for name in sorted(signatures):
+        signature = signatures[name]
+        for band in range(LSH_BANDS):
+            bands[(band, tuple(signature[band * rows:(band + 1) * rows]))].append(name)
+
+    # Unión-búsqueda: cada candidato se compara con el primer documento de su cubeta
+    parent: Dict[str, str] = {}
+
+    def find(name: str) -> str:
+        root = name
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while name != root:  # Compresión de caminos
+            parent[name], name = root, parent[name]
+        return root
+
+    for members in bands.values():
+        first = members[0]
+        for other in members[1:]:
+            if find(first) != find(other) and \
+                    estimated_similarity(signatures[first], signatures[other]) >= NEAR_DUPLICATE_THRESHOLD:
+                parent[find(other)] = find(first)
+
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for name in sorted(signatures):
+        groups[find(name)].append(name)
+    clusters: List[NearDuplicateCluster] = []
+    for members in groups.values():
+        if len(members) > 1:
+            first = members[0]
+            clusters.append([(name, estimated_similarity(signatures[first], signatures[name])) for name in members])
+    clusters.sort(key=lambda cluster: (-len(cluster), cluster[0][0]))
+    return clusters
+
+def duplicate_report_lines(exact: Dict[str, str], clusters: List[NearDuplicateCluster],
+                           total_files: int, duplicate_bytes: int) -> List[str]:
+    """
+    Función para generar la sección de duplicados de los reportes a2_ y a3_.
+    Lista como máximo REPORTED_DUPLICATE_GROUPS grupos de cada tipo.
+    """
+    lines = ["\nDOCUMENTOS DUPLICADOS:\n", "-"*65 + "\n"]
+    share = len(exact) / total_files * 100 if total_files else 0
+    lines.append(f"Duplicados exactos (reutilizan la salida del original): {len(exact)} archivos, "
+                 f"{duplicate_bytes} bytes ({share:.1f}% de los archivos)\n")
+    originals: Dict[str, List[str]] = defaultdict(list)
+    for duplicate, original in sorted(exact.items()):
+        originals[original].append(duplicate)
+    for original in sorted(originals)[:REPORTED_DUPLICATE_GROUPS]:
+        names = ', '.join(input_name(name) for name in originals[original])
+        lines.append(f"  {input_name(original)} = {names}\n")
+    if len(originals) > REPORTED_DUPLICATE_GROUPS:
+        lines.append(f"  ... y {len(originals) - REPORTED_DUPLICATE_GROUPS} grupos más\n")
+
+    clustered = sum(len(cluster) for cluster in clusters)
+    lines.append(f"Grupos de casi duplicados (similitud estimada >= {NEAR_DUPLICATE_THRESHOLD:.2f}): "
+                 f"{len(clusters)} grupos, {clustered} archivos\n")
+    for cluster in clusters[:REPORTED_DUPLICATE_GROUPS]:
+        first = input_name(cluster[0][0])
+        others = ', '.join(f"{input_name(name)} ({similarity:.2f})" for name, similarity in cluster[1:])
+        lines.append(f"  {first} ~ {others}\n")
+    if len(clusters) > REPORTED_DUPLICATE_GROUPS:
+        lines.append(f"  ... y {len(clusters) - REPORTED_DUPLICATE_GROUPS} grupos más\n")
+    lines.append("-"*65 + "\n")
+    return lines
@@ -0,0 +1,239 @@
+import os
+import bz2
+import gzip
+import lzma
+import tarfile
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+from config import PRECISION_DECIMALS
+from descubrimiento_archivos import scan_files
+from metricas import FileMetrics
+from estadisticas import ReportStatistics
+
+# Un miembro de un archivo tar se nombra con la ruta del tar y la del miembro:
+# Files/crawl.tar.gz::pagina/000.html
+ARCHIVE_MEMBER_SEPARATOR = "::"
+
+# Archivos comprimidos individuales (000.html.gz) y el módulo que los descomprime
+COMPRESSED_SUFFIXES = {".gz": gzip, ".bz2": bz2, ".xz": lzma}
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+def split_member(path: str) -> Tuple[str, Optional[str]]:
+    """Files/crawl.tar::a/000.html -> ("Files/crawl.tar", "a/000.html"); un archivo normal no tiene miembro."""
+    archive, separator, member = path.partition(ARCHIVE_MEMBER_SEPARATOR)
+    return (archive, member) if separator else (path, None)
+
+def source_path(path: str) -> str:
+    """Archivo en disco del que sale una entrada: el tar para un miembro, el mismo archivo si no."""
+    return split_member(path)[0]
+
+def is_tar_archive(path: str) -> bool:
+    return path.lower().endswith(TAR_SUFFIXES)
+
+def compression_suffix(path: str) -> Optional[str]:
+    """Retorna ".gz", ".bz2" o ".xz" si la entrada es un archivo comprimido individual (no un tar)."""
+    archive, member = split_member(path)
+    if member is not None or is_tar_archive(archive):
+        return None
+    extension = os.path.splitext(archive)[1].lower()
+    return extension if extension in COMPRESSED_SUFFIXES else None
+
+def input_name(path: str) -> str:
+    """
+    Nombre de una entrada en reportes y métricas: 000.html, 000.html.gz o
+    crawl.tar.gz::pagina/000.html para un miembro de un tar.
+    """
+    archive, member = split_member(path)
+    if member is None:
+        return os.path.basename(path)
+    return f"{os.path.basename(archive)}{ARCHIVE_MEMBER_SEPARATOR}{member}"
+
+def document_name(path: str) -> str:
+    """Nombre del documento sin contenedor ni compresión: 000.html.gz y crawl.tar::a/000.html -> 000.html."""
+    archive, member = split_member(path)
+    name = os.path.basename(member if member is not None else archive)
+    if compression_suffix(path) is not None:
+        name = os.path.splitext(name)[0]
+    return name
+
+def document_stem(path: str) -> str:
+    """Nombre base de las salidas de una entrada: 000.html, 000.html.gz y crawl.tar::a/000.html -> 000."""
+    return os.path.splitext(document_name(path))[0]
+
+class DuplicateDocumentError(ValueError):
+    """Dos entradas generan el mismo documento y sus salidas se sobrescribirían."""
+
+def is_input_file(name: str, extension: str) -> bool:
+    """
+    True para 000.html y para 000.html.gz/.bz2/.xz si extension es ".html". Distingue
+    mayúsculas igual que glob("*.html"), así que 000.HTML no es una entrada.
+    """
+    if name.endswith(extension):
+        return True
+    base_name, suffix = os.path.splitext(name)
+    return suffix in COMPRESSED_SUFFIXES and base_name.endswith(extension)
+
+def scan_input_files(directory: str, extension: str = ".html", ordered: bool = True) -> Iterator[str]:
+    """
+    Función para recorrer las entradas de un directorio: archivos *.html, los mismos
+    comprimidos con gzip, bzip2 o xz, y los miembros *.html de archivos tar (comprimidos o no).
+    Los archivos se entregan conforme se encuentran (ordenados por nombre si ordered, ver
+    descubrimiento_archivos.py) y después los miembros de cada tar, en el orden del archivo,
+    para que leerlos en secuencia no obligue a descomprimirlo varias veces.
+    Lanza DuplicateDocumentError al encontrar una entrada con el mismo documento que una
+    anterior (000.html y 000.html.gz, o a/000.html y b/000.html dentro de un tar), antes de
+    entregarla: las dos escribirían el mismo archivo limpio y la misma clave del almacén.
+    """
+    seen: Dict[str, str] = {}  # Documento -> primera entrada que lo genera
+
+    def check(path: str) -> str:
+        stem = document_stem(path)
+        previous = seen.setdefault(stem, path)
+        if previous != path:
+            raise DuplicateDocumentError(
+                f"{input_name(previous)} y {input_name(path)} generan el mismo documento ({stem}); "
+                f"renombra o elimina uno de los dos")
+        return path
+
+    archives: List[str] = []
+    for path in scan_files(directory, lambda name: is_tar_archive(name) or is_input_file(name, extension), ordered):
+        if is_tar_archive(path):
+            archives.append(path)
+        else:
+            yield check(path)
+    for archive in archives:
+        for member in list_tar_members(archive, extension):
+            yield check(f"{archive}{ARCHIVE_MEMBER_SEPARATOR}{member}")
+
+def list_tar_members(archive: str, extension: str = ".html") -> List[str]:
+    """Retorna los miembros de un tar que son archivos con la extensión dada, en el orden del archivo."""
+    try:
+        with tarfile.open(archive, 'r:*') as tar:
+            return [info.name for info in tar.getmembers() if info.isfile() and info.name.endswith(extension)]
+    except (OSError, tarfile.TarError) as e:
+        print(f"Error al leer el archivo tar {archive}: {e}")
+        return []
+
+class TarMemberReader:
+    """
+    Lector de miembros de un archivo tar que se mantiene abierto entre lecturas.
+    Un tar sin comprimir se abre con acceso directo (cada miembro se lee en su posición).
+    Un tar comprimido se recorre hacia adelante como flujo: pedir los miembros en el
+    orden del archivo lo descomprime una sola vez; si se pide uno anterior, se reinicia.
+    """
+
+    def __init__(self, archive: str):
+        self.archive = archive
+        self.compressed = not archive.lower().endswith(".tar")
+        self._tar: Optional[tarfile.TarFile] = None
+        self._members: Dict[str, tarfile.TarInfo] = {}
+        self._seen: Set[str] = set()
+        self._stream_tar: Optional[tarfile.TarFile] = None  # Tar del último miembro abierto con open()
+
+    def _open(self) -> None:
+        self.close()
+        if self.compressed:
+            self._tar = tarfile.open(self.archive, 'r|*')
+        else:
+            self._tar = tarfile.open(self.archive, 'r:')
+            self._members = {info.name: info for info in self._tar.getmembers()}
+        self._seen = set()
+
+    def read(self, member: str) -> bytes:
+        if self._tar is None or (self.compressed and member in self._seen):
+            self._open()
+        if not self.compressed:
+            if member not in self._members:
+                raise FileNotFoundError(f"{member} no está en {self.archive}")
+            return self._tar.extractfile(self._members[member]).read()
+        # next() continúa desde el último miembro leído (iterar el TarFile empezaría desde el primero)
+        info = self._tar.next()
+        while info is not None:
+            self._seen.add(info.name)
+            if info.name == member:
+                return self._tar.extractfile(info).read()
+            info = self._tar.next()
+        self.close()
+        raise FileNotFoundError(f"{member} no está en {self.archive}")
+
+    def open(self, member: str) -> BinaryIO:
+        """
+        Abre un miembro para leerlo por bloques (con acceso directo, aun si el tar está
+        comprimido). El tar queda abierto hasta que se abre otro miembro o se llama a close().
+        """
+        if self._stream_tar is not None:
+            self._stream_tar.close()
+        self._stream_tar = tarfile.open(self.archive, 'r:*')
+        file = self._stream_tar.extractfile(member)
+        if file is None:
+            raise FileNotFoundError(f"{member} no es un archivo en {self.archive}")
+        return file
+
+    def close(self) -> None:
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+        if self._stream_tar is not None:
+            self._stream_tar.close()
+            self._stream_tar = None
+
+# Lectores de tar abiertos en este proceso (cada proceso del pool tiene los suyos)
+_tar_readers: Dict[str, TarMemberReader] = {}
+
+def tar_reader(archive: str) -> TarMemberReader:
+    reader = _tar_readers.get(archive)
+    if reader is None:
+        reader = _tar_readers[archive] = TarMemberReader(archive)
+    return reader
+
+def read_input(path: str, metrics: Optional[FileMetrics] = None) -> bytes:
+    """
+    Función para leer el contenido completo de una entrada sin extraerla a disco.
+    En un archivo comprimido, la lectura del disco (subetapa "lectura") y la
+    descompresión en memoria (subetapa "descompresion") se miden por separado; en un
+    miembro de un tar comprimido ambas ocurren juntas y se miden como "descompresion".
+    Los errores de lectura se propagan al llamador.
+    """
+    metrics = metrics if metrics is not None else FileMetrics(path)
+    archive, member = split_member(path)
+    if member is not None:
+        reader = tar_reader(archive)
+        with metrics.stage("descompresion" if reader.compressed else "lectura"):
+            return reader.read(member)
+
+    with metrics.stage("lectura"):
+        with open(path, 'rb') as file:
+            raw = file.read()
+    suffix = compression_suffix(path)
+    if suffix is None:
+        return raw
+    with metrics.stage("descompresion"):
+        return COMPRESSED_SUFFIXES[suffix].decompress(raw)
+
+def open_input(path: str) -> BinaryIO:
+    """
+    Función para abrir una entrada en modo binario y leerla por bloques (--stream):
+    los archivos comprimidos y los miembros de tar se descomprimen mientras se leen.
+    """
+    archive, member = split_member(path)
+    if member is not None:
+        return tar_reader(archive).open(member)
+    suffix = compression_suffix(path)
+    if suffix is None:
+        return open(path, 'rb')
+    return COMPRESSED_SUFFIXES[suffix].open(path, 'rb')
+
+def decompression_report_lines(stats: ReportStatistics) -> List[str]:
+    """
+    Función para generar la sección de entradas comprimidas de los reportes a1_ y a2_:
+    cuánto del tiempo individual fue descompresión y cuánto el resto del procesamiento.
+    Retorna una lista vacía si no hubo entradas comprimidas.
+    """
+    if not stats.compressed_files:
+        return []
+    return [
+        "\nENTRADAS COMPRIMIDAS:\n",
+        f"Archivos comprimidos o en tar: {stats.compressed_files}\n",
+        f"Tiempo de descompresión: {stats.decompression_time:.{PRECISION_DECIMALS}f} segundos\n",
+        f"Tiempo de procesamiento (sin descompresión): "
+        f"{stats.compressed_time - stats.decompression_time:.{PRECISION_DECIMALS}f} segundos\n",
+    ]
@@ -0,0 +1,197 @@
+import os
+import time
+import queue
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from config import WRITER_QUEUE_SIZE, WRITER_BATCH_FILES, WRITER_BUFFER_SIZE, DEFAULT_FSYNC, PRECISION_DECIMALS
+from estadisticas import ResultCollector
+
+# Salida pendiente: (ruta, texto, métricas del archivo donde anotar los bytes escritos)
+PendingOutput = Tuple[str, str, Optional[Dict[str, object]]]
+
+class AsyncWriter:
+    """
+    Escritor de archivos de salida en un hilo dedicado con una cola acotada.
+    El procesamiento entrega el texto completo de cada salida (ya unido en una sola cadena)
+    y sigue con el siguiente archivo; el hilo toma de la cola lotes de hasta batch_files
+    salidas y escribe cada una con una sola llamada, con el mismo formato que open(..., 'w').
+    Si la cola se llena, submit() espera: la memoria queda acotada a queue_size salidas.
+    fsync: "nunca", "archivo" (cada archivo al cerrarlo) o "lote" (todos al terminar el lote).
+    Los errores de escritura no se lanzan: quedan en errors para reportarlos al final,
+    y cada salida terminada (escrita o con error) se entrega una vez con completed().
+    """
+
+    def __init__(self, queue_size: int = WRITER_QUEUE_SIZE, batch_files: int = WRITER_BATCH_FILES,
+                 buffer_size: int = WRITER_BUFFER_SIZE, fsync: str = DEFAULT_FSYNC):
+        self.batch_files = batch_files
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        self.files = 0
+        self.bytes = 0
+        self.batches = 0
+        self.write_time = 0.0  # Tiempo del hilo escribiendo: fuera del camino crítico
+        self.blocked_time = 0.0  # Espera en submit() con la cola llena: dentro del camino crítico
+        self.close_time = 0.0  # Espera en close() a que se escriba lo pendiente
+        self.errors: List[Tuple[str, str]] = []
+        self._completed: "queue.SimpleQueue[Tuple[str, Optional[str]]]" = queue.SimpleQueue()
+        self._directories: Set[str] = set()
+        self._queue: "queue.Queue[Optional[PendingOutput]]" = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="escritor", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: str, text: str, record: Optional[Dict[str, object]] = None) -> None:
+        """Entrega una salida para escribirla en segundo plano; record recibe "bytes_salida" al escribirla."""
+        start_time = time.perf_counter()
+        self._queue.put((path, text, record))
+        self.blocked_time += time.perf_counter() - start_time
+
+    def completed(self) -> List[Tuple[str, Optional[str]]]:
+        """Retorna (ruta, error o None) de las salidas terminadas desde la llamada anterior."""
+        finished: List[Tuple[str, Optional[str]]] = []
+        while True:
+            try:
+                finished.append(self._completed.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def close(self) -> None:
+        """Espera a que se escriban todas las salidas pendientes y termina el hilo."""
+        start_time = time.perf_counter()
+        self._queue.put(None)
+        self._thread.join()
+        self.close_time = time.perf_counter() - start_time
+
+    def __enter__(self) -> "AsyncWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < self.batch_files:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            finished = batch[-1] is None
+            pending = [item for item in batch if item is not None]
+            if pending:
+                start_time = time.perf_counter()
+                self._write_batch(pending)
+                self.write_time += time.perf_counter() - start_time
+                self.batches += 1
+            if finished:
+                return
+
+    def _write_batch(self, batch: List[PendingOutput]) -> None:
+        to_sync = []
+        for path, text, record in batch:
+            try:
+                directory = os.path.dirname(path)
+                if directory not in self._directories:
+                    os.makedirs(directory, exist_ok=True)
+                    self._directories.add(directory)
+                file = open(path, 'w', encoding='utf-8', buffering=self.buffer_size)
+                try:
+                    file.write(text)
+                    written = file.tell()
+                    if self.fsync == "archivo":
+                        file.flush()
+                        os.fsync(file.fileno())
+                    elif self.fsync == "lote":
+                        file.flush()
+                        to_sync.append((path, file))
+                        file = None  # Se cierra después del fsync del lote
+                finally:
+                    if file is not None:
+                        file.close()
+            except Exception as e:
+                self._fail(path, str(e))
+                continue
+            self.files += 1
+            self.bytes += written
+            if record is not None:
+                record["bytes_salida"] = written
+            if self.fsync != "lote":
+                self._completed.put((path, None))
+        for path, file in to_sync:
+            try:
+                os.fsync(file.fileno())
+            except OSError as e:
+                self._fail(path, str(e))
+                continue
+            finally:
+                file.close()
+            self._completed.put((path, None))
+
+    def _fail(self, path: str, message: str) -> None:
+        self.errors.append((path, message))
+        self._completed.put((path, message))
+
+    def report_lines(self) -> List[str]:
+        """
+        Función para generar la sección del escritor asíncrono de los reportes a2_ y a3_:
+        cuánto tiempo de escritura salió del camino crítico y cuánto se esperó al escritor.
+        """
+        waited = self.blocked_time + self.close_time
+        lines = [
+            "\nESCRITURA ASÍNCRONA:\n",
+            f"Archivos escritos: {self.files} ({self.bytes / (1024 * 1024):.2f} MB en {self.batches} lotes)\n",
+            f"Política de fsync: {self.fsync}\n",
+            f"Tiempo escribiendo en el hilo escritor: {self.write_time:.{PRECISION_DECIMALS}f} segundos\n",
+            f"Espera por cola llena: {self.blocked_time:.{PRECISION_DECIMALS}f} segundos\n",
+            f"Espera al cerrar el escritor: {self.close_time:.{PRECISION_DECIMALS}f} segundos\n",
+            f"Tiempo retirado del camino crítico: {max(0.0, self.write_time - waited):.{PRECISION_DECIMALS}f} segundos\n",
+        ]
+        if self.errors:
+            lines.append(f"Errores de escritura: {len(self.errors)}\n")
+            lines.extend(f"  {path}: {message}\n" for path, message in self.errors[:10])
+        return lines
+
+def submit_output(writer: AsyncWriter, path: str, text: str, file_time: float, record: Dict[str, object]) -> float:
+    """
+    Función para entregar la salida de un archivo al escritor asíncrono. Solo la entrega
+    (y la espera si la cola está llena) se suma como escritura al resultado y a las
+    métricas del archivo. Retorna el tiempo total del archivo.
+    """
+    start_time = time.perf_counter()
+    writer.submit(path, text, record)
+    elapsed = time.perf_counter() - start_time
+    record["etapas"]["escritura"] = record["etapas"].get("escritura", 0.0) + elapsed
+    record["tiempo_total"] = file_time + elapsed
+    return file_time + elapsed
+
+class WriteTracker:
+    """
+    Resultados de los archivos cuya salida se entregó al AsyncWriter y aún no se escribe.
+    Cada resultado pasa al ResultCollector cuando el escritor termina su salida; si la
+    escritura falló, pasa como el resultado que retorna failed() y con las métricas marcadas
+    como error. Solo guarda las salidas que siguen en la cola del escritor (todas las que
+    se entregan al escritor deben registrarse con add()).
+    """
+
+    def __init__(self, writer: AsyncWriter, results: ResultCollector, failed: Callable[[tuple], tuple]):
+        self.writer = writer
+        self.results = results
+        self.failed = failed
+        self._pending: Dict[str, Tuple[tuple, Optional[Dict[str, object]]]] = {}
+        self._finished: Dict[str, Optional[str]] = {}  # Salidas terminadas antes de registrar su resultado
+
+    def add(self, path: str, result: tuple, record: Optional[Dict[str, object]] = None) -> None:
+        """Registra el resultado de la salida path, ya entregada al escritor."""
+        self._pending[path] = (result, record)
+        self.collect()
+
+    def collect(self) -> None:
+        """Pasa al ResultCollector los resultados de las salidas que el escritor ya terminó."""
+        self._finished.update(self.writer.completed())
+        for path in [path for path in self._finished if path in self._pending]:
+            error = self._finished.pop(path)
+            result, record = self._pending.pop(path)
+            if error is not None:
+                result = self.failed(result)
+                if record is not None:
+                    record = dict(record, estado="error", error=f"Error al escribir: {error}")
+            self.results.append(result, record)
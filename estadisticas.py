@@ -0,0 +1,211 @@
+import math
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+from config import HISTOGRAM_BUCKETS_PER_DECADE, HISTOGRAM_BAR_WIDTH, PRECISION_DECIMALS
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Retorna el percentil (por rango más cercano) de una lista de valores."""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[rank]
+
+class LatencyHistogram:
+    """
+    Histograma con cubetas logarítmicas: buckets_per_decade cubetas por cada potencia de 10.
+    Un percentil se estima con el límite superior de su cubeta, con error relativo menor a
+    10^(1/buckets_per_decade) - 1, sin guardar los valores. La memoria depende del rango
+    de los valores (a lo más buckets_per_decade cubetas por década), no de cuántos son.
+    """
+
+    def __init__(self, buckets_per_decade: int = HISTOGRAM_BUCKETS_PER_DECADE):
+        self.buckets_per_decade = buckets_per_decade
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0  # Valores <= 0 (archivos fallidos en la Actividad 1)
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        bucket = math.floor(math.log10(value) * self.buckets_per_decade)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def upper_bound(self, bucket: int) -> float:
+        return 10 ** ((bucket + 1) / self.buckets_per_decade)
+
+    def percentile(self, fraction: float) -> float:
+        """Percentil por rango más cercano, igual que percentile(), estimado con su cubeta."""
+        if not self.count:
+            return 0
+        rank = max(0, min(self.count - 1, math.ceil(fraction * self.count) - 1))
+        seen = self.zeros
+        if rank < seen:
+            return 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if rank < seen:
+                return self.upper_bound(bucket)
+        return self.upper_bound(max(self.buckets))
+
+    def decades(self) -> List[Tuple[int, int]]:
+        """Retorna (exponente, cantidad) por potencia de 10 con valores: la década 10^e a 10^(e+1)."""
+        counts: Counter = Counter()
+        for bucket, count in self.buckets.items():
+            counts[bucket // self.buckets_per_decade] += count
+        return sorted(counts.items())
+
+class StreamingStats:
+    """
+    Cantidad, suma, promedio, varianza (algoritmo de Welford), mínimo y máximo de una
+    serie de valores en memoria constante; con histogram=True también sus percentiles.
+    """
+
+    def __init__(self, histogram: bool = False):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = 0.0
+        self.maximum = 0.0
+        self._mean = 0.0
+        self._squares = 0.0  # Suma de cuadrados de las diferencias con el promedio
+        self.histogram: Optional[LatencyHistogram] = LatencyHistogram() if histogram else None
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if self.count == 1:
+            self.minimum = self.maximum = value
+        else:
+            self.minimum = min(self.minimum, value)
+            self.maximum = max(self.maximum, value)
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._squares += delta * (value - self._mean)
+        if self.histogram is not None:
+            self.histogram.add(value)
+
+    @property
+    def mean(self) -> float:
+        # La suma entre la cantidad da el mismo resultado que sum(valores) / len(valores)
+        return self.total / self.count if self.count else 0
+
+    @property
+    def stddev(self) -> float:
+        """Desviación estándar poblacional."""
+        return math.sqrt(self._squares / self.count) if self.count else 0
+
+    def percentile(self, fraction: float) -> float:
+        """Percentil estimado con el histograma (exacto en los extremos: se acota al mínimo y al máximo)."""
+        if self.histogram is None or not self.count:
+            return 0
+        return min(self.maximum, max(self.minimum, self.histogram.percentile(fraction)))
+
+class ReportStatistics:
+    """
+    Estadísticas de una ejecución de la Actividad 1, 2 o 3, acumuladas archivo por archivo
+    para las secciones de estadísticas, latencias, codificaciones y entradas comprimidas
+    de los reportes. No guarda nada por archivo.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.successful = 0
+        self.times = StreamingStats(histogram=True)
+        self.words = StreamingStats()
+        self.encodings: Counter = Counter()
+        self.compressed_files = 0
+        self.decompression_time = 0.0
+        self.compressed_time = 0.0
+
+    def add(self, file_time: float, successful: bool, encoding: Optional[str], timed: bool,
+            words: Optional[int] = None) -> None:
+        """
+        Agrega un archivo. timed indica si su tiempo entra en el promedio, los extremos y
+        los percentiles (cada actividad decide, p. ej. sin los aciertos de caché).
+        """
+        self.files += 1
+        if successful:
+            self.successful += 1
+            self.encodings[encoding] += 1
+            if words is not None:
+                self.words.add(words)
+        if timed:
+            self.times.add(file_time)
+
+    def add_record(self, record: Dict[str, object]) -> None:
+        """Agrega las métricas de un archivo (ver metricas.py); solo se usa su tiempo de descompresión."""
+        stages = record.get("etapas", {})
+        if "descompresion" in stages:
+            self.compressed_files += 1
+            self.decompression_time += stages["descompresion"]
+            self.compressed_time += record["tiempo_total"]
+
+    def decompression_summary(self) -> Dict[str, float]:
+        """Contadores de entradas comprimidas que guarda el resumen de un shard (ver particionado.py)."""
+        return {"archivos": self.compressed_files, "tiempo_descompresion": self.decompression_time,
+                "tiempo_total": self.compressed_time}
+
+    def add_decompression_summary(self, summary: Dict[str, float]) -> None:
+        """Suma los contadores de entradas comprimidas de un shard (al fusionar con fusion_shards.py)."""
+        self.compressed_files += int(summary["archivos"])
+        self.decompression_time += summary["tiempo_descompresion"]
+        self.compressed_time += summary["tiempo_total"]
+
+class ResultCollector:
+    """
+    Resultados por archivo de una ejecución. Cada resultado actualiza las estadísticas con
+    add_result (propia de cada actividad); las filas para la tabla de tiempos individuales
+    y los resúmenes de shard solo se guardan con keep_rows, y las métricas por archivo
+    solo con keep_records, así que sin ellas la memoria no crece con el número de archivos.
+    """
+
+    def __init__(self, add_result: Callable[[ReportStatistics, tuple], None],
+                 keep_rows: bool = True, keep_records: bool = True):
+        self.stats = ReportStatistics()
+        self.keep_rows = keep_rows
+        self.keep_records = keep_records
+        self.rows: List[tuple] = []
+        self.records: List[Dict[str, object]] = []
+        self._add_result = add_result
+
+    def append(self, result: tuple, record: Optional[Dict[str, object]] = None) -> None:
+        self._add_result(self.stats, result)
+        if self.keep_rows:
+            self.rows.append(result)
+        if record is not None:
+            self.stats.add_record(record)
+            if self.keep_records:
+                self.records.append(record)
+
+    def sort(self) -> None:
+        """Ordena las filas y las métricas por nombre de archivo."""
+        self.rows.sort()
+        self.records.sort(key=lambda record: record["archivo"])
+
+def latency_report_lines(times: StreamingStats) -> List[str]:
+    """
+    Función para generar la sección de distribución de tiempos de los reportes: desviación
+    estándar, percentiles p50/p90/p99/p99.9 y un histograma por potencia de 10.
+    Retorna una lista vacía si no hay tiempos o no se guardó el histograma.
+    """
+    if times.histogram is None or not times.count:
+        return []
+    histogram = times.histogram
+    error = 10 ** (1 / histogram.buckets_per_decade) - 1
+    lines = [
+        f"\nDISTRIBUCIÓN DE TIEMPOS (percentiles estimados, error relativo < {error:.1%}):\n",
+        f"Desviación estándar: {times.stddev:.{PRECISION_DECIMALS}f} segundos\n",
+    ]
+    for label, fraction in (("p50", 0.50), ("p90", 0.90), ("p99", 0.99), ("p99.9", 0.999)):
+        lines.append(f"{label + ':':<7} {times.percentile(fraction):.{PRECISION_DECIMALS}f} segundos\n")
+
+    rows = [("0", histogram.zeros)] if histogram.zeros else []
+    rows.extend((f"{10.0 ** exponent:g} - {10.0 ** (exponent + 1):g}", count) for exponent, count in histogram.decades())
+    largest = max(count for _, count in rows)
+    lines.append(f"{'Segundos':<20} {'Archivos':<10}\n")
+    for label, count in rows:
+        bar = "#" * max(1, round(count / largest * HISTOGRAM_BAR_WIDTH))
+        lines.append(f"{label:<20} {count:<10} {bar}\n")
+    return lines
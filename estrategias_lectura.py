@@ -0,0 +1,187 @@
+import os
+import mmap
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from config import ENCODING, FALLBACK_ENCODINGS, IO_BUFFER_SIZES
+from estadisticas import percentile
+
+# Cada estrategia lee un archivo completo y retorna los bytes leídos (o los caracteres, en modo texto)
+ReadStrategy = Callable[[str], int]
+
+# Las páginas de un archivo se pueden sacar de la caché del sistema operativo solo donde existe posix_fadvise
+COLD_CACHE_SUPPORTED = hasattr(os, "posix_fadvise") and hasattr(os, "POSIX_FADV_DONTNEED")
+
+def read_text(path: str) -> int:
+    """Modo texto con búfer: open().read() con reintento por codificación (la estrategia original de la Actividad 1)."""
+    for encoding in [ENCODING] + FALLBACK_ENCODINGS:
+        try:
+            with open(path, 'r', encoding=encoding) as file:
+                return len(file.read())
+        except UnicodeDecodeError:
+            continue
+    return 0
+
+def read_binary(path: str) -> int:
+    """Modo binario con búfer: open(path, 'rb').read(), la lectura que usa lector_archivos.load_text()."""
+    with open(path, 'rb') as file:
+        return len(file.read())
+
+def read_os_whole(path: str) -> int:
+    """os.read() sin búfer de Python: una sola llamada del tamaño del archivo (según fstat)."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        data = os.read(fd, size + 1)  # Un byte extra: el archivo pudo crecer después de fstat
+        while len(data) > size:
+            chunk = os.read(fd, 1024 * 1024)
+            if not chunk:
+                break
+            data += chunk
+        return len(data)
+    finally:
+        os.close(fd)
+
+def os_read_chunks(buffer_size: int) -> ReadStrategy:
+    """Estrategia os.read() en bloques de buffer_size bytes, unidos al final."""
+    def read_chunks(path: str) -> int:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            chunks: List[bytes] = []
+            while True:
+                chunk = os.read(fd, buffer_size)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            return len(b''.join(chunks))
+        finally:
+            os.close(fd)
+    return read_chunks
+
+class ReadIntoStrategy:
+    """
+    readinto() sobre un bytearray preasignado que se reutiliza entre archivos: no se
+    crea un objeto bytes por lectura. El búfer crece al tamaño del archivo más grande.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray(64 * 1024)
+
+    def __call__(self, path: str) -> int:
+        with open(path, 'rb', buffering=0) as file:
+            size = os.fstat(file.fileno()).st_size
+            if len(self._buffer) <= size:
+                self._buffer = bytearray(size + 1)
+            view = memoryview(self._buffer)
+            total = 0
+            while True:
+                count = file.readinto(view[total:])
+                if not count:
+                    return total
+                total += count
+                if total == len(self._buffer):  # El archivo creció: ampliar y seguir leyendo
+                    view.release()
+                    self._buffer.extend(bytes(len(self._buffer)))
+                    view = memoryview(self._buffer)
+
+def read_mmap(path: str) -> int:
+    """
+    mmap de solo lectura. Mapear no lee nada; las páginas se cargan al tocarlas, así que
+    se lee un byte de cada página (un corte con paso mmap.PAGESIZE, copiado en C) para que
+    la medición incluya la lectura completa aun si el archivo tiene bytes nulos (UTF-16).
+    """
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return 0
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            with memoryview(data) as view:
+                view[::mmap.PAGESIZE].tobytes()
+            return size
+
+def read_strategies() -> Dict[str, ReadStrategy]:
+    """Retorna las estrategias a comparar, en el orden del reporte."""
+    strategies: Dict[str, ReadStrategy] = {
+        "texto": read_text,
+        "binario": read_binary,
+        "os.read completo": read_os_whole,
+    }
+    for buffer_size in IO_BUFFER_SIZES:
+        strategies[f"os.read {buffer_size // 1024} KB"] = os_read_chunks(buffer_size)
+    strategies["readinto"] = ReadIntoStrategy()
+    strategies["mmap"] = read_mmap
+    return strategies
+
+def evict_from_cache(path: str) -> bool:
+    """
+    Función para pedir al sistema operativo que descarte las páginas del archivo de su caché.
+    Solo afecta a páginas sin modificar y el sistema puede ignorarlo; retorna False si no se pudo.
+    """
+    if not COLD_CACHE_SUPPORTED:
+        return False
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+def measure_strategy(strategy: ReadStrategy, files: List[str], repetitions: int, cold: bool) -> Dict[str, float]:
+    """
+    Función para medir una estrategia de lectura sobre todos los archivos.
+    En caché caliente se hace primero una vuelta sin medir; en caché fría se descarta cada
+    archivo de la caché justo antes de leerlo (fuera del tiempo medido).
+    Retorna MB/s (mediana de las repeticiones) y percentiles de latencia por archivo.
+    """
+    total_bytes = sum(os.path.getsize(path) for path in files)
+    if not cold:
+        for path in files:
+            strategy(path)
+
+    latencies: List[float] = []
+    throughputs: List[float] = []
+    errors = 0
+    for _ in range(repetitions):
+        elapsed = 0.0
+        for path in files:
+            if cold:
+                evict_from_cache(path)
+            start_time = time.perf_counter()
+            try:
+                strategy(path)
+            except OSError:
+                errors += 1
+                continue
+            file_time = time.perf_counter() - start_time
+            latencies.append(file_time)
+            elapsed += file_time
+        if elapsed > 0:
+            throughputs.append(total_bytes / (1024 * 1024) / elapsed)
+
+    return {
+        "mb_per_second": percentile(throughputs, 0.50),
+        "p50": percentile(latencies, 0.50),
+        "p90": percentile(latencies, 0.90),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies, default=0),
+        "errors": errors,
+    }
+
+def compare_strategies(files: List[str], repetitions: int,
+                       conditions: Optional[List[str]] = None) -> List[Tuple[str, str, Dict[str, float]]]:
+    """
+    Función para medir todas las estrategias en caché caliente y, donde se puede, en caché fría.
+    Retorna (estrategia, condición, resultados) en el orden de medición.
+    """
+    if conditions is None:
+        conditions = ["caliente", "fría"] if COLD_CACHE_SUPPORTED else ["caliente"]
+    results: List[Tuple[str, str, Dict[str, float]]] = []
+    for condition in conditions:
+        for name, strategy in read_strategies().items():
+            print(f"Midiendo '{name}' en caché {condition}...")
+            results.append((name, condition, measure_strategy(strategy, files, repetitions, condition == "fría")))
+    return results
@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+from collections import Counter
+from typing import List, Optional
+from config import MATRICULA, PRECISION_DECIMALS
+from particionado import load_shard_summaries, shard_report_path
+from estadisticas import ResultCollector
+from entradas_comprimidas import decompression_report_lines
+import buscador_html
+import actividad2_html_cleaner
+import actividad3_word_extractor
+
+# Script de cada actividad y formato de su reporte: título y ancho de los separadores
+SCRIPTS = {
+    "a1": ("buscador_html.py", "REPORTE DE TIEMPOS DE APERTURA DE ARCHIVOS HTML", 60),
+    "a2": ("actividad2_html_cleaner.py", "REPORTE DE ELIMINACIÓN DE ETIQUETAS HTML", 70),
+    "a3": ("actividad3_word_extractor.py", "REPORTE DE EXTRACCIÓN Y ORDENAMIENTO DE PALABRAS", 80),
+}
+
+def merge_shards(script: str, matricula: str = MATRICULA, count: Optional[int] = None) -> str:
+    """
+    Función para fusionar los resúmenes de los shards en el reporte de siempre (a1_/a2_/a3_).
+    Los resultados por archivo se unen en orden alfabético y los totales, promedios,
+    máximos, mínimos y tasas de éxito se recalculan sobre todos los archivos. Como los
+    shards corren en paralelo, el tiempo del programa es el del shard más lento.
+    Retorna la ruta del reporte fusionado; lanza ValueError si falta algún shard.
+    """
+    output_file = f"{script}_{matricula}.txt"
+    summaries = load_shard_summaries(output_file, script, count)
+    results = sorted((tuple(result) for summary in summaries for result in summary["results"]),
+                     key=lambda result: result[0])
+    total_files = sum(summary["total_files"] for summary in summaries)
+    total_individual_time = sum(summary["total_individual_time"] for summary in summaries)
+    total_program_time = max(summary["total_program_time"] for summary in summaries)
+    _, title, width = SCRIPTS[script]
+    module = {"a1": buscador_html, "a2": actividad2_html_cleaner, "a3": actividad3_word_extractor}[script]
+    collector = ResultCollector(module.add_result)
+    for result in results:
+        collector.append(result)
+    # Los tiempos de descompresión no están en las filas: cada shard guarda sus contadores
+    for summary in summaries:
+        if "descompresion" in summary:
+            collector.stats.add_decompression_summary(summary["descompresion"])
+
+    with open(output_file, 'w', encoding='utf-8') as log_file:
+        log_file.write("="*width + "\n")
+        log_file.write(f"{title}\n")
+        log_file.write("="*width + "\n")
+        log_file.write(f"Matrícula: {matricula}\n")
+        log_file.write(f"Fecha: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        log_file.write(f"Total de archivos procesados: {total_files}\n")
+        if script == "a2":
+            successful_files = sum(1 for result in results if result[2] != "Error")
+            log_file.write(f"Archivos procesados exitosamente: {successful_files}\n")
+        elif script == "a3":
+            successful_files = sum(1 for result in results if result[3] != "Error")
+            log_file.write(f"Archivos procesados exitosamente: {successful_files}\n")
+            log_file.write(f"Total de palabras únicas extraídas: "
+                           f"{sum(result[2] for result in results if result[3] != 'Error')}\n")
+        log_file.write(f"Shards fusionados: {len(summaries)} (tiempo programa = el del shard más lento)\n")
+        log_file.write("="*width + "\n\n")
+
+        log_file.write("SHARDS:\n")
+        log_file.write("-"*50 + "\n")
+        log_file.write(f"{'Shard':<10} {'Archivos':<10} {'Procesos':<10} {'Tiempo programa':<15}\n")
+        log_file.write("-"*50 + "\n")
+        for summary in summaries:
+            index, shard_count = summary["shard"]
+            log_file.write(f"{f'{index}/{shard_count}':<10} {summary['total_files']:<10} {summary['workers']:<10} "
+                           f"{summary['total_program_time']:<15.{PRECISION_DECIMALS}f}\n")
+        log_file.write("-"*50 + "\n\n")
+
+        if script == "a1":
+            buscador_html.write_timing_sections(log_file, collector, total_individual_time, total_program_time)
+            log_file.writelines(decompression_report_lines(collector.stats))
+        elif script == "a2":
+            actividad2_html_cleaner.write_timing_sections(log_file, collector, total_files,
+                                                          total_individual_time, total_program_time)
+            log_file.writelines(decompression_report_lines(collector.stats))
+        else:
+            actividad3_word_extractor.write_timing_sections(log_file, collector, total_files,
+                                                            total_individual_time, total_program_time)
+            corpus_counts: Counter = Counter()
+            for summary in summaries:
+                corpus_counts.update(summary.get("frecuencias", {}))
+            file_top_words = sorted((filename, [tuple(pair) for pair in words])
+                                    for summary in summaries for filename, words in summary.get("top_por_archivo", []))
+            actividad3_word_extractor.write_top_words_sections(
+                log_file, corpus_counts, file_top_words, max(summary.get("top", 0) for summary in summaries),
+                sum(summary.get("archivos_sin_frecuencias", 0) for summary in summaries))
+
+        log_file.write("\n" + "="*width + "\n")
+        log_file.write("FIN DEL REPORTE\n")
+        log_file.write("="*width + "\n")
+    return output_file
+
+def run_shards(script: str, count: int, options: List[str]) -> bool:
+    """
+    Función para ejecutar localmente los count shards de una actividad como procesos
+    separados (todos a la vez), igual que en varias máquinas. La salida de cada uno
+    queda en <reporte del shard>.log. Retorna True si todos terminaron sin error.
+    """
+    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), SCRIPTS[script][0])
+    processes = []
+    for index in range(1, count + 1):
+        log_path = os.path.splitext(shard_report_path(f"{script}_{MATRICULA}.txt", (index, count)))[0] + ".log"
+        log_file = open(log_path, 'w', encoding='utf-8')
+        command = [sys.executable, script_path, "--shard", f"{index}/{count}"] + options
+        processes.append((index, log_path, log_file, subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT)))
+        print(f"Shard {index}/{count} iniciado (salida en {log_path})")
+
+    all_ok = True
+    for index, log_path, log_file, process in processes:
+        return_code = process.wait()
+        log_file.close()
+        if return_code == 0:
+            print(f"Shard {index}/{count} terminado")
+        else:
+            print(f"Shard {index}/{count} falló con código {return_code} (ver {log_path})")
+            all_ok = False
+    return all_ok
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fusión de los reportes de actividades ejecutadas con --shard i/N")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    merge_parser = subparsers.add_parser("fusionar", help="Fusionar los resúmenes de los shards en el reporte a1_/a2_/a3_")
+    merge_parser.add_argument("actividad", choices=list(SCRIPTS))
+    merge_parser.add_argument("--shards", type=int, help="Número de shards a fusionar (si hay resúmenes de varias particiones)")
+    run_parser = subparsers.add_parser("ejecutar", help="Ejecutar localmente los N shards como procesos separados y fusionar")
+    run_parser.add_argument("actividad", choices=list(SCRIPTS))
+    run_parser.add_argument("shards", type=int, help="Número de shards")
+    run_parser.add_argument("opciones", nargs=argparse.REMAINDER,
+                            help="Opciones para cada shard, p. ej. --workers 2 --limpieza regex")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    count = args.shards
+    if args.comando == "ejecutar":
+        if count < 1:
+            print("Error: el número de shards debe ser al menos 1")
+            sys.exit(1)
+        if not run_shards(args.actividad, count, args.opciones):
+            print("No se fusionan los reportes porque algún shard falló")
+            sys.exit(1)
+
+    try:
+        output_file = merge_shards(args.actividad, count=count)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Reporte fusionado guardado en: {output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import os
+import time
+import glob
+import heapq
+import mmap
+import shutil
+import struct
+import tempfile
+from functools import partial
+from typing import Callable, Iterator, List, Optional, Tuple
+from config import MATRICULA, PRECISION_DECIMALS, INDEX_DIRECTORY, INDEX_FILENAME, INDEX_MERGE_FAN_IN
+
+TOP_TERMS = 10  # Términos más frecuentes que se muestran en el reporte
+
+# Formato binario del índice (todos los enteros en little-endian):
+#   CABECERA   magic, versión, documentos, términos y desplazamiento de cada sección
+#   DOCUMENTOS por documento: longitud (u16) + nombre en UTF-8
+#   POSTINGS   por término: ids de documento en diferencias, codificados como varint
+#   TÉRMINOS   por término: longitud (u16) + término en UTF-8, df (u32),
+#              desplazamiento (u64) y longitud en bytes (u32) de sus postings
+#   TABLA      por término: desplazamiento (u64) de su entrada en TÉRMINOS,
+#              de ancho fijo para poder hacer búsqueda binaria
+INDEX_MAGIC = b"HIDX"
+INDEX_VERSION = 1
+HEADER_FORMAT = "<4sHIIQQQQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+TERM_INFO_FORMAT = "<IQI"
+TERM_INFO_SIZE = struct.calcsize(TERM_INFO_FORMAT)
+OFFSET_FORMAT = "<Q"
+OFFSET_SIZE = struct.calcsize(OFFSET_FORMAT)
+
+def encode_varint(value: int, output: bytearray) -> None:
+    """Agrega un entero no negativo codificado en 7 bits por byte."""
+    while value >= 0x80:
+        output.append((value & 0x7F) | 0x80)
+        value >>= 7
+    output.append(value)
+
+def decode_postings(data, count: int) -> List[int]:
+    """
+    Función para decodificar una lista de postings (diferencias en varint).
+    Recibe los bytes de la lista y cuántos documentos contiene.
+    Retorna los ids de documento en orden creciente.
+    """
+    doc_ids: List[int] = []
+    doc_id = 0
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        doc_id += value
+        doc_ids.append(doc_id)
+        value = 0
+        shift = 0
+        if len(doc_ids) == count:
+            break
+    return doc_ids
+
+def document_name(words_file: str) -> str:
+    """Retorna el nombre del documento original a partir de su archivo de palabras."""
+    base_name = os.path.splitext(os.path.basename(words_file))[0]
+    if base_name.endswith('_words'):
+        base_name = base_name[:-6]
+    return base_name
+
+def iter_file_words(words_file: str, doc_id: int) -> Iterator[Tuple[str, int]]:
+    """
+    Recorre un archivo de palabras (ya ordenado) entregando pares (palabra, documento).
+    Acepta también el formato "palabra<TAB>conteo" de la Actividad 3 con --frecuencias.
+    """
+    with open(words_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            word = line.rstrip('\n').partition('\t')[0]
+            if word:
+                yield (word, doc_id)
+
+def iter_run_words(run_file: str) -> Iterator[Tuple[str, int]]:
+    """Recorre un archivo intermedio de merge_postings() ("palabra<TAB>documento", ya ordenado)."""
+    with open(run_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            word, _, doc_id = line.rstrip('\n').partition('\t')
+            yield (word, int(doc_id))
+
+def merge_postings(words_files: List[str], fan_in: int = INDEX_MERGE_FAN_IN) -> Iterator[Tuple[str, List[int]]]:
+    """
+    Función para mezclar los archivos de palabras con un heap de k vías.
+    Como cada archivo ya está ordenado, el heap solo guarda una palabra por archivo:
+    la memoria depende del número de archivos y no del tamaño del corpus.
+    Para no pasar del límite de archivos abiertos del proceso, a lo más fan_in archivos
+    se mezclan a la vez: con más, cada grupo de fan_in se mezcla primero en un archivo
+    intermedio (en un directorio temporal) y se repite hasta que quedan fan_in o menos.
+    Retorna un iterador de (término, lista de documentos que lo contienen).
+    """
+    sources: List[Callable[[], Iterator[Tuple[str, int]]]] = [
+        partial(iter_file_words, path, doc_id) for doc_id, path in enumerate(words_files)]
+    with tempfile.TemporaryDirectory(prefix="mezcla_") as run_directory:
+        merge_pass = 0
+        while len(sources) > fan_in:
+            runs: List[str] = []
+            for start in range(0, len(sources), fan_in):
+                run_file = os.path.join(run_directory, f"{merge_pass}_{len(runs)}.txt")
+                with open(run_file, 'w', encoding='utf-8') as file:
+                    file.writelines(f"{word}\t{doc_id}\n" for word, doc_id in
+                                    heapq.merge(*(source() for source in sources[start:start + fan_in])))
+                runs.append(run_file)
+            if merge_pass > 0:
+                # Los intermedios de la pasada anterior ya se mezclaron
+                for source in sources:
+                    os.remove(source.args[0])
+            sources = [partial(iter_run_words, run_file) for run_file in runs]
+            merge_pass += 1
+        yield from _group_postings(heapq.merge(*(source() for source in sources)))
+
+def _group_postings(pairs: Iterator[Tuple[str, int]]) -> Iterator[Tuple[str, List[int]]]:
+    """Agrupa pares (palabra, documento) ordenados en (término, documentos sin repetir)."""
+    current_term: Optional[str] = None
+    postings: List[int] = []
+    for word, doc_id in pairs:
+        if word != current_term:
+            if current_term is not None:
+                yield current_term, postings
+            current_term = word
+            postings = []
+        if not postings or postings[-1] != doc_id:
+            postings.append(doc_id)
+    if current_term is not None:
+        yield current_term, postings
+
+def build_index(words_files: List[str], index_path: str) -> Tuple[int, int, int, List[Tuple[int, str]]]:
+    """
+    Función para construir el índice invertido en disco a partir de los archivos de palabras.
+    Los postings se escriben directamente al archivo final y la tabla de términos
+    en archivos temporales, así que nada de tamaño proporcional al corpus queda en memoria.
+    Retorna (documentos, términos, postings totales, términos con mayor df).
+    """
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    num_terms = 0
+    num_postings = 0
+    top_terms: List[Tuple[int, str]] = []  # Heap acotado a TOP_TERMS elementos
+
+    with open(index_path, 'wb') as index_file, \
+         tempfile.TemporaryFile() as terms_file, \
+         tempfile.TemporaryFile() as table_file:
+        index_file.write(b"\0" * HEADER_SIZE)  # Se reescribe al final
+
+        docs_offset = index_file.tell()
+        for words_file in words_files:
+            name = document_name(words_file).encode('utf-8')
+            index_file.write(struct.pack("<H", len(name)) + name)
+
+        postings_offset = index_file.tell()
+        terms_size = 0
+        for term, doc_ids in merge_postings(words_files):
+            encoded = bytearray()
+            previous = 0
+            for doc_id in doc_ids:
+                encode_varint(doc_id - previous, encoded)
+                previous = doc_id
+            term_postings_offset = index_file.tell()
+            index_file.write(encoded)
+
+            term_bytes = term.encode('utf-8')
+            entry = struct.pack("<H", len(term_bytes)) + term_bytes + \
+                struct.pack(TERM_INFO_FORMAT, len(doc_ids), term_postings_offset, len(encoded))
+            table_file.write(struct.pack(OFFSET_FORMAT, terms_size))  # Relativo; se ajusta al copiar
+            terms_file.write(entry)
+            terms_size += len(entry)
+            num_terms += 1
+            num_postings += len(doc_ids)
+            if len(top_terms) < TOP_TERMS:
+                heapq.heappush(top_terms, (len(doc_ids), term))
+            elif len(doc_ids) > top_terms[0][0]:
+                heapq.heapreplace(top_terms, (len(doc_ids), term))
+
+        # Copiar la sección de términos y la tabla de desplazamientos (ya absolutos)
+        terms_offset = index_file.tell()
+        terms_file.seek(0)
+        shutil.copyfileobj(terms_file, index_file)
+
+        term_index_offset = index_file.tell()
+        table_file.seek(0)
+        while True:
+            block = table_file.read(OFFSET_SIZE * 4096)
+            if not block:
+                break
+            relative = struct.unpack(f"<{len(block) // OFFSET_SIZE}Q", block)
+            index_file.write(struct.pack(f"<{len(relative)}Q", *(terms_offset + offset for offset in relative)))
+
+        index_file.seek(0)
+        index_file.write(struct.pack(HEADER_FORMAT, INDEX_MAGIC, INDEX_VERSION, len(words_files), num_terms,
+                                     docs_offset, terms_offset, term_index_offset, postings_offset))
+
+    return len(words_files), num_terms, num_postings, sorted(top_terms, key=lambda item: (-item[0], item[1]))
+
+class IndexReader:
+    """
+    Lector del índice invertido. El archivo se mapea en memoria (mmap), así que
+    solo se leen del disco las páginas de los términos y postings consultados.
+    """
+
+    def __init__(self, index_path: str):
+        self._file = open(index_path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.num_docs, self.num_terms, docs_offset,
+         self._terms_offset, self._term_index_offset, _) = struct.unpack_from(HEADER_FORMAT, self._data, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"{index_path} no es un índice válido (versión {INDEX_VERSION})")
+
+        # La tabla de documentos es pequeña (un nombre por archivo) y se carga completa
+        self.documents: List[str] = []
+        position = docs_offset
+        for _ in range(self.num_docs):
+            (length,) = struct.unpack_from("<H", self._data, position)
+            position += 2
+            self.documents.append(self._data[position:position + length].decode('utf-8'))
+            position += length
+
+    def close(self) -> None:
+        self._data.close()
+        self._file.close()
+
+    def __enter__(self) -> "IndexReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def term_at(self, position: int) -> Tuple[str, int, int, int]:
+        """Retorna (término, df, desplazamiento y longitud de sus postings) de la posición dada."""
+        (entry_offset,) = struct.unpack_from(OFFSET_FORMAT, self._data, self._term_index_offset + position * OFFSET_SIZE)
+        (length,) = struct.unpack_from("<H", self._data, entry_offset)
+        term = self._data[entry_offset + 2:entry_offset + 2 + length].decode('utf-8')
+        doc_freq, postings_offset, postings_length = struct.unpack_from(
+            TERM_INFO_FORMAT, self._data, entry_offset + 2 + length)
+        return term, doc_freq, postings_offset, postings_length
+
+    def find_term(self, term: str) -> int:
+        """Búsqueda binaria: retorna la primera posición cuyo término es >= term."""
+        low, high = 0, self.num_terms
+        while low < high:
+            middle = (low + high) // 2
+            if self.term_at(middle)[0] < term:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def postings(self, term: str) -> List[int]:
+        """Retorna los ids de los documentos que contienen el término (vacío si no existe)."""
+        position = self.find_term(term)
+        if position >= self.num_terms:
+            return []
+        found, doc_freq, offset, length = self.term_at(position)
+        if found != term:
+            return []
+        return decode_postings(memoryview(self._data)[offset:offset + length], doc_freq)
+
+def main():
+    # Configuración
+    words_directory = "Words_Files"
+    matricula = MATRICULA
+    output_file = f"indice_{matricula}.txt"
+    index_path = os.path.join(INDEX_DIRECTORY, INDEX_FILENAME)
+
+    # Verificar que existe el directorio Words_Files
+    if not os.path.exists(words_directory):
+        print(f"Error: No se encontró el directorio {words_directory}")
+        print("Primero ejecuta la Actividad 3 para generar los archivos de palabras")
+        return
+
+    words_files = glob.glob(os.path.join(words_directory, "*_words.txt"))
+    words_files.sort()  # Ordenar alfabéticamente (define el id de cada documento)
+
+    if not words_files:
+        print(f"No se encontraron archivos de palabras en {words_directory}")
+        return
+
+    print(f"Encontrados {len(words_files)} archivos de palabras")
+    print("Construyendo índice invertido (mezcla de k vías)...")
+
+    start_time = time.perf_counter()
+    num_docs, num_terms, num_postings, top_terms = build_index(words_files, index_path)
+    build_time = time.perf_counter() - start_time
+    index_size = os.path.getsize(index_path)
+
+    # Generar reporte
+    with open(output_file, 'w', encoding='utf-8') as log_file:
+        log_file.write("="*70 + "\n")
+        log_file.write("REPORTE DE CONSTRUCCIÓN DEL ÍNDICE INVERTIDO\n")
+        log_file.write("="*70 + "\n")
+        log_file.write(f"Matrícula: {matricula}\n")
+        log_file.write(f"Fecha: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        log_file.write(f"Directorio de entrada: {words_directory}/\n")
+        log_file.write(f"Archivo de índice: {index_path}\n")
+        log_file.write("="*70 + "\n\n")
+        log_file.write(f"{'Documentos:':<30} {num_docs}\n")
+        log_file.write(f"{'Términos (vocabulario):':<30} {num_terms}\n")
+        log_file.write(f"{'Postings totales:':<30} {num_postings}\n")
+        log_file.write(f"{'Tamaño del índice (bytes):':<30} {index_size}\n")
+        if num_postings:
+            log_file.write(f"{'Bytes por posting:':<30} {index_size / num_postings:.2f}\n")
+        log_file.write(f"{'Tiempo de construcción:':<30} {build_time:.{PRECISION_DECIMALS}f} segundos\n")
+        
+        log_file.write(f"\nTÉRMINOS CON MAYOR FRECUENCIA DE DOCUMENTO:\n")
+        log_file.write("-"*45 + "\n")
+        log_file.write(f"{'Término':<30} {'Documentos':<10}\n")
+        log_file.write("-"*45 + "\n")
+        for doc_freq, term in top_terms:
+            log_file.write(f"{term:<30} {doc_freq:<10}\n")
+        log_file.write("\n" + "="*70 + "\n")
+        log_file.write("FIN DEL REPORTE\n")
+        log_file.write("="*70 + "\n")
+
+    # Mostrar resumen en consola
+    print("\n" + "="*60)
+    print("RESUMEN DE RESULTADOS:")
+    print("="*60)
+    print(f"Documentos: {num_docs}")
+    print(f"Términos: {num_terms}")
+    print(f"Postings: {num_postings}")
+    print(f"Tamaño del índice: {index_size} bytes")
+    print(f"Tiempo de construcción: {build_time:.{PRECISION_DECIMALS}f} segundos")
+    print(f"Índice guardado en: {index_path}")
+    print(f"Reporte guardado en: {output_file}")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
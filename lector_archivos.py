@@ -0,0 +1,94 @@
+import codecs
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+from config import ENCODING, FALLBACK_ENCODINGS
+from metricas import FileMetrics
+from entradas_comprimidas import read_input
+
+# Marcas de orden de bytes (BOM) y la codificación que indican.
+# UTF-32 va antes que UTF-16 porque su BOM little-endian empieza igual.
+BOM_ENCODINGS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+def sniff_bom(raw: bytes) -> Optional[str]:
+    """
+    Función para detectar la codificación a partir de la marca BOM inicial.
+    Retorna None si el contenido no empieza con una BOM conocida.
+    """
+    for bom, encoding in BOM_ENCODINGS:
+        if raw.startswith(bom):
+            return encoding
+    return None
+
+def candidate_encodings(raw: bytes) -> List[str]:
+    """
+    Función para obtener las codificaciones a intentar, en orden.
+    Si hay BOM se intenta primero la codificación que indica; después la
+    codificación configurada y las alternativas de config.py.
+    """
+    candidates = [ENCODING] + FALLBACK_ENCODINGS
+    bom_encoding = sniff_bom(raw)
+    if bom_encoding is not None:
+        candidates.insert(0, bom_encoding)
+    return candidates
+
+def normalize_newlines(content: str) -> str:
+    """Convierte saltos de línea \\r\\n y \\r a \\n, igual que open() en modo texto."""
+    if '\r' not in content:
+        return content
+    return content.replace('\r\n', '\n').replace('\r', '\n')
+
+def decode_bytes(raw: bytes, encoding: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Función para decodificar en memoria el contenido de un archivo.
+    Si se conoce la codificación (por ejemplo, registrada por una etapa anterior)
+    se usa directamente; si no, se detecta. La validación UTF-8 se detiene en el
+    primer byte inválido, así que un archivo no UTF-8 se decodifica completo una sola vez.
+    Retorna el texto y la codificación usada, o (None, None) si ninguna funciona.
+    """
+    candidates = candidate_encodings(raw)
+    if encoding is not None:
+        candidates.insert(0, encoding)
+    for candidate in candidates:
+        try:
+            content = raw.decode(candidate)
+        except (UnicodeDecodeError, UnicodeError, LookupError):
+            continue
+        return normalize_newlines(content), candidate
+    return None, None
+
+def load_text(filename: str, encoding: Optional[str] = None,
+              metrics: Optional[FileMetrics] = None) -> Tuple[Optional[str], Optional[str], int]:
+    """
+    Función para leer un archivo una sola vez y decodificarlo.
+    Recibe el nombre del archivo, opcionalmente la codificación ya conocida y las
+    métricas del archivo, donde se registran las subetapas de lectura y decodificación.
+    Los archivos comprimidos y los miembros de tar se leen sin extraerlos a disco
+    (ver entradas_comprimidas.py); el número de bytes es el del contenido descomprimido.
+    Retorna el texto, la codificación usada y el número de bytes leídos.
+    Los errores de lectura (archivo inexistente, permisos) se propagan al llamador.
+    """
+    if metrics is None:
+        raw = read_input(filename)
+        content, encoding_used = decode_bytes(raw, encoding)
+        return content, encoding_used, len(raw)
+    
+    raw = read_input(filename, metrics)
+    metrics.bytes_in = len(raw)
+    with metrics.stage("decodificacion"):
+        content, encoding_used = decode_bytes(raw, encoding)
+    metrics.encoding = encoding_used
+    return content, encoding_used, len(raw)
+
+def encoding_histogram(encodings: Iterable[Optional[str]]) -> List[Tuple[str, int]]:
+    """
+    Función para contar cuántos archivos se leyeron con cada codificación.
+    Retorna pares (codificación, archivos) ordenados de mayor a menor.
+    """
+    counts = Counter(encoding or "desconocida" for encoding in encodings)
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,106 @@
+import os
+import threading
+from typing import Optional, Sequence
+from config import PREFETCH_DEPTH, PREFETCH_MAX_BYTES, PREFETCH_BLOCK_SIZE
+from entradas_comprimidas import split_member
+
+# La sugerencia WILLNEED (cargar un archivo en segundo plano) solo existe donde hay posix_fadvise
+WILLNEED_SUPPORTED = hasattr(os, "posix_fadvise") and hasattr(os, "POSIX_FADV_WILLNEED")
+
+class Prefetcher:
+    """
+    Hilo que lee por adelantado los próximos depth archivos mientras el actual se limpia o
+    tokeniza. Donde hay posix_fadvise primero pide al sistema operativo que los cargue
+    (WILLNEED) y después los lee a un búfer reutilizado: quedan en la caché del sistema
+    operativo, que comparten los procesos del pool, y la lectura del archivo ya no espera
+    al disco. No guarda el contenido, así que la memoria usada es la del búfer.
+    Los archivos mayores a PREFETCH_MAX_BYTES solo reciben la sugerencia y los miembros de
+    un tar se omiten (el tar se lee en secuencia al procesarlos).
+    """
+
+    def __init__(self, depth: int = PREFETCH_DEPTH):
+        self.depth = depth
+        self.files = 0  # Archivos leídos por adelantado
+        self.bytes = 0
+        self._paths: Sequence[str] = []
+        self._position = 0  # Índice del archivo que se está procesando
+        self._lead = 0
+        self._complete = True  # False mientras paths siga creciendo (descubrimiento perezoso)
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._buffer = bytearray(PREFETCH_BLOCK_SIZE)
+
+    def start(self, paths: Sequence[str], lead: int = 0, complete: bool = True) -> None:
+        """
+        Empieza a leer por adelantado paths, en ese orden. lead son los archivos que ya
+        están en curso más allá de la posición informada (los bloques enviados al pool).
+        Con complete=False paths es una lista que el llamador sigue extendiendo conforme
+        descubre archivos; el hilo espera nuevas rutas hasta que se llama a finish().
+        """
+        self.stop()
+        self._paths = paths
+        self._position = 0
+        self._lead = lead
+        self._complete = complete
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="precarga", daemon=True)
+        self._thread.start()
+
+    def seek(self, index: int) -> None:
+        """Informa que ya se procesa el archivo index: la ventana de lectura avanza."""
+        with self._condition:
+            self._position = index
+            self._condition.notify()
+
+    def finish(self) -> None:
+        """Informa que paths ya no crecerá: el hilo termina al llegar al final."""
+        with self._condition:
+            self._complete = True
+            self._condition.notify()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        next_index = 1  # El primer archivo ya se está leyendo
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopped:
+                        return
+                    # Los archivos que el procesamiento ya alcanzó no se leen
+                    next_index = max(next_index, self._position + 1)
+                    if next_index >= len(self._paths):
+                        if self._complete:
+                            return
+                    elif next_index <= self._position + self._lead + self.depth:
+                        break
+                    self._condition.wait()
+                path = self._paths[next_index]
+            self._warm(path)
+            next_index += 1
+
+    def _warm(self, path: str) -> None:
+        if split_member(path)[1] is not None:
+            return
+        try:
+            with open(path, 'rb', buffering=0) as file:
+                if WILLNEED_SUPPORTED:
+                    os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                if os.fstat(file.fileno()).st_size > PREFETCH_MAX_BYTES:
+                    return
+                while True:
+                    count = file.readinto(self._buffer)
+                    if not count:
+                        break
+                    self.bytes += count
+            self.files += 1
+        except OSError:
+            pass  # El error se reporta al procesar el archivo
@@ -0,0 +1,113 @@
+import os
+import csv
+import json
+import time
+from typing import Dict, Iterable, List, Optional
+
+# Subetapas medidas, en el orden en que aparecen en las exportaciones CSV
+STAGE_NAMES = ["lectura", "descompresion", "decodificacion", "limpieza", "tokenizacion", "ordenamiento", "escritura", "firma"]
+METRICS_FORMATS = ["json", "csv"]
+
+# Con --perfil, el Profiler observa cada subetapa para medir la memoria que asigna
+_stage_observer = None
+
+def set_stage_observer(observer) -> None:
+    """Registra (o quita, con None) el objeto con stage_started(nombre) y stage_finished(nombre)."""
+    global _stage_observer
+    _stage_observer = observer
+
+class _StageTimer:
+    """Context manager que suma el tiempo transcurrido a una subetapa."""
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics: "FileMetrics", name: str):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self) -> None:
+        if _stage_observer is not None:
+            _stage_observer.stage_started(self._name)
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self._metrics.add(self._name, time.perf_counter() - self._start)
+        if _stage_observer is not None:
+            _stage_observer.stage_finished(self._name)
+
+class FileMetrics:
+    """
+    Métricas de un archivo: duración de cada subetapa, bytes leídos y escritos,
+    codificación y error (si lo hubo). Un tiempo de 0 en los reportes de texto
+    significa error; aquí el estado y el mensaje quedan registrados explícitamente.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.stages: Dict[str, float] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.encoding: Optional[str] = None
+        self.error: Optional[str] = None
+
+    def stage(self, name: str) -> _StageTimer:
+        """Uso: with metrics.stage("limpieza"): ..."""
+        return _StageTimer(self, name)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def fail(self, message: str) -> None:
+        self.error = message
+
+    def to_dict(self, total_seconds: float) -> Dict[str, object]:
+        return {
+            "archivo": self.filename,
+            "estado": "error" if self.error else "ok",
+            "error": self.error,
+            "codificacion": self.encoding,
+            "bytes_entrada": self.bytes_in,
+            "bytes_salida": self.bytes_out,
+            "tiempo_total": total_seconds,
+            "etapas": dict(self.stages),
+        }
+
+def cached_record(filename: str, encoding: Optional[str] = None) -> Dict[str, object]:
+    """Registro de un archivo que no se procesó por ser un acierto de la caché incremental."""
+    return {"archivo": filename, "estado": "cache", "error": None, "codificacion": encoding,
+            "bytes_entrada": 0, "bytes_salida": 0, "tiempo_total": 0.0, "etapas": {}}
+
+def duplicate_record(filename: str, original: str, encoding: Optional[str] = None,
+                     seconds: float = 0.0) -> Dict[str, object]:
+    """Registro de un duplicado exacto que reutilizó la salida de su original (con --duplicados)."""
+    return {"archivo": filename, "estado": "duplicado", "error": None, "codificacion": encoding,
+            "bytes_entrada": 0, "bytes_salida": 0, "tiempo_total": seconds, "etapas": {"escritura": seconds},
+            "duplicado_de": original}
+
+def metrics_path(report_file: str, fmt: str) -> str:
+    """a2_A00000000.txt -> a2_A00000000_metricas.jsonl (o .csv), junto al reporte de texto."""
+    base_name = os.path.splitext(report_file)[0]
+    return f"{base_name}_metricas.{'jsonl' if fmt == 'json' else 'csv'}"
+
+def write_metrics(records: Iterable[Dict[str, object]], path: str, fmt: str, script: str) -> int:
+    """
+    Función para exportar las métricas por archivo como JSON lines o CSV.
+    En CSV cada subetapa es una columna "etapa_<nombre>".
+    Retorna el número de registros escritos.
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        if fmt == "json":
+            for record in records:
+                file.write(json.dumps(dict(record, script=script), ensure_ascii=False) + "\n")
+                count += 1
+        else:
+            columns: List[str] = ["script", "archivo", "estado", "error", "codificacion", "bytes_entrada",
+                                  "bytes_salida", "tiempo_total"] + [f"etapa_{name}" for name in STAGE_NAMES]
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            for record in records:
+                stages = record["etapas"]
+                writer.writerow([script] + [record[column] for column in columns[1:8]] +
+                                [stages.get(name, "") for name in STAGE_NAMES])
+                count += 1
+    return count
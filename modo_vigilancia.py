@@ -0,0 +1,296 @@
+import os
+import time
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Deque, Dict, List, Optional, Tuple
+from config import (MATRICULA, FILES_DIRECTORY, PRECISION_DECIMALS, DEFAULT_WORKERS, DEFAULT_CLEANER,
+                    WATCH_POLL_INTERVAL, WATCH_LATENCY_WINDOW)
+from actividad2_html_cleaner import CLEANERS
+from pipeline_fusionado import PipelineResult, html_to_words
+from procesamiento_paralelo import process_files, resolve_workers
+from estadisticas import percentile
+
+# Firma de un archivo en una instantánea: (fecha de modificación en ns, tamaño en bytes)
+Signature = Tuple[int, int]
+
+def scan_directory(directory: str, extension: str = ".html") -> Dict[str, Signature]:
+    """
+    Función para tomar una instantánea del directorio con os.scandir (una sola
+    lectura del directorio, sin glob). Retorna {ruta: (mtime_ns, tamaño)}.
+    """
+    snapshot: Dict[str, Signature] = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.endswith(extension):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                info = entry.stat()
+            except FileNotFoundError:
+                continue  # Se eliminó entre el listado y stat()
+            snapshot[entry.path] = (info.st_mtime_ns, info.st_size)
+    return snapshot
+
+def output_paths(html_file: str) -> List[str]:
+    """Retorna los archivos que el pipeline genera para un archivo HTML."""
+    base_name = os.path.splitext(os.path.basename(html_file))[0]
+    return [os.path.join("Clean_Files", f"{base_name}_clean.txt"),
+            os.path.join("Words_Files", f"{base_name}_words.txt")]
+
+class DirectoryWatcher:
+    """
+    Detecta archivos nuevos, modificados y eliminados comparando instantáneas.
+    Un archivo recién escrito se entrega cuando su firma no cambió entre dos sondeos
+    seguidos, para no procesar a medias un archivo que el crawler sigue escribiendo;
+    si su fecha de modificación ya es más antigua que el intervalo, se entrega de inmediato.
+    La llegada de un archivo es su fecha de modificación, pero no antes del sondeo anterior
+    al que lo detectó (mv o rsync -t conservan una fecha más antigua: el archivo llegó
+    entre los dos sondeos) ni después del sondeo actual. Así la latencia incluye la espera
+    hasta el sondeo; los archivos del primer sondeo ya existían al iniciar y no tienen llegada.
+    """
+
+    def __init__(self, directory: str, interval: float, skip_existing: bool = False):
+        self.directory = directory
+        self.interval = interval
+        self.processed: Dict[str, Signature] = scan_directory(directory) if skip_existing else {}
+        self.detected: Dict[str, Optional[float]] = {}  # Archivo listo -> llegada (time.time())
+        self._pending: Dict[str, Signature] = {}
+        self._pending_detected: Dict[str, Optional[float]] = {}
+        self._last_poll: Optional[float] = time.time() if skip_existing else None  # None: aún no hay sondeo previo
+
+    def poll(self) -> Tuple[List[str], List[str]]:
+        """Retorna (archivos listos para procesar, archivos eliminados), en orden alfabético."""
+        current = scan_directory(self.directory)
+        now = time.time()
+        previous_poll, self._last_poll = self._last_poll, now
+        settled_before = time.time_ns() - int(self.interval * 1e9)
+        ready: List[str] = []
+        pending: Dict[str, Signature] = {}
+        pending_detected: Dict[str, Optional[float]] = {}
+        for path, signature in current.items():
+            if self.processed.get(path) == signature:
+                continue
+            # Un archivo que se sigue escribiendo conserva la llegada del primer sondeo que lo vio
+            if path in self._pending_detected:
+                detected = self._pending_detected[path]
+            elif previous_poll is None:
+                detected = None
+            else:
+                detected = min(max(signature[0] / 1e9, previous_poll), now)
+            if self._pending.get(path) == signature or signature[0] <= settled_before:
+                ready.append(path)
+                self.processed[path] = signature
+                self.detected[path] = detected
+            else:
+                pending[path] = signature
+                pending_detected[path] = detected
+        self._pending = pending
+        self._pending_detected = pending_detected
+
+        removed = [path for path in self.processed if path not in current]
+        for path in removed:
+            del self.processed[path]
+            self.detected.pop(path, None)
+        return sorted(ready), sorted(removed)
+
+class WatchStats:
+    """
+    Estadísticas del modo vigilancia. Se actualizan archivo por archivo: al reprocesar
+    un archivo modificado se resta su resultado anterior antes de sumar el nuevo.
+    """
+
+    def __init__(self):
+        self.files: Dict[str, Tuple[str, int, Optional[str]]] = {}  # nombre -> (estado, palabras, codificación)
+        self.successful_files = 0
+        self.total_words = 0
+        self.encodings: Counter = Counter()
+        self.events = 0  # Archivos procesados, contando reprocesos
+        self.errors = 0
+        self.removed = 0
+        self.total_time = 0.0
+        self.latencies: Deque[float] = deque(maxlen=WATCH_LATENCY_WINDOW)
+
+    def forget(self, name: str) -> None:
+        """Resta el último resultado de un archivo (reprocesado o eliminado)."""
+        previous = self.files.pop(name, None)
+        if previous is None:
+            return
+        status, word_count, encoding = previous
+        if status == "Exitoso":
+            self.successful_files -= 1
+            self.total_words -= word_count
+            self.encodings[encoding or "desconocida"] -= 1
+            if self.encodings[encoding or "desconocida"] == 0:
+                del self.encodings[encoding or "desconocida"]
+
+    def record(self, result: PipelineResult, latency: Optional[float]) -> None:
+        """
+        Suma el resultado de un archivo y la latencia desde su llegada hasta la salida
+        (None para archivos que ya existían antes de iniciar la vigilancia).
+        """
+        filename, file_time, status, word_count, encoding, _ = result
+        self.forget(filename)
+        self.files[filename] = (status, word_count, encoding)
+        self.events += 1
+        self.total_time += file_time
+        if status == "Exitoso":
+            self.successful_files += 1
+            self.total_words += word_count
+            self.encodings[encoding or "desconocida"] += 1
+            if latency is not None:
+                self.latencies.append(latency)
+        else:
+            self.errors += 1
+
+def remove_outputs(html_file: str) -> None:
+    """Elimina las salidas de un archivo HTML que ya no existe."""
+    for path in output_paths(html_file):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def write_report(output_file: str, stats: WatchStats, files_directory: str, cleaner: str,
+                 workers: int, interval: float, started: str) -> None:
+    """Reescribe el reporte de vigilancia con las estadísticas actuales."""
+    latencies = list(stats.latencies)
+    with open(output_file, 'w', encoding='utf-8') as log_file:
+        log_file.write("="*80 + "\n")
+        log_file.write("REPORTE DEL MODO VIGILANCIA (HTML -> PALABRAS)\n")
+        log_file.write("="*80 + "\n")
+        log_file.write(f"Matrícula: {MATRICULA}\n")
+        log_file.write(f"Inicio: {started}\n")
+        log_file.write(f"Última actualización: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        log_file.write(f"Directorio vigilado: {files_directory}/\n")
+        log_file.write(f"Directorio de salida: Clean_Files/ y Words_Files/\n")
+        log_file.write(f"Método de limpieza: {cleaner}\n")
+        log_file.write(f"Procesos en uso: {workers}\n")
+        log_file.write(f"Intervalo de sondeo: {interval} segundos\n")
+        log_file.write("="*80 + "\n\n")
+
+        log_file.write("ESTADO ACTUAL:\n")
+        log_file.write("-"*65 + "\n")
+        log_file.write(f"{'Archivos vigentes:':<40} {len(stats.files)}\n")
+        log_file.write(f"{'Archivos exitosos:':<40} {stats.successful_files}\n")
+        log_file.write(f"{'Total palabras únicas:':<40} {stats.total_words}\n")
+        log_file.write(f"{'Archivos procesados (con reprocesos):':<40} {stats.events}\n")
+        log_file.write(f"{'Errores:':<40} {stats.errors}\n")
+        log_file.write(f"{'Archivos eliminados:':<40} {stats.removed}\n")
+        log_file.write(f"{'Tiempo de procesamiento:':<40} {stats.total_time:.{PRECISION_DECIMALS}f} segundos\n")
+        log_file.write("-"*65 + "\n")
+
+        log_file.write(f"\nLATENCIA LLEGADA -> Words_Files/ (últimos {len(latencies)} archivos):\n")
+        log_file.write("(llegada: fecha de modificación del archivo, acotada entre el sondeo anterior y el que lo detectó)\n")
+        log_file.write(f"p50: {percentile(latencies, 0.50):.{PRECISION_DECIMALS}f} segundos\n")
+        log_file.write(f"p90: {percentile(latencies, 0.90):.{PRECISION_DECIMALS}f} segundos\n")
+        log_file.write(f"Máxima: {max(latencies, default=0):.{PRECISION_DECIMALS}f} segundos\n")
+
+        log_file.write(f"\nCODIFICACIONES DETECTADAS:\n")
+        for encoding, count in sorted(stats.encodings.items(), key=lambda item: (-item[1], item[0])):
+            log_file.write(f"{encoding:<15} {count} archivos\n")
+
+        log_file.write("\n" + "="*80 + "\n")
+        log_file.write("DESCRIPCIÓN DEL PROCESO:\n")
+        log_file.write("="*80 + "\n")
+        log_file.write("1. Sondeo del directorio con os.scandir y comparación de (fecha, tamaño) con la instantánea anterior\n")
+        log_file.write("2. Espera de un sondeo para archivos que se siguen escribiendo\n")
+        log_file.write("3. Limpieza y extracción de palabras solo de archivos nuevos o modificados (pipeline fusionado)\n")
+        log_file.write("4. Eliminación de las salidas de archivos borrados\n")
+        log_file.write("5. Actualización incremental de las estadísticas y del reporte\n")
+        log_file.write("\n" + "="*80 + "\n")
+        log_file.write("FIN DEL REPORTE\n")
+        log_file.write("="*80 + "\n")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Modo vigilancia - procesa los archivos HTML a medida que llegan")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Número de procesos a usar (0 = todos los núcleos)")
+    parser.add_argument("--limpieza", choices=list(CLEANERS), default=DEFAULT_CLEANER,
+                        help="Método de limpieza: tokenizador de una pasada o expresiones regulares originales")
+    parser.add_argument("--intervalo", type=float, default=WATCH_POLL_INTERVAL,
+                        help="Segundos entre sondeos del directorio")
+    parser.add_argument("--solo-nuevos", action="store_true",
+                        help="No procesar los archivos que ya existen al iniciar")
+    parser.add_argument("--duracion", type=float, default=None,
+                        help="Detenerse después de estos segundos (por defecto, hasta Ctrl+C)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    # Configuración
+    files_directory = FILES_DIRECTORY
+    output_file = f"vigilancia_{MATRICULA}.txt"
+    workers = resolve_workers(args.workers)
+
+    # Verificar que existe el directorio Files
+    if not os.path.exists(files_directory):
+        print(f"Error: No se encontró el directorio {files_directory}")
+        return
+
+    watcher = DirectoryWatcher(files_directory, args.intervalo, skip_existing=args.solo_nuevos)
+    stats = WatchStats()
+    started = time.strftime('%Y-%m-%d %H:%M:%S')
+    worker_func = partial(html_to_words, write_clean=True, cleaner=args.limpieza)
+    deadline = time.monotonic() + args.duracion if args.duracion is not None else None
+    # Un solo pool para toda la vigilancia: crear uno por sondeo costaría más que procesar un lote pequeño
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    print(f"Vigilando {files_directory}/ cada {args.intervalo} segundos (Ctrl+C para terminar)")
+    print(f"Método de limpieza: {args.limpieza}")
+    print(f"Procesos en uso: {workers}")
+    if args.solo_nuevos:
+        print(f"Archivos existentes omitidos: {len(watcher.processed)}")
+    print("-" * 70)
+    write_report(output_file, stats, files_directory, args.limpieza, workers, args.intervalo, started)
+
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            cycle_start = time.monotonic()
+            ready, removed = watcher.poll()
+
+            for html_file in removed:
+                remove_outputs(html_file)
+                stats.forget(os.path.basename(html_file))
+                stats.removed += 1
+                print(f"- Eliminado: {os.path.basename(html_file)}")
+
+            for html_file, result in zip(ready, process_files(worker_func, ready, workers, executor=executor)):
+                # La llegada es el sondeo que detectó el archivo; los que ya existían al
+                # iniciar no cuentan para la latencia
+                arrival = watcher.detected.pop(html_file, None)
+                latency = time.time() - arrival if arrival is not None else None
+                stats.record(result, latency)
+                filename, file_time, status, word_count, _, _ = result
+                mark = "✓" if status == "Exitoso" else "✗"
+                latency_text = f" - Latencia: {latency:.3f}s" if latency is not None else ""
+                print(f"{mark} Procesado: {filename:<25} - Tiempo: {file_time:.{PRECISION_DECIMALS}f}s - "
+                      f"Palabras: {word_count}{latency_text}")
+
+            if ready or removed:
+                write_report(output_file, stats, files_directory, args.limpieza, workers, args.intervalo, started)
+            time.sleep(max(0.0, args.intervalo - (time.monotonic() - cycle_start)))
+    except KeyboardInterrupt:
+        print("\nVigilancia detenida por el usuario")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    write_report(output_file, stats, files_directory, args.limpieza, workers, args.intervalo, started)
+
+    # Mostrar resumen en consola
+    print("\n" + "="*70)
+    print("RESUMEN DE LA VIGILANCIA:")
+    print("="*70)
+    print(f"Archivos vigentes: {len(stats.files)}")
+    print(f"Archivos procesados (con reprocesos): {stats.events}")
+    print(f"Total de palabras únicas: {stats.total_words}")
+    print(f"Latencia p50: {percentile(list(stats.latencies), 0.50):.3f} segundos")
+    print(f"Reporte guardado en: {output_file}")
+    print("="*70)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import re
+import math
+import heapq
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import MAX_PREFIX_EXPANSIONS
+from indice_invertido import IndexReader
+
+# Palabras reservadas del lenguaje de consultas (en mayúsculas)
+OPERATORS = {"AND", "OR", "NOT"}
+TOKEN_PATTERN = re.compile(r'\(|\)|[^\s()]+')
+
+def gallop_to(postings: List[int], target: int, low: int) -> int:
+    """
+    Búsqueda galopante: avanza con saltos 1, 2, 4, 8... desde low hasta pasar
+    target y después hace búsqueda binaria dentro del último salto.
+    Retorna la primera posición >= low cuyo valor es >= target.
+    """
+    step = 1
+    high = low
+    while high < len(postings) and postings[high] < target:
+        low = high + 1
+        high += step
+        step *= 2
+    return bisect_left(postings, target, low, min(high, len(postings)))
+
+def intersect(first: List[int], second: List[int]) -> List[int]:
+    """
+    Función para intersectar dos listas de postings ordenadas.
+    Recorre la lista corta y galopa en la larga, así que el costo depende
+    sobre todo del tamaño de la lista más corta.
+    """
+    if len(first) > len(second):
+        first, second = second, first
+    result: List[int] = []
+    position = 0
+    for doc_id in first:
+        position = gallop_to(second, doc_id, position)
+        if position == len(second):
+            break
+        if second[position] == doc_id:
+            result.append(doc_id)
+    return result
+
+def difference(first: List[int], second: List[int]) -> List[int]:
+    """Retorna los documentos de first que no aparecen en second (ambas ordenadas)."""
+    result: List[int] = []
+    position = 0
+    for doc_id in first:
+        position = gallop_to(second, doc_id, position)
+        if position == len(second) or second[position] != doc_id:
+            result.append(doc_id)
+    return result
+
+def union(first: List[int], second: List[int]) -> List[int]:
+    """Retorna la unión ordenada de dos listas de postings."""
+    result: List[int] = []
+    i = j = 0
+    while i < len(first) and j < len(second):
+        if first[i] < second[j]:
+            result.append(first[i])
+            i += 1
+        elif first[i] > second[j]:
+            result.append(second[j])
+            j += 1
+        else:
+            result.append(first[i])
+            i += 1
+            j += 1
+    result.extend(first[i:])
+    result.extend(second[j:])
+    return result
+
+def union_all(postings_lists: Iterable[List[int]]) -> List[int]:
+    """
+    Retorna la unión ordenada de varias listas de postings en una sola pasada:
+    heapq.merge las mezcla y los documentos repetidos quedan contiguos.
+    """
+    result: List[int] = []
+    for doc_id in heapq.merge(*postings_lists):
+        if not result or result[-1] != doc_id:
+            result.append(doc_id)
+    return result
+
+class QuerySyntaxError(ValueError):
+    """Error en la sintaxis de una consulta."""
+
+class SearchEngine:
+    """
+    Motor de consultas sobre el índice invertido (ver indice_invertido.py).
+    Soporta términos simples, prefijos (palabra*), AND, OR, NOT y paréntesis;
+    dos términos seguidos sin operador se combinan con AND.
+    Precedencia: NOT > AND > OR.
+    """
+
+    def __init__(self, reader: IndexReader):
+        self.reader = reader
+        self._postings_cache: Dict[str, List[int]] = {}
+        self.truncated_prefixes: List[str] = []  # Prefijos de la última consulta con más de MAX_PREFIX_EXPANSIONS términos
+
+    def term_postings(self, term: str) -> List[int]:
+        """Retorna los postings de un término, decodificándolos una sola vez por consulta."""
+        term = term.lower()
+        if term not in self._postings_cache:
+            self._postings_cache[term] = self.reader.postings(term)
+        return self._postings_cache[term]
+
+    def prefix_terms(self, prefix: str) -> Tuple[List[Tuple[str, int]], bool]:
+        """
+        Retorna (término, df) de los primeros MAX_PREFIX_EXPANSIONS términos que empiezan
+        con el prefijo, en orden, y si quedaron más términos sin expandir.
+        """
+        prefix = prefix.lower()
+        terms: List[Tuple[str, int]] = []
+        position = self.reader.find_term(prefix)
+        while position < self.reader.num_terms:
+            term, doc_freq, _, _ = self.reader.term_at(position)
+            if not term.startswith(prefix):
+                break
+            if len(terms) == MAX_PREFIX_EXPANSIONS:
+                return terms, True
+            terms.append((term, doc_freq))
+            position += 1
+        return terms, False
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Función para ejecutar una consulta.
+        Retorna los documentos encontrados como (nombre, puntaje), ordenados de mayor a menor
+        puntaje. El puntaje es la suma del idf de los términos positivos que contiene el documento.
+        Los prefijos que se expandieron solo a sus primeros MAX_PREFIX_EXPANSIONS términos
+        quedan en truncated_prefixes (los resultados pueden estar incompletos).
+        """
+        tokens = TOKEN_PATTERN.findall(query)
+        if not tokens:
+            return []
+        self._tokens = tokens
+        self._position = 0
+        self._weights: Dict[str, float] = {}  # Términos de la consulta y su idf
+        self._postings_cache = {}
+        self.truncated_prefixes = []
+        doc_ids = self._parse_or()
+        if self._position != len(self._tokens):
+            raise QuerySyntaxError(f"Token inesperado: {self._tokens[self._position]}")
+
+        scores = dict.fromkeys(doc_ids, 0.0)
+        for term, weight in self._weights.items():
+            for doc_id in intersect(doc_ids, self.term_postings(term)):
+                scores[doc_id] += weight
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self.reader.documents[doc_id], score) for doc_id, score in ranked]
+
+    # --- Analizador de descenso recursivo ---
+
+    def _peek(self) -> Optional[str]:
+        return self._tokens[self._position] if self._position < len(self._tokens) else None
+
+    def _next(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise QuerySyntaxError("La consulta termina antes de lo esperado")
+        self._position += 1
+        return token
+
+    def _parse_or(self) -> List[int]:
+        result = self._parse_and()
+        while self._peek() == "OR":
+            self._next()
+            result = union(result, self._parse_and())
+        return result
+
+    def _parse_and(self) -> List[int]:
+        result = self._parse_not()
+        while self._peek() not in (None, "OR", ")"):
+            if self._peek() == "AND":
+                self._next()
+            if self._peek() == "NOT":
+                # "a AND NOT b" se resuelve como diferencia, sin construir el complemento
+                self._next()
+                result = difference(result, self._parse_not())
+            else:
+                result = intersect(result, self._parse_not())
+        return result
+
+    def _parse_not(self) -> List[int]:
+        if self._peek() == "NOT":
+            self._next()
+            return difference(list(range(self.reader.num_docs)), self._parse_not())
+        return self._parse_atom()
+
+    def _parse_atom(self) -> List[int]:
+        token = self._next()
+        if token == "(":
+            result = self._parse_or()
+            if self._next() != ")":
+                raise QuerySyntaxError("Falta cerrar un paréntesis")
+            return result
+        if token in OPERATORS or token == ")":
+            raise QuerySyntaxError(f"Operador fuera de lugar: {token}")
+
+        if token.endswith("*") and len(token) > 1:
+            terms, truncated = self.prefix_terms(token[:-1])
+            if truncated:
+                self.truncated_prefixes.append(token)
+            for term, doc_freq in terms:
+                self._add_weight(term, doc_freq)
+            return union_all(self.term_postings(term) for term, _ in terms)
+
+        postings = self.term_postings(token)
+        self._add_weight(token.lower(), len(postings))
+        return postings
+
+    def _add_weight(self, term: str, doc_freq: int) -> None:
+        # Los términos negados también se registran, pero no suman: ningún resultado los contiene
+        if doc_freq == 0:
+            return
+        self._weights[term] = math.log(1 + self.reader.num_docs / doc_freq)
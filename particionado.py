@@ -0,0 +1,129 @@
+import os
+import re
+import glob
+import json
+import zlib
+import argparse
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from almacen_segmentos import document_key
+from estadisticas import ReportStatistics
+
+SHARD_SUMMARY_VERSION = 2
+
+# Shard (i, N): el i-ésimo de N, con i de 1 a N
+Shard = Tuple[int, int]
+
+SHARD_SUFFIX_PATTERN = re.compile(r'_shard(\d+)de(\d+)$')
+
+def parse_shard(text: str) -> Shard:
+    """Convierte "2/4" en (2, 4); se usa como type= de argparse en las tres actividades."""
+    index, _, count = text.partition("/")
+    try:
+        shard = (int(index), int(count))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' no tiene el formato i/N (por ejemplo, 1/4)")
+    if not 1 <= shard[0] <= shard[1]:
+        raise argparse.ArgumentTypeError(f"'{text}': el shard debe estar entre 1 y {shard[1]}")
+    return shard
+
+def shard_of(path: str, count: int) -> int:
+    """
+    Función para asignar un archivo a uno de count shards (de 1 a count).
+    Usa crc32 del nombre del documento, que no depende de la máquina, del orden de
+    los archivos ni de PYTHONHASHSEED; Files/000.html y Clean_Files/000_clean.txt
+    caen en el mismo shard, así que cada nodo encuentra sus archivos limpios.
+    """
+    return zlib.crc32(document_key(path).encode('utf-8')) % count + 1
+
+def iter_shard(paths: Iterable[str], shard: Optional[Shard]) -> Iterator[str]:
+    """Entrega los archivos que le tocan al shard conforme llegan, en el mismo orden (todos si shard es None)."""
+    if shard is None:
+        return iter(paths)
+    index, count = shard
+    return (path for path in paths if shard_of(path, count) == index)
+
+def shard_report_path(report_file: str, shard: Optional[Shard]) -> str:
+    """a2_A00000000.txt -> a2_A00000000_shard1de4.txt (sin cambios si shard es None)."""
+    if shard is None:
+        return report_file
+    base_name, extension = os.path.splitext(report_file)
+    return f"{base_name}_shard{shard[0]}de{shard[1]}{extension}"
+
+def shard_cache_name(name: str, shard: Optional[Shard]) -> str:
+    """Cada shard tiene su propio manifiesto de caché: a2 -> a2_shard1de4."""
+    return name if shard is None else f"{name}_shard{shard[0]}de{shard[1]}"
+
+def summary_path(report_file: str) -> str:
+    """a2_A00000000_shard1de4.txt -> a2_A00000000_shard1de4.json, junto al reporte parcial."""
+    return f"{os.path.splitext(report_file)[0]}.json"
+
+def write_shard_summary(report_file: str, script: str, shard: Shard, results: List[tuple], total_files: int,
+                        total_individual_time: float, total_program_time: float, workers: int,
+                        extra: Optional[Dict[str, object]] = None, stats: Optional[ReportStatistics] = None) -> str:
+    """
+    Función para guardar el resumen de un shard junto a su reporte parcial: los resultados
+    por archivo y los totales que necesita la fusión (fusion_shards.py). extra guarda datos
+    propios de cada actividad, como las frecuencias de la Actividad 3; de stats se guardan
+    los contadores de entradas comprimidas, que no se pueden recalcular con las filas.
+    Retorna la ruta del resumen.
+    """
+    data = {
+        "version": SHARD_SUMMARY_VERSION,
+        "script": script,
+        "shard": list(shard),
+        "total_files": total_files,
+        "total_individual_time": total_individual_time,
+        "total_program_time": total_program_time,
+        "workers": workers,
+        "results": [list(result) for result in results],
+    }
+    if stats is not None:
+        data["descompresion"] = stats.decompression_summary()
+    data.update(extra or {})
+    path = summary_path(report_file)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False)
+    os.replace(temp_path, path)
+    return path
+
+def find_shard_summaries(report_file: str) -> Dict[int, List[str]]:
+    """
+    Función para encontrar los resúmenes de shards de un reporte (a2_A00000000.txt).
+    Retorna {N: [rutas]} agrupados por el número total de shards.
+    """
+    base_name = os.path.splitext(report_file)[0]
+    found: Dict[int, List[str]] = {}
+    for path in sorted(glob.glob(f"{glob.escape(base_name)}_shard*de*.json")):
+        match = SHARD_SUFFIX_PATTERN.search(os.path.splitext(path)[0])
+        if match is not None and os.path.splitext(path)[0][:match.start()] == base_name:
+            found.setdefault(int(match.group(2)), []).append(path)
+    return found
+
+def load_shard_summaries(report_file: str, script: str, count: Optional[int] = None) -> List[dict]:
+    """
+    Función para cargar los resúmenes de todos los shards de un reporte.
+    Si hay resúmenes de particiones distintas (por ejemplo, de 2 y de 4 shards) hay que indicar count.
+    Lanza ValueError si falta algún shard o si un resumen no corresponde a la actividad.
+    """
+    found = find_shard_summaries(report_file)
+    if not found:
+        raise ValueError(f"No se encontraron resúmenes de shards para {report_file}")
+    if count is None:
+        if len(found) > 1:
+            raise ValueError(f"Hay resúmenes de {sorted(found)} shards; indica cuántos fusionar con --shards")
+        count = next(iter(found))
+    if count not in found:
+        raise ValueError(f"No se encontraron resúmenes de {count} shards para {report_file}")
+
+    summaries: Dict[int, dict] = {}
+    for path in found[count]:
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        if data.get("version") != SHARD_SUMMARY_VERSION or data.get("script") != script:
+            raise ValueError(f"{path} no es un resumen de shard de {script} (versión {SHARD_SUMMARY_VERSION})")
+        summaries[data["shard"][0]] = data
+    missing = [index for index in range(1, count + 1) if index not in summaries]
+    if missing:
+        raise ValueError(f"Faltan los shards {', '.join(f'{index}/{count}' for index in missing)}")
+    return [summaries[index] for index in range(1, count + 1)]
@@ -0,0 +1,152 @@
+import os
+import pstats
+import cProfile
+import tracemalloc
+from typing import Dict, List, Tuple
+from config import PROFILE_TOP_FUNCTIONS, PROFILE_TOP_ALLOCATIONS, PROFILE_SNAPSHOT_STAGES, PRECISION_DECIMALS
+from metricas import set_stage_observer
+
+# Las asignaciones del propio tracemalloc y del sistema de importación no interesan en el reporte.
+# Se descartan las líneas ya agrupadas: Snapshot.filter_traces() recorre cada traza con fnmatch
+IGNORED_ALLOCATION_FILES = {tracemalloc.__file__, "<frozen importlib._bootstrap>",
+                            "<frozen importlib._bootstrap_external>", "<unknown>"}
+
+def profile_path(report_file: str) -> str:
+    """a2_A00000000.txt -> a2_A00000000.prof, junto al reporte de texto."""
+    return f"{os.path.splitext(report_file)[0]}.prof"
+
+def function_label(function: tuple) -> str:
+    """(ruta, línea, nombre) de pstats -> "archivo.py:42(nombre)"; las funciones de C quedan como "{método}"."""
+    filename, line, name = function
+    if filename == "~":
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+class _StageMemory:
+    """Memoria de una subetapa sumada sobre todas sus ejecuciones."""
+    __slots__ = ("calls", "allocated", "largest", "retained")
+
+    def __init__(self):
+        self.calls = 0
+        self.allocated = 0  # Suma de los picos sobre la memoria al entrar (incluye copias temporales)
+        self.largest = 0  # Mayor pico de una sola ejecución
+        self.retained = 0  # Suma de la memoria que seguía viva al salir
+
+    def add(self, allocated: int, retained: int) -> None:
+        self.calls += 1
+        self.allocated += allocated
+        self.largest = max(self.largest, allocated)
+        self.retained += retained
+
+class Profiler:
+    """
+    Perfil de una sección del programa (--perfil): cProfile mide el tiempo por función
+    y tracemalloc registra cuánta memoria asigna cada subetapa de FileMetrics (lectura,
+    descompresión, limpieza...) y en qué líneas. Uso: start() antes del ciclo de
+    procesamiento, stop() al terminar, y después report_lines() y dump().
+    tracemalloc hace el programa varias veces más lento; los tiempos del reporte
+    con --perfil no son comparables con los de una ejecución normal.
+    """
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+        self._stages: Dict[str, _StageMemory] = {}
+        # Subetapas abiertas: [memoria al entrar, pico visto hasta ahora, instantánea al entrar o None]
+        self._open: List[list] = []
+        # (subetapa, archivo, línea) -> [bytes, bloques] asignados según compare_to
+        self._sites: Dict[Tuple[str, str, int], List[int]] = {}
+        self._snapshots_taken: Dict[str, int] = {}
+        self.peak_bytes = 0
+
+    def start(self) -> None:
+        tracemalloc.start()
+        set_stage_observer(self)
+        self._profile.enable()
+
+    def stop(self) -> None:
+        self._profile.disable()
+        set_stage_observer(None)
+        self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    def stage_started(self, name: str) -> None:
+        # El trabajo del observador no debe aparecer en el perfil de tiempo
+        self._profile.disable()
+        # El pico se reinicia en cada subetapa; el de la subetapa que la contiene se conserva aparte
+        if self._open:
+            self._open[-1][1] = max(self._open[-1][1], tracemalloc.get_traced_memory()[1])
+        snapshot = None
+        # Las instantáneas son caras: solo se comparan las primeras ejecuciones de cada subetapa
+        if self._snapshots_taken.get(name, 0) < PROFILE_SNAPSHOT_STAGES:
+            self._snapshots_taken[name] = self._snapshots_taken.get(name, 0) + 1
+            snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak_bytes = max(self.peak_bytes, peak)
+        tracemalloc.reset_peak()
+        self._open.append([current, current, snapshot])
+        self._profile.enable()
+
+    def stage_finished(self, name: str) -> None:
+        self._profile.disable()
+        current, peak = tracemalloc.get_traced_memory()
+        start, running_peak, snapshot = self._open.pop()
+        peak = max(peak, running_peak)
+        self.peak_bytes = max(self.peak_bytes, peak)
+        self._stages.setdefault(name, _StageMemory()).add(peak - start, current - start)
+        if self._open:
+            self._open[-1][1] = max(self._open[-1][1], peak)
+        if snapshot is not None:
+            # Al salir de la subetapa sus resultados (texto leído, limpio...) siguen vivos en el llamador
+            for difference in tracemalloc.take_snapshot().compare_to(snapshot, 'lineno'):
+                frame = difference.traceback[0]
+                if difference.size_diff <= 0 or frame.filename in IGNORED_ALLOCATION_FILES:
+                    continue
+                site = self._sites.setdefault((name, os.path.basename(frame.filename), frame.lineno), [0, 0])
+                site[0] += difference.size_diff
+                site[1] += max(difference.count_diff, 0)
+        self._profile.enable()
+
+    def dump(self, path: str) -> None:
+        """Guarda los datos de cProfile para visores externos (snakeviz, pstats, gprof2dot)."""
+        self._profile.dump_stats(path)
+
+    def report_lines(self) -> List[str]:
+        """
+        Función para generar la sección de perfil de los reportes de texto: las
+        PROFILE_TOP_FUNCTIONS funciones con más tiempo propio, la memoria asignada por
+        cada subetapa y los PROFILE_TOP_ALLOCATIONS sitios que más memoria asignaron
+        dentro de una subetapa.
+        """
+        stats = pstats.Stats(self._profile)
+        lines = ["\nPERFIL DE EJECUCIÓN (cProfile, ordenado por tiempo propio):\n", "-"*100 + "\n"]
+        lines.append(f"{'Llamadas':>12} {'Propio (seg)':>14} {'Acumulado (seg)':>16}  Función\n")
+        lines.append("-"*100 + "\n")
+        hotspots = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+        for function, (primitive_calls, calls, own_time, cumulative_time, _) in hotspots[:PROFILE_TOP_FUNCTIONS]:
+            call_count = str(calls) if calls == primitive_calls else f"{calls}/{primitive_calls}"
+            lines.append(f"{call_count:>12} {own_time:>14.{PRECISION_DECIMALS}f} "
+                         f"{cumulative_time:>16.{PRECISION_DECIMALS}f}  {function_label(function)}\n")
+        lines.append("-"*100 + "\n")
+        lines.append(f"Total: {stats.total_calls} llamadas en {stats.total_tt:.{PRECISION_DECIMALS}f} segundos\n")
+
+        # Asignado: pico de cada ejecución sobre la memoria al entrar, con las copias que se liberan antes de salir
+        lines.append("\nMEMORIA POR SUBETAPA (tracemalloc, pico de cada ejecución sobre la memoria al entrar):\n")
+        lines.append("-"*100 + "\n")
+        lines.append(f"{'Subetapa':<16} {'Veces':>10} {'Asignado (KB)':>16} {'Mayor pico (KB)':>16} {'Retenido (KB)':>16}\n")
+        lines.append("-"*100 + "\n")
+        for name, memory in sorted(self._stages.items(), key=lambda item: item[1].allocated, reverse=True):
+            lines.append(f"{name:<16} {memory.calls:>10} {memory.allocated / 1024:>16.1f} "
+                         f"{memory.largest / 1024:>16.1f} {memory.retained / 1024:>16.1f}\n")
+        lines.append("-"*100 + "\n")
+
+        lines.append(f"\nASIGNACIONES DE MEMORIA POR SUBETAPA (compare_to en las primeras "
+                     f"{PROFILE_SNAPSHOT_STAGES} ejecuciones de cada una):\n")
+        lines.append("-"*100 + "\n")
+        lines.append(f"{'KB':>12} {'Bloques':>10}  {'Subetapa':<16} Línea\n")
+        lines.append("-"*100 + "\n")
+        sites = sorted(self._sites.items(), key=lambda item: item[1][0], reverse=True)
+        for (name, filename, lineno), (size, count) in sites[:PROFILE_TOP_ALLOCATIONS]:
+            lines.append(f"{size / 1024:>12.1f} {count:>10}  {name:<16} {filename}:{lineno}\n")
+        lines.append("-"*100 + "\n")
+        lines.append(f"Pico de memoria rastreada: {self.peak_bytes / (1024 * 1024):.2f} MB\n")
+        return lines
@@ -0,0 +1,237 @@
+import os
+import time
+import argparse
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+from config import MATRICULA, FILES_DIRECTORY, PRECISION_DECIMALS, DEFAULT_WORKERS, DEFAULT_CLEANER, PREFETCH_DEPTH
+from actividad2_html_cleaner import CLEANERS
+from actividad3_word_extractor import extract_words
+from procesamiento_paralelo import process_files, resolve_workers
+from lector_archivos import decode_bytes, encoding_histogram
+from metricas import FileMetrics
+from lectura_anticipada import Prefetcher
+from entradas_comprimidas import DuplicateDocumentError, document_stem, input_name, read_input, scan_input_files
+from descubrimiento_archivos import peek
+
+# Etapas medidas por archivo, en el orden en que se ejecutan
+STAGES = ["lectura", "descompresion", "decodificacion", "limpieza", "palabras", "escritura"]
+
+# Resultado por archivo: (nombre, tiempo, estado, palabras, codificación, tiempos por etapa)
+PipelineResult = Tuple[str, float, str, int, Optional[str], Dict[str, float]]
+
+def html_to_words(filename: str, write_clean: bool = False, cleaner: str = DEFAULT_CLEANER) -> PipelineResult:
+    """
+    Función para procesar un archivo HTML completo en una sola pasada:
+    HTML -> texto limpio -> palabras ordenadas, todo en memoria.
+    Recibe el nombre del archivo, si se debe guardar también el texto limpio y el
+    método de limpieza (ver actividad2_html_cleaner.CLEANERS).
+    Retorna el resultado del archivo con el tiempo de cada etapa.
+    """
+    name = input_name(filename)
+    stage_times: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+    start_time = time.perf_counter()
+
+    # Lectura de bytes (una sola vez); los archivos comprimidos se descomprimen en memoria
+    read_metrics = FileMetrics(name)
+    try:
+        raw = read_input(filename, read_metrics)
+    except Exception as e:
+        print(f"Error al abrir {filename}: {e}")
+        return (name, 0, "Error", 0, None, stage_times)
+    stage_start = time.perf_counter()
+    for stage in ("lectura", "descompresion"):
+        stage_times[stage] = read_metrics.stages.get(stage, 0.0)
+
+    # Decodificación (una sola vez)
+    content, encoding_used = decode_bytes(raw)
+    if content is None:
+        print(f"No se pudo decodificar {filename} con ninguna codificación")
+        return (name, 0, "Error", 0, None, stage_times)
+    now = time.perf_counter()
+    stage_times["decodificacion"] = now - stage_start
+    stage_start = now
+
+    # Limpieza de etiquetas HTML
+    clean_content = CLEANERS[cleaner][0](content)
+    now = time.perf_counter()
+    stage_times["limpieza"] = now - stage_start
+    stage_start = now
+
+    # Extracción y ordenamiento de palabras
+    sorted_words = extract_words(clean_content)
+    now = time.perf_counter()
+    stage_times["palabras"] = now - stage_start
+    stage_start = now
+
+    # Escritura de resultados
+    base_name = document_stem(filename)
+    try:
+        if write_clean:
+            os.makedirs("Clean_Files", exist_ok=True)
+            with open(os.path.join("Clean_Files", f"{base_name}_clean.txt"), 'w', encoding='utf-8') as file:
+                file.write(clean_content)
+        os.makedirs("Words_Files", exist_ok=True)
+        # La lista se une una sola vez: una llamada a write() en lugar de una por palabra
+        with open(os.path.join("Words_Files", f"{base_name}_words.txt"), 'w', encoding='utf-8') as file:
+            file.write(''.join([word + '\n' for word in sorted_words]))
+    except Exception as e:
+        print(f"Error al escribir resultados de {filename}: {e}")
+        return (name, 0, "Error", 0, encoding_used, stage_times)
+    end_time = time.perf_counter()
+    stage_times["escritura"] = end_time - stage_start
+
+    return (name, end_time - start_time, "Exitoso", len(sorted_words), encoding_used, stage_times)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pipeline fusionado - HTML a palabras ordenadas en una pasada")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Número de procesos a usar (0 = todos los núcleos)")
+    parser.add_argument("--guardar-limpios", action="store_true",
+                        help="Guardar también los archivos limpios en Clean_Files/")
+    parser.add_argument("--limpieza", choices=list(CLEANERS), default=DEFAULT_CLEANER,
+                        help="Método de limpieza: tokenizador de una pasada o expresiones regulares originales")
+    parser.add_argument("--precarga", type=int, nargs="?", const=PREFETCH_DEPTH, default=0, metavar="N",
+                        help=f"Leer por adelantado los próximos N archivos en un hilo (sin N: {PREFETCH_DEPTH})")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    # Configuración
+    files_directory = FILES_DIRECTORY
+    matricula = MATRICULA
+    output_file = f"a23_{matricula}.txt"
+    workers = resolve_workers(args.workers)
+
+    # Verificar que existe el directorio Files
+    if not os.path.exists(files_directory):
+        print(f"Error: No se encontró el directorio {files_directory}")
+        return
+
+    # Los archivos HTML del directorio Files (también comprimidos o dentro de un tar) se procesan
+    # conforme se descubren, sin esperar a listar el directorio; el reporte se ordena al final
+    html_files = peek(scan_input_files(files_directory, ordered=False))
+
+    if html_files is None:
+        print(f"No se encontraron archivos HTML en {files_directory}")
+        return
+
+    print(f"Procesando los archivos HTML de {files_directory} conforme se encuentran")
+    print("Iniciando pipeline fusionado (HTML -> texto limpio -> palabras)...")
+    print(f"Guardar archivos limpios: {'Sí' if args.guardar_limpios else 'No'}")
+    print(f"Método de limpieza: {args.limpieza}")
+    print(f"Procesos en uso: {workers}")
+    print("-" * 70)
+
+    # Variables para almacenar resultados
+    results = []
+    total_individual_time = 0
+    successful_files = 0
+    total_words_processed = 0
+    stage_totals: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+
+    # Medir tiempo total del programa
+    program_start_time = time.perf_counter()
+
+    # Con --precarga un hilo lee los próximos archivos mientras se procesa el actual
+    prefetcher = Prefetcher(args.precarga) if args.precarga > 0 else None
+    worker_func = partial(html_to_words, write_clean=args.guardar_limpios, cleaner=args.limpieza)
+    for filename, file_time, status, word_count, encoding, stage_times in process_files(worker_func, html_files, workers, prefetcher):
+        if file_time > 0:
+            successful_files += 1
+            total_words_processed += word_count
+
+        total_individual_time += file_time
+        for stage in STAGES:
+            stage_totals[stage] += stage_times[stage]
+        results.append((filename, file_time, word_count, status, encoding))
+
+        # Mostrar progreso
+        mark = "✓" if file_time > 0 else "✗"
+        print(f"{mark} Procesado: {filename:<25} - Tiempo: {file_time:.{PRECISION_DECIMALS}f}s - Palabras: {word_count}")
+
+    results.sort()
+
+    # Tiempo total del programa
+    program_end_time = time.perf_counter()
+    total_program_time = program_end_time - program_start_time
+
+    print("-" * 70)
+    print(f"Procesamiento completado: {successful_files}/{len(results)} archivos exitosos")
+
+    # Generar reporte
+    with open(output_file, 'w', encoding='utf-8') as log_file:
+        log_file.write("="*80 + "\n")
+        log_file.write("REPORTE DEL PIPELINE FUSIONADO (HTML -> PALABRAS)\n")
+        log_file.write("="*80 + "\n")
+        log_file.write(f"Matrícula: {matricula}\n")
+        log_file.write(f"Fecha: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        log_file.write(f"Total de archivos procesados: {len(results)}\n")
+        log_file.write(f"Archivos procesados exitosamente: {successful_files}\n")
+        log_file.write(f"Total de palabras únicas extraídas: {total_words_processed}\n")
+        log_file.write(f"Directorio de entrada: {files_directory}/\n")
+        log_file.write(f"Directorio de salida: Words_Files/{' y Clean_Files/' if args.guardar_limpios else ''}\n")
+        log_file.write(f"Método de limpieza: {args.limpieza}\n")
+        log_file.write(f"Procesos en uso: {workers}\n")
+        if prefetcher is not None:
+            log_file.write(f"Precarga: {prefetcher.depth} archivos por adelantado ({prefetcher.files} archivos, "
+                           f"{prefetcher.bytes / (1024 * 1024):.2f} MB leídos en segundo plano)\n")
+        log_file.write("="*80 + "\n\n")
+
+        log_file.write("TIEMPOS DE PROCESAMIENTO INDIVIDUAL:\n")
+        log_file.write("-"*65 + "\n")
+        log_file.write(f"{'Archivo':<30} {'Tiempo (seg)':<15} {'Palabras':<10} {'Estado':<10}\n")
+        log_file.write("-"*65 + "\n")
+
+        for filename, file_time, word_count, status, _ in results:
+            log_file.write(f"{filename:<30} {file_time:<15.{PRECISION_DECIMALS}f} {word_count:<10} {status:<10}\n")
+
+        log_file.write("-"*65 + "\n")
+        log_file.write(f"{'TOTALES:':<30}\n")
+        log_file.write(f"{'Suma individual:':<30} {total_individual_time:<15.{PRECISION_DECIMALS}f}\n")
+        log_file.write(f"{'Tiempo programa:':<30} {total_program_time:<15.{PRECISION_DECIMALS}f}\n")
+        log_file.write(f"{'Total palabras:':<30} {total_words_processed:<15}\n")
+        log_file.write("-"*65 + "\n")
+
+        # Desglose por etapa (suma de todos los archivos)
+        log_file.write(f"\nTIEMPO POR ETAPA (suma de archivos):\n")
+        for stage in STAGES:
+            share = (stage_totals[stage] / total_individual_time * 100) if total_individual_time > 0 else 0
+            log_file.write(f"{stage.capitalize() + ':':<30} {stage_totals[stage]:<15.{PRECISION_DECIMALS}f} {share:.1f}%\n")
+        
+        log_file.write(f"\nCODIFICACIONES DETECTADAS:\n")
+        for encoding, count in encoding_histogram(result[4] for result in results if result[3] != "Error"):
+            log_file.write(f"{encoding:<15} {count} archivos\n")
+
+        log_file.write("\n" + "="*80 + "\n")
+        log_file.write("DESCRIPCIÓN DEL PROCESO:\n")
+        log_file.write("="*80 + "\n")
+        log_file.write("1. Lectura única de cada archivo HTML en bytes\n")
+        log_file.write("2. Decodificación única con manejo de múltiples codificaciones\n")
+        log_file.write("3. Eliminación de etiquetas HTML en memoria (misma lógica que la Actividad 2)\n")
+        log_file.write("4. Extracción y ordenamiento de palabras en memoria (misma lógica que la Actividad 3)\n")
+        log_file.write("5. Guardado directo en 'Words_Files/' sin pasar por 'Clean_Files/' (salvo --guardar-limpios)\n")
+        log_file.write("\n" + "="*80 + "\n")
+        log_file.write("FIN DEL REPORTE\n")
+        log_file.write("="*80 + "\n")
+
+    # Mostrar resumen en consola
+    print("\n" + "="*70)
+    print("RESUMEN DE RESULTADOS:")
+    print("="*70)
+    print(f"Archivos HTML encontrados: {len(results)}")
+    print(f"Archivos procesados exitosamente: {successful_files}")
+    print(f"Total de palabras únicas extraídas: {total_words_processed}")
+    print(f"Tiempo total (suma individual): {total_individual_time:.{PRECISION_DECIMALS}f} segundos")
+    print(f"Tiempo total del programa: {total_program_time:.{PRECISION_DECIMALS}f} segundos")
+    for stage in STAGES:
+        print(f"  {stage.capitalize() + ':':<16} {stage_totals[stage]:.{PRECISION_DECIMALS}f} segundos")
+    print(f"Reporte guardado en: {output_file}")
+    print("="*70)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except DuplicateDocumentError as e:
+        # Se detecta al descubrir la entrada repetida, antes de escribir su salida
+        raise SystemExit(f"Error: {e}")
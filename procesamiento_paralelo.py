@@ -0,0 +1,160 @@
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+from config import PARALLEL_CHUNKS_PER_WORKER, LAZY_CHUNK_FILES
+from lectura_anticipada import Prefetcher
+
+# Resultado por archivo: (nombre, tiempo, estado, palabras, codificación, métricas)
+# Las métricas son el registro de metricas.FileMetrics.to_dict()
+FileResult = Tuple[str, float, str, int, Optional[str], Dict[str, object]]
+ResultT = TypeVar("ResultT")
+
+def resolve_workers(requested: int) -> int:
+    """
+    Función para determinar cuántos procesos usar.
+    Un valor de 0 o negativo significa "todos los núcleos disponibles".
+    """
+    if requested <= 0:
+        return os.cpu_count() or 1
+    return requested
+
+def calculate_chunksize(total_files: int, workers: int) -> int:
+    """
+    Función para calcular el tamaño de bloque enviado a cada proceso.
+    Se reparten varios bloques por proceso para equilibrar la carga
+    sin pagar la comunicación entre procesos archivo por archivo.
+    """
+    if total_files <= 0 or workers <= 0:
+        return 1
+    return max(1, total_files // (workers * PARALLEL_CHUNKS_PER_WORKER))
+
+def process_paths(worker_func: Callable[[str], ResultT], paths: Iterable[str],
+                  workers: int = 1, prefetcher: Optional[Prefetcher] = None) -> Iterator[Tuple[str, ResultT]]:
+    """
+    Igual que process_files(), pero entrega cada resultado junto con su ruta: (ruta, resultado).
+    Sirve también cuando paths es un iterador, que no se puede recorrer dos veces.
+    """
+    if not isinstance(paths, Sequence):
+        return _process_lazily(worker_func, paths, workers, prefetcher)
+    return zip(paths, process_files(worker_func, paths, workers, prefetcher))
+
+def process_files(worker_func: Callable[[str], ResultT], paths: Iterable[str],
+                  workers: int = 1, prefetcher: Optional[Prefetcher] = None,
+                  executor: Optional[ProcessPoolExecutor] = None) -> Iterator[ResultT]:
+    """
+    Función para procesar una lista de archivos, en serie o con un pool de procesos.
+    Recibe la función que procesa un archivo, la lista de rutas, el número de procesos y,
+    opcionalmente, el lector anticipado que carga los próximos archivos mientras se
+    procesa el actual (ver lectura_anticipada.py) y un pool ya creado que se reutiliza
+    entre llamadas (el llamador lo cierra); sin él se crea uno para esta lista.
+    Si paths es un iterador (p. ej. descubrimiento_archivos.scan_files(..., ordered=False))
+    los archivos se procesan conforme se descubren, sin esperar a listar el directorio.
+    Los resultados se entregan en el mismo orden que la lista de entrada.
+    """
+    if not isinstance(paths, Sequence):
+        for _, result in _process_lazily(worker_func, paths, workers, prefetcher):
+            yield result
+        return
+
+    if workers <= 1 or len(paths) <= 1:
+        if prefetcher is not None:
+            prefetcher.start(paths)
+        try:
+            for index, path in enumerate(paths):
+                if prefetcher is not None:
+                    prefetcher.seek(index)
+                yield worker_func(path)
+        finally:
+            if prefetcher is not None:
+                prefetcher.stop()
+        return
+
+    chunksize = calculate_chunksize(len(paths), workers)
+    # Con el pool, los bloques ya enviados a los procesos van por delante del último resultado
+    if prefetcher is not None:
+        prefetcher.start(paths, lead=workers * chunksize)
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for index, result in enumerate(executor.map(worker_func, paths, chunksize=chunksize)):
+            if prefetcher is not None:
+                prefetcher.seek(index + 1)
+            yield result
+    finally:
+        if own_executor:
+            executor.shutdown()
+        if prefetcher is not None:
+            prefetcher.stop()
+
+def _process_chunk(worker_func: Callable[[str], ResultT], chunk: List[str]) -> List[ResultT]:
+    return [worker_func(path) for path in chunk]
+
+def _process_lazily(worker_func: Callable[[str], ResultT], paths: Iterable[str], workers: int,
+                    prefetcher: Optional[Prefetcher]) -> Iterator[Tuple[str, ResultT]]:
+    """
+    Versión de process_paths() para un iterador de rutas: se toman del iterador solo las
+    que hacen falta para el siguiente archivo (o bloque de LAZY_CHUNK_FILES archivos con el
+    pool, con a lo más PARALLEL_CHUNKS_PER_WORKER bloques en curso por proceso) más las
+    que lee por adelantado el lector anticipado.
+    """
+    pending = iter(paths)
+    upcoming: Deque[str] = deque()  # Rutas ya descubiertas que aún no se procesan
+    discovered: List[str] = []  # Todas las rutas descubiertas, solo para el lector anticipado
+    depth = prefetcher.depth if prefetcher is not None else 0
+
+    def discover(count: int) -> None:
+        while len(upcoming) < count:
+            path = next(pending, None)
+            if path is None:
+                if prefetcher is not None:
+                    prefetcher.finish()
+                return
+            upcoming.append(path)
+            if prefetcher is not None:
+                discovered.append(path)
+
+    if workers <= 1:
+        if prefetcher is not None:
+            prefetcher.start(discovered, complete=False)
+        try:
+            index = 0
+            while True:
+                discover(1 + depth)
+                if not upcoming:
+                    return
+                path = upcoming.popleft()
+                if prefetcher is not None:
+                    prefetcher.seek(index)
+                yield path, worker_func(path)
+                index += 1
+        finally:
+            if prefetcher is not None:
+                prefetcher.stop()
+
+    max_chunks = workers * PARALLEL_CHUNKS_PER_WORKER
+    # Con el pool, los bloques ya enviados a los procesos van por delante del último resultado
+    if prefetcher is not None:
+        prefetcher.start(discovered, lead=max_chunks * LAZY_CHUNK_FILES, complete=False)
+    in_flight: Deque[Tuple[List[str], Future]] = deque()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            index = 0
+            while True:
+                while len(in_flight) < max_chunks:
+                    discover(LAZY_CHUNK_FILES + depth)
+                    chunk = [upcoming.popleft() for _ in range(min(LAZY_CHUNK_FILES, len(upcoming)))]
+                    if not chunk:
+                        break
+                    in_flight.append((chunk, executor.submit(_process_chunk, worker_func, chunk)))
+                if prefetcher is not None:
+                    prefetcher.seek(index)
+                if not in_flight:
+                    return
+                chunk, future = in_flight.popleft()
+                yield from zip(chunk, future.result())
+                index += len(chunk)
+    finally:
+        if prefetcher is not None:
+            prefetcher.stop()
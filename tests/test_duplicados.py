@@ -0,0 +1,37 @@
+import os
+import tarfile
+import tempfile
+import unittest
+from duplicados import find_exact_duplicates
+from entradas_comprimidas import scan_input_files
+from test_entradas_comprimidas import add_tar_member
+
+PAGE = b"<html><body><p>misma pagina</p></body></html>"
+OTHER = b"<html><body><p>otra pagina!</p></body></html>"  # Mismo tamaño que PAGE
+
+class FindExactDuplicatesTest(unittest.TestCase):
+    """Los miembros de tar se comparan por su contenido, igual que los archivos normales."""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.directory = self._directory.name
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_duplicate_tar_members_are_found(self):
+        with open(os.path.join(self.directory, "a.html"), 'wb') as file:
+            file.write(PAGE)
+        with tarfile.open(os.path.join(self.directory, "crawl.tar"), 'w') as tar:
+            add_tar_member(tar, "uno/b.html", PAGE)
+            add_tar_member(tar, "uno/c.html", OTHER)
+        with tarfile.open(os.path.join(self.directory, "crawl2.tar.gz"), 'w:gz') as tar:
+            add_tar_member(tar, "d.html", OTHER)
+            add_tar_member(tar, "e.html", PAGE)
+
+        paths = list(scan_input_files(self.directory))
+        a, b, c, d, e = paths
+        self.assertEqual(find_exact_duplicates(paths), {b: a, e: a, d: c})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import gzip
+import tarfile
+import tempfile
+import unittest
+from entradas_comprimidas import DuplicateDocumentError, document_stem, scan_input_files
+
+HTML = b"<html><body><p>hola mundo</p></body></html>"
+
+def add_tar_member(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    with tempfile.TemporaryFile() as file:
+        file.write(data)
+        file.seek(0)
+        tar.addfile(info, file)
+
+class ScanInputFilesTest(unittest.TestCase):
+    """Dos entradas con el mismo documento escribirían la misma salida: se rechazan al descubrirlas."""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.directory = self._directory.name
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def write(self, name: str, data: bytes) -> None:
+        with open(os.path.join(self.directory, name), 'wb') as file:
+            file.write(data)
+
+    def test_plain_and_compressed_with_same_name_are_rejected(self):
+        self.write("x.html", HTML)
+        self.write("x.html.gz", gzip.compress(HTML))
+        for ordered in (True, False):
+            with self.assertRaisesRegex(DuplicateDocumentError, r"x\.html y x\.html\.gz|x\.html\.gz y x\.html"):
+                list(scan_input_files(self.directory, ordered=ordered))
+
+    def test_tar_members_with_same_basename_are_rejected(self):
+        with tarfile.open(os.path.join(self.directory, "crawl.tar"), 'w') as tar:
+            add_tar_member(tar, "a/000.html", HTML)
+            add_tar_member(tar, "b/000.html", HTML)
+        with self.assertRaisesRegex(DuplicateDocumentError, "crawl.tar::a/000.html y crawl.tar::b/000.html"):
+            list(scan_input_files(self.directory))
+
+    def test_tar_member_colliding_with_plain_file_is_rejected(self):
+        self.write("000.html", HTML)
+        with tarfile.open(os.path.join(self.directory, "crawl.tar.gz"), 'w:gz') as tar:
+            add_tar_member(tar, "pagina/000.html", HTML)
+        with self.assertRaises(DuplicateDocumentError):
+            list(scan_input_files(self.directory))
+
+    def test_distinct_documents_are_accepted(self):
+        self.write("x.html", HTML)
+        self.write("y.html.gz", gzip.compress(HTML))
+        with tarfile.open(os.path.join(self.directory, "crawl.tar"), 'w') as tar:
+            add_tar_member(tar, "a/z.html", HTML)
+        paths = list(scan_input_files(self.directory))
+        self.assertEqual([document_stem(path) for path in paths], ["x", "y", "z"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import tempfile
+import unittest
+from escritor_asincrono import AsyncWriter, WriteTracker
+from estadisticas import ResultCollector
+
+def add_result(stats, result):
+    _, file_time, status = result
+    stats.add(file_time, status != "Error", "utf-8", timed=status == "Exitoso")
+
+def failed_result(result):
+    return (result[0], 0, "Error")
+
+class WriteTrackerTest(unittest.TestCase):
+    """Un archivo cuenta como exitoso solo cuando el escritor terminó su salida."""
+
+    def test_failed_write_is_recorded_as_error(self):
+        with tempfile.TemporaryDirectory() as directory:
+            good = os.path.join(directory, "salida", "000_clean.txt")
+            bad = os.path.join(directory, "salida", "001_clean.txt")
+            os.makedirs(bad)  # Abrir un directorio para escribir falla
+            results = ResultCollector(add_result)
+            writer = AsyncWriter(batch_files=1)
+            tracker = WriteTracker(writer, results, failed_result)
+            for path, name in ((good, "000.html"), (bad, "001.html")):
+                writer.submit(path, "texto")
+                tracker.add(path, (name, 0.5, "Exitoso"), {"archivo": name, "estado": "ok", "error": None})
+            writer.close()
+            tracker.collect()
+
+        self.assertEqual(sorted(results.rows), [("000.html", 0.5, "Exitoso"), ("001.html", 0, "Error")])
+        self.assertEqual(results.stats.successful, 1)
+        failed = [record for record in results.records if record["archivo"] == "001.html"][0]
+        self.assertEqual(failed["estado"], "error")
+        self.assertIn("Error al escribir", failed["error"])
+        self.assertEqual([path for path, _ in writer.errors], [bad])
+
+if __name__ == "__main__":
+    unittest.main()
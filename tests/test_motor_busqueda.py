@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from indice_invertido import IndexReader, build_index
+from motor_busqueda import SearchEngine, union_all
+
+# Palabras ya ordenadas de cada documento, como las deja la Actividad 3
+DOCUMENTS = {
+    "000": ["casa", "cazo", "perro"],
+    "001": ["cama", "casa"],
+    "002": ["camino", "gato"],
+    "003": ["perro"],
+}
+
+class SearchEngineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._directory = tempfile.TemporaryDirectory()
+        words_files = []
+        for name, words in DOCUMENTS.items():
+            path = os.path.join(cls._directory.name, f"{name}_words.txt")
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write("\n".join(words) + "\n")
+            words_files.append(path)
+        cls.index_path = os.path.join(cls._directory.name, "indice.bin")
+        build_index(words_files, cls.index_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._directory.cleanup()
+
+    def search(self, query: str):
+        with IndexReader(self.index_path) as reader:
+            engine = SearchEngine(reader)
+            documents = sorted(name for name, _ in engine.search(query))
+            return documents, engine.truncated_prefixes
+
+    def test_union_all_merges_and_deduplicates(self):
+        self.assertEqual(union_all([[0, 2, 5], [1, 2], [], [5, 7]]), [0, 1, 2, 5, 7])
+
+    def test_prefix_expands_to_every_matching_term(self):
+        self.assertEqual(self.search("ca*"), (["000", "001", "002"], []))
+
+    def test_truncated_prefix_is_reported(self):
+        # ca* tiene cuatro términos (cama, camino, casa, cazo): con límite 2 solo se usan cama y camino
+        with mock.patch("motor_busqueda.MAX_PREFIX_EXPANSIONS", 2):
+            self.assertEqual(self.search("ca* OR perro"), (["000", "001", "002", "003"], ["ca*"]))
+            self.assertEqual(self.search("ca*"), (["001", "002"], ["ca*"]))
+            self.assertEqual(self.search("cam*"), (["001", "002"], []))
+
+if __name__ == "__main__":
+    unittest.main()
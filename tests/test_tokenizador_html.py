@@ -0,0 +1,36 @@
+import unittest
+from tokenizador_html import HtmlTokenizer, html_to_text
+
+DOCUMENT = ("<!DOCTYPE html><html><head><style>p { color: red; }</style></head>\n<body>\n"
+            "<p>uno &amp; dos</p><p>tres&nbsp;cuatro</p>\n\n<!-- comentario --><script>if (a < b) { x = 1; }</script>"
+            "<li>cinco</li><li>seis</li> a < b\n</body></html>\n")
+
+def feed_in_chunks(document: str, size: int) -> str:
+    tokenizer = HtmlTokenizer()
+    pieces = [tokenizer.feed(document[start:start + size]) for start in range(0, len(document), size)]
+    return ''.join(pieces) + tokenizer.close()
+
+class HtmlTokenizerTest(unittest.TestCase):
+    """Procesar el documento por bloques de cualquier tamaño da el mismo texto que completo."""
+
+    def test_chunked_output_matches_whole_document(self):
+        expected = html_to_text(DOCUMENT)
+        self.assertEqual(expected, "uno & dos tres cuatro\n\ncinco seis a < b")
+        for size in (1, 2, 3, 5, 16, len(DOCUMENT)):
+            self.assertEqual(feed_in_chunks(DOCUMENT, size), expected, f"bloques de {size}")
+
+    def test_unclosed_tag_is_kept_until_closed(self):
+        tokenizer = HtmlTokenizer()
+        self.assertEqual(tokenizer.feed("hola <a href="), "hola")
+        for _ in range(1000):
+            self.assertEqual(tokenizer.feed('"/pagina" '), "")
+        self.assertEqual(tokenizer.feed(">mundo"), " mundo")
+        self.assertEqual(tokenizer.close(), "")
+
+    def test_unclosed_tag_at_end_is_literal_text(self):
+        document = "x < " + "palabra " * 1000
+        self.assertEqual(feed_in_chunks(document, 7), html_to_text(document))
+        self.assertTrue(html_to_text(document).startswith("x < palabra palabra"))
+
+if __name__ == "__main__":
+    unittest.main()
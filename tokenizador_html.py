@@ -0,0 +1,166 @@
+import re
+from html import unescape
+from typing import List, Optional, Pattern
+
+# Elementos cuyo contenido no es texto visible (código JavaScript y CSS)
+RAW_TEXT_TAGS = ("script", "style")
+
+# Construcciones que cambian de estado: inicio de comentario y apertura de <script>/<style>
+SPECIAL_PATTERN = re.compile(r'<!--|<(script|style)\b[^>]*>', re.IGNORECASE)
+COMMENT_END_PATTERN = re.compile(r'-->')
+RAW_TEXT_END_PATTERNS = {name: re.compile(rf'</{name}\b[^>]*>', re.IGNORECASE) for name in RAW_TEXT_TAGS}
+
+# Dentro del texto: etiquetas y declaraciones como <!DOCTYPE ...> o <?xml ...?>.
+# Igual que HTML_TAG_PATTERN, una etiqueta termina en el primer '>'; se reemplaza por
+# un espacio para separar las palabras de elementos contiguos ("<li>uno</li><li>dos</li>")
+TAG_PATTERN = re.compile(r'<(?:/?[A-Za-z]|[!?])[^>]*>')
+PARAGRAPH_BREAK_PATTERN = re.compile(r'\n\s*\n')
+
+# Entidad que podría continuar en el siguiente fragmento ("&am" + "p;")
+ENTITY_TAIL_PATTERN = re.compile(r'&#?[A-Za-z0-9]{0,40}\Z')
+
+# Espacios en blanco: un bloque con dos o más saltos de línea separa párrafos ("\n\n"),
+# con un salto queda "\n" y sin saltos queda un solo espacio
+def collapse_whitespace_run(run: str) -> str:
+    """Reduce un bloque de espacios en blanco a "\\n\\n", "\\n", " " o "" según sus saltos de línea."""
+    if not run:
+        return ''
+    newlines = run.count('\n')
+    if newlines >= 2:
+        return '\n\n'
+    return '\n' if newlines else ' '
+
+def normalize_text(text: str) -> str:
+    """
+    Aplica las reglas de collapse_whitespace_run() a todos los bloques de un texto sin
+    espacios en los extremos. Separa párrafos con una expresión regular que empieza con
+    un carácter fijo y normaliza cada línea con split()/join(), que corren en C.
+    """
+    if '\n' not in text:
+        return ' '.join(text.split())
+    return '\n\n'.join(['\n'.join(map(' '.join, map(str.split, paragraph.split('\n'))))
+                        for paragraph in PARAGRAPH_BREAK_PATTERN.split(text)])
+
+def strip_tags(segment: str) -> str:
+    """Elimina las etiquetas de un fragmento de texto sin comentarios ni scripts."""
+    if '<' not in segment:
+        return segment
+    return TAG_PATTERN.sub(' ', segment)
+
+class HtmlTokenizer:
+    """
+    Tokenizador HTML basado en una máquina de estados: texto, comentario (<!-- ... -->)
+    y contenido de <script>/<style>. Recorre el documento una sola vez saltando de una
+    construcción especial a la siguiente; descarta comentarios, JavaScript y CSS, elimina
+    etiquetas y declaraciones del texto, decodifica entidades (&amp;, &nbsp;, &#233;)
+    y normaliza los espacios en blanco.
+
+    Recibe el HTML con feed() en fragmentos de cualquier tamaño y da el mismo resultado
+    que procesarlo completo: entre fragmentos solo conserva la construcción incompleta
+    del final (una etiqueta sin '>', una entidad cortada o el posible cierre de un
+    comentario o script) y el bloque de espacios pendiente. Una etiqueta o un script
+    sin cerrar solo se resuelven con un '>': los fragmentos sin '>' se acumulan sin
+    volver a recorrer lo pendiente, así que el tiempo sigue siendo lineal.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []  # Final del texto recibido que aún no se puede decidir
+        self._skip_end: Optional[Pattern[str]] = None  # Cierre buscado dentro de un comentario o script
+        self._entity_tail = ''  # Posible entidad cortada al final del texto ya sin etiquetas
+        self._pending_space = ''  # Bloque de espacios que aún no sabemos si es final
+        self._started = False  # Ya se emitió texto visible (los espacios iniciales se descartan)
+
+    def feed(self, chunk: str) -> str:
+        """Procesa un fragmento de HTML y retorna el texto limpio que ya es definitivo."""
+        self._buffer.append(chunk)
+        # El posible cierre de un comentario ocupa a lo más dos caracteres y se vuelve a buscar
+        if len(self._buffer) > 1 and '>' not in chunk and self._skip_end is not COMMENT_END_PATTERN:
+            return ''
+        text = self._decode_entities(self._tokenize(''.join(self._buffer), final=False), final=False)
+        return self._filter_whitespace(text)
+
+    def close(self, chunk: str = '') -> str:
+        """
+        Procesa el último fragmento (opcional), termina el procesamiento y retorna el
+        texto limpio restante. close(documento) equivale a feed(documento) + close()
+        con una sola pasada.
+        """
+        self._buffer.append(chunk)
+        text = self._decode_entities(self._tokenize(''.join(self._buffer), final=True), final=True)
+        text = self._filter_whitespace(text)
+        self._pending_space = ''  # Espacios al final del documento: se descartan
+        return text
+
+    def _tokenize(self, data: str, final: bool) -> str:
+        pieces: List[str] = []
+        position = 0
+        self._buffer = []
+        while True:
+            if self._skip_end is not None:
+                # Estado comentario/script: se descarta todo hasta el cierre
+                end = self._skip_end.search(data, position)
+                if end is None:
+                    if not final:
+                        # Conservar solo lo que podría ser el inicio del cierre
+                        if self._skip_end is COMMENT_END_PATTERN:
+                            tail = max(position, len(data) - 2)
+                        else:
+                            tail = data.find('<', max(position, data.rfind('>') + 1))
+                        if tail != -1 and tail < len(data):
+                            self._buffer = [data[tail:]]
+                    return ''.join(pieces)
+                self._skip_end = None
+                position = end.end()
+
+            # Estado texto: todo lo anterior a la siguiente construcción especial
+            special = SPECIAL_PATTERN.search(data, position)
+            if special is None:
+                break
+            pieces.append(strip_tags(data[position:special.start()]))
+            position = special.end()
+            raw_tag = special.group(1)
+            self._skip_end = COMMENT_END_PATTERN if raw_tag is None else RAW_TEXT_END_PATTERNS[raw_tag.lower()]
+
+        # Texto final: si el documento continúa, retener una etiqueta sin cerrar
+        # (el primer '<' posterior al último '>'), que también puede ser el inicio
+        # de un comentario o de un script
+        end = len(data)
+        if not final:
+            open_tag = data.find('<', max(position, data.rfind('>') + 1))
+            if open_tag != -1:
+                end = open_tag
+                self._buffer = [data[end:]]
+        pieces.append(strip_tags(data[position:end]))
+        return ''.join(pieces)
+
+    def _decode_entities(self, text: str, final: bool) -> str:
+        text = self._entity_tail + text
+        self._entity_tail = ''
+        if not final:
+            entity = ENTITY_TAIL_PATTERN.search(text, max(0, len(text) - 42))
+            if entity is not None:
+                self._entity_tail = text[entity.start():]
+                text = text[:entity.start()]
+        return unescape(text) if '&' in text else text
+
+    def _filter_whitespace(self, text: str) -> str:
+        # Los bloques de espacios interiores están completos; solo los de los extremos
+        # pueden continuar en otro fragmento y se guardan ya reducidos
+        body = text.lstrip()
+        self._pending_space = collapse_whitespace_run(self._pending_space + text[:len(text) - len(body)])
+        if not body:
+            return ''
+        stripped = body.rstrip()
+        output = normalize_text(stripped)
+        if self._started:
+            output = self._pending_space + output
+        self._started = True
+        self._pending_space = collapse_whitespace_run(body[len(stripped):])
+        return output
+
+def html_to_text(content: str) -> str:
+    """
+    Función para convertir un documento HTML completo ya decodificado en texto limpio.
+    Retorna el texto sin etiquetas, comentarios, scripts ni estilos, con las entidades decodificadas.
+    """
+    return HtmlTokenizer().close(content)